@@ -1,7 +1,21 @@
+import time
+_started = time.perf_counter()
+
+from binaryninja import log_debug
 from .plugin import *
 
 PluginCommand.register(r"Ollama\Rename all functions", "Rename all functions based on (HLIL)", rename_all_functions_command)
 
+PluginCommand.register(r"Ollama\Resume rename all functions", "Continue an interrupted rename of all functions", resume_rename_all_functions_command)
+
+PluginCommand.register(r"Ollama\Rename all functions (budgeted)", "Rename the most valuable functions first within a time and token budget", budgeted_rename_all_functions_command)
+
+PluginCommand.register(r"Ollama\Rename all functions (review)", "Suggest names for all functions and review them before they are applied", review_rename_all_functions_command)
+
+PluginCommand.register(r"Ollama\Rename all functions (dry run)", "Write suggested names for all functions to JSON without applying them", dry_run_rename_all_functions_command)
+
+PluginCommand.register(r"Ollama\Rename all variables", "Rename the variables of all functions based on (HLIL), keeping user-defined names", rename_all_variables_command)
+
 PluginCommand.register_for_high_level_il_function(r"Ollama\Rename target function", "Rename target function based on (HLIL)",
                             rename_function_HLIL_command)
 
@@ -15,3 +29,21 @@ PluginCommand.register(r"Ollama\Settings\Set ollama model", "set the model you w
 
 PluginCommand.register(r"Ollama\Settings\Set ollama server", "set the server where you want to access ollama", set_server_dialog)
 
+PluginCommand.register(r"Ollama\Settings\Set ollama options", "set performance options such as the number of parallel requests", set_options_dialog)
+
+PluginCommand.register(r"Ollama\Cache\Clear response cache", "remove all cached ollama responses", clear_cache_command)
+
+PluginCommand.register(r"Ollama\Cache\Show cache statistics", "show the size and hit rate of the ollama response cache", show_cache_statistics_command)
+
+PluginCommand.register(r"Ollama\Similarity\Index function names", "add the named functions of this binary to the similarity index so later builds reuse their names", index_function_names_command)
+
+PluginCommand.register(r"Ollama\Similarity\Clear similarity index", "remove all accepted function names from the similarity index", clear_similarity_index_command)
+
+PluginCommand.register(r"Ollama\Auto rename\Enable", "rename functions automatically as analysis adds or changes them", enable_auto_rename_command, is_auto_rename_disabled)
+
+PluginCommand.register(r"Ollama\Auto rename\Disable", "stop renaming new and changed functions automatically", disable_auto_rename_command, is_auto_rename_enabled)
+
+PluginCommand.register(r"Ollama\Write performance report", "write request latency, token throughput and cache statistics of this session to JSON", write_performance_report_command)
+
+# Keep an eye on this when adding imports: it is paid on every Binary Ninja launch. See benchmarks/bench_import.py.
+log_debug(f"Ollama plugin loaded in {(time.perf_counter() - _started) * 1000:.1f} ms")
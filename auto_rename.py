@@ -0,0 +1,139 @@
+import threading
+from binaryninja import BinaryDataNotification, log_info
+from .rename_tasks import AutoRenameFunctions
+
+try:
+    from binaryninja import NotificationType
+    _NOTIFICATIONS = NotificationType.FunctionAdded | NotificationType.FunctionUpdated
+except ImportError:
+    # Older versions of Binary Ninja send every notification.
+    _NOTIFICATIONS = None
+
+class AutoRenamer(BinaryDataNotification):
+    """
+    Keeps function names up to date while analysis adds or changes functions.
+
+    Added and updated functions with generated names are queued. Once no new notification arrived for
+    the debounce delay, the queue is handed to an AutoRenameFunctions task as one batch. Notifications
+    that arrive while a batch is running are queued for the next one, and a function queued several
+    times is only renamed once.
+
+    Attributes:
+        client (OllamaClient): The Ollama client instance.
+        bv (BinaryView): The BinaryView whose functions are renamed.
+        debounce (float): Seconds without notifications before a batch is started.
+        pending (set): The start addresses of queued functions.
+        versions (dict): Maps the start address of every function sent to the model to the version of
+            its HLIL at the time, so functions whose code did not change are not sent again.
+        task (AutoRenameFunctions): The running batch, None when idle.
+    """
+    DEBOUNCE = 2.0
+
+    def __init__(self, client, bv, debounce=DEBOUNCE):
+        """
+        Initialize the AutoRenamer.
+
+        Args:
+            client (OllamaClient): The Ollama client instance.
+            bv (BinaryView): The BinaryView whose functions are renamed.
+            debounce (float): Seconds without notifications before a batch is started.
+        """
+        super().__init__(_NOTIFICATIONS)
+        self.client = client
+        self.bv = bv
+        self.debounce = debounce
+        self.pending = set()
+        self.versions = {}
+        self.task = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        """
+        Register for the analysis notifications of the BinaryView.
+        """
+        self._running = True
+        self.bv.register_notification(self)
+        log_info("Automatic renaming of new and changed functions enabled")
+
+    def stop(self):
+        """
+        Unregister from the notifications and drop the queue. A running batch is cancelled.
+        """
+        self._running = False
+        self.bv.unregister_notification(self)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.pending.clear()
+            if self.task is not None:
+                self.task.cancel()
+        log_info("Automatic renaming of new and changed functions disabled")
+
+    def function_added(self, view, func):
+        """
+        Queue a function analysis added.
+
+        Args:
+            view (BinaryView): The BinaryView.
+            func (Function): The added function.
+        """
+        self.enqueue(func)
+
+    def function_updated(self, view, func):
+        """
+        Queue a function whose analysis was updated.
+
+        Args:
+            view (BinaryView): The BinaryView.
+            func (Function): The updated function.
+        """
+        self.enqueue(func)
+
+    def enqueue(self, func):
+        """
+        Queue a function if it still has a generated name, and restart the debounce delay.
+
+        Runs on the analysis thread, so it only records the address.
+
+        Args:
+            func (Function): The function.
+        """
+        if not self._running or not (func.name.startswith("sub_") or func.name.startswith("func_")):
+            return
+        with self._lock:
+            self.pending.add(func.start)
+            self._schedule()
+
+    def _schedule(self):
+        """
+        Restart the debounce delay. Must be called with the lock held.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self._flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush(self):
+        """
+        Hand the queued functions to a new batch, unless one is still running.
+        """
+        with self._lock:
+            self._timer = None
+            if not self._running or self.task is not None or not self.pending:
+                return
+            addresses, self.pending = self.pending, set()
+            self.task = AutoRenameFunctions(self.client, self.bv, self, addresses)
+        self.task.start()
+
+    def finished(self):
+        """
+        Called by a batch when it is done. Starts the next batch if functions were queued meanwhile.
+        """
+        with self._lock:
+            self.task = None
+            if self._running and self.pending:
+                self._schedule()
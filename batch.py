@@ -0,0 +1,464 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from multiprocessing.managers import BaseManager
+import binaryninja
+from binaryninja import log_info, log_warn
+from .ollama_client import OllamaClient
+from .rename_tasks import FunctionRenamer
+from .similarity import SimilarityIndex
+from .telemetry import TaskTelemetry
+
+# The BrokerClient of a worker process, set up by _init_worker.
+_broker_client = None
+
+class RequestBroker:
+    """
+    Serves the naming requests of every batch worker process from the one OllamaClient of the parent.
+
+    All workers share the client's endpoint pool, response cache and telemetry, and the number of
+    requests in flight across all workers is bounded by the client's parallel request setting.
+
+    Attributes:
+        client (OllamaClient): The Ollama client instance.
+        telemetry (TaskTelemetry): The counters of the batch run.
+    """
+    def __init__(self, client, telemetry):
+        """
+        Initialize the RequestBroker.
+
+        Args:
+            client (OllamaClient): The Ollama client instance.
+            telemetry (TaskTelemetry): The counters of the batch run.
+        """
+        self.client = client
+        self.telemetry = telemetry
+        self._slots = threading.BoundedSemaphore(client.get_parallel_requests())
+
+    def settings(self):
+        """
+        Get the settings workers need to prepare their requests.
+
+        Returns:
+            dict: The parallel request, prompt token budget, pack token budget, rename chunk size, HLIL
+                prefetch buffer and similarity threshold settings.
+        """
+        return {
+            "parallel_requests": self.client.get_parallel_requests(),
+            "prompt_token_budget": self.client.get_prompt_token_budget(),
+            "pack_token_budget": self.client.get_pack_token_budget(),
+            "rename_chunk_size": self.client.get_rename_chunk_size(),
+            "prefetch_megabytes": self.client.get_prefetch_megabytes(),
+            "similarity_threshold": self.client.get_similarity_index().threshold,
+        }
+
+    def get_function_name(self, hlil):
+        """
+        Get a suggested name for a function.
+
+        Args:
+            hlil (str): The HLIL decompiled code snippet.
+
+        Returns:
+            str: The suggested function name.
+        """
+        with self._slots:
+            return self.client.get_function_name(hlil, self.telemetry)
+
+    def get_function_names(self, hlils):
+        """
+        Get suggested names for several small functions with a single request.
+
+        Args:
+            hlils (list): The HLIL decompiled code snippet of every function.
+
+        Returns:
+            list: The suggested function names, in the order of hlils.
+        """
+        with self._slots:
+            return self.client.get_function_names(hlils, self.telemetry)
+
+    def lookup_similar(self, signature):
+        """
+        Find the accepted name of the most similar function in the similarity index.
+
+        Args:
+            signature (bytes): The signature of the function to name.
+
+        Returns:
+            str: The name, or None if no indexed function is similar enough.
+        """
+        return self.client.get_similarity_index().lookup(signature)
+
+    def add_similar(self, entries):
+        """
+        Store accepted names in the similarity index.
+
+        Args:
+            entries (list): (signature, name) tuples.
+        """
+        self.client.get_similarity_index().add_many(entries)
+
+class BrokerManager(BaseManager):
+    """
+    Exposes the RequestBroker of the parent process to the worker processes.
+    """
+
+class RemoteSimilarityIndex:
+    """
+    Stands in for the SimilarityIndex inside a worker process. Signatures are computed in the worker,
+    lookups and updates go to the index of the parent through the RequestBroker.
+
+    Attributes:
+        threshold (float): The similarity threshold of the parent's index, 0 if it is disabled.
+    """
+    signature = SimilarityIndex.signature
+
+    def __init__(self, broker, threshold):
+        """
+        Initialize the RemoteSimilarityIndex.
+
+        Args:
+            broker (RequestBroker): A proxy of the parent's RequestBroker.
+            threshold (float): The similarity threshold of the parent's index.
+        """
+        self.broker = broker
+        self.threshold = threshold
+
+    def lookup(self, signature):
+        """
+        Find the name of the most similar indexed function.
+
+        Args:
+            signature (bytes): The signature of the function to name.
+
+        Returns:
+            str: The name, or None if no indexed function is similar enough.
+        """
+        if not self.threshold or signature is None:
+            return None
+        return self.broker.lookup_similar(signature)
+
+    def add_many(self, entries):
+        """
+        Store accepted names.
+
+        Args:
+            entries (list): (signature, name) tuples.
+        """
+        entries = [(signature, name) for signature, name in entries if signature is not None]
+        if entries:
+            self.broker.add_similar(entries)
+
+class BrokerClient:
+    """
+    Stands in for the OllamaClient inside a worker process and forwards every request to the RequestBroker.
+    """
+    PACKED_FUNCTION_MAX_LINES = OllamaClient.PACKED_FUNCTION_MAX_LINES
+
+    def __init__(self, broker):
+        """
+        Initialize the BrokerClient.
+
+        Args:
+            broker (RequestBroker): A proxy of the parent's RequestBroker.
+        """
+        self.broker = broker
+        self.settings = broker.settings()
+        self.similarity = RemoteSimilarityIndex(broker, self.settings["similarity_threshold"])
+
+    def get_parallel_requests(self):
+        """
+        Get the maximum number of requests this worker keeps in flight.
+
+        Returns:
+            int: The maximum number of concurrent requests.
+        """
+        return self.settings["parallel_requests"]
+
+    def get_prompt_token_budget(self):
+        """
+        Get the maximum number of tokens the HLIL of a function may take up in a prompt.
+
+        Returns:
+            int: The prompt token budget.
+        """
+        return self.settings["prompt_token_budget"]
+
+    def get_pack_token_budget(self):
+        """
+        Get the maximum number of HLIL tokens of small functions packed into one request.
+
+        Returns:
+            int: The pack token budget, 0 if packing is disabled.
+        """
+        return self.settings["pack_token_budget"]
+
+    def get_rename_chunk_size(self):
+        """
+        Get the number of suggested function names applied to the BinaryView at once.
+
+        Returns:
+            int: The rename chunk size.
+        """
+        return self.settings["rename_chunk_size"]
+
+    def get_prefetch_megabytes(self):
+        """
+        Get the amount of HLIL this worker may prepare ahead of its requests.
+
+        Returns:
+            float: The size of the HLIL prefetch buffer in megabytes.
+        """
+        return self.settings["prefetch_megabytes"]
+
+    def get_similarity_index(self):
+        """
+        Get the similarity index of the parent process.
+
+        Returns:
+            RemoteSimilarityIndex: The similarity index.
+        """
+        return self.similarity
+
+    def get_function_name(self, hlil, telemetry=None, function=None):
+        """
+        Get a suggested name for a function from the RequestBroker.
+
+        Args:
+            hlil (str): The HLIL decompiled code snippet.
+            telemetry (TaskTelemetry, optional): Unused, requests are recorded by the broker.
+            function (int, optional): Unused, contexts are not shared between processes.
+
+        Returns:
+            str: The suggested function name.
+        """
+        return self.broker.get_function_name(hlil)
+
+    def get_function_names(self, hlils, telemetry=None):
+        """
+        Get suggested names for several small functions from the RequestBroker.
+
+        Args:
+            hlils (list): The HLIL decompiled code snippet of every function.
+            telemetry (TaskTelemetry, optional): Unused, requests are recorded by the broker.
+
+        Returns:
+            list: The suggested function names, in the order of hlils.
+        """
+        return self.broker.get_function_names(hlils)
+
+def _init_worker(address, authkey, initializer=None):
+    """
+    Connect a worker process to the RequestBroker.
+
+    Args:
+        address (tuple): The address of the broker server.
+        authkey (bytes): The authentication key of the broker server.
+        initializer (callable, optional): Called first, e.g. to set up a stub binaryninja module.
+    """
+    global _broker_client
+    if initializer is not None:
+        initializer()
+    BrokerManager.register("broker")
+    manager = BrokerManager(address=address, authkey=authkey)
+    manager.connect()
+    _broker_client = BrokerClient(manager.broker())
+
+def output_names(paths):
+    """
+    Choose the names of the output files of every binary.
+
+    A binary's output is named after its file without the extension. Binaries whose names collide,
+    e.g. a/libfoo.so and b/libfoo.so, get a short hash of their absolute path appended.
+
+    Args:
+        paths (list): The binaries or databases to rename.
+
+    Returns:
+        dict: Maps every path to the name of its output files.
+    """
+    bases = {path: os.path.splitext(os.path.basename(path))[0] for path in paths}
+    counts = {}
+    for base in bases.values():
+        counts[base] = counts.get(base, 0) + 1
+    names = {}
+    for path, base in bases.items():
+        if counts[base] > 1:
+            digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+            base = f"{base}-{digest}"
+        names[path] = base
+    return names
+
+def rename_binary(path, output_directory, save=False, resume=False, name=None):
+    """
+    Rename all functions of one binary in a worker process.
+
+    The binary is opened in its own BinaryView, its suggested names are written to
+    <output_directory>/<name>.names.json and, if requested, the renamed database is saved next to it.
+
+    Args:
+        path (str): The binary or database to rename.
+        output_directory (str): The directory results are written to.
+        save (bool): Whether to save the renamed database as <output_directory>/<name>.bndb.
+        resume (bool): Whether to continue from the checkpoint of an interrupted run.
+        name (str, optional): The name of the output files, see output_names. Defaults to the file
+            name of the binary without the extension.
+
+    Returns:
+        dict: The summary of the binary.
+    """
+    started = time.monotonic()
+    bv = binaryninja.load(path)
+    if bv is None:
+        raise ValueError(f"Binary Ninja could not open {path}")
+    try:
+        names = FunctionRenamer(_broker_client, bv, resume).run(TaskTelemetry(os.path.basename(path)))
+        base = name or os.path.splitext(os.path.basename(path))[0]
+        output = os.path.join(output_directory, f"{base}.names.json")
+        with open(output, "w") as f:
+            json.dump({"binary": path, "names": {hex(address): name for address, name in sorted(names.items())}}, f, indent=2)
+        database = None
+        if save:
+            database = os.path.join(output_directory, f"{base}.bndb")
+            bv.create_database(database)
+    finally:
+        bv.file.close()
+    return {
+        "binary": path,
+        "names": output,
+        "database": database,
+        "renamed": sum(1 for name in names.values() if name),
+        "unnamed": sum(1 for name in names.values() if not name),
+        "seconds": time.monotonic() - started,
+    }
+
+def run_batch(client, paths, output_directory, jobs, save=False, resume=False, initializer=None):
+    """
+    Rename all functions of many binaries with a pool of worker processes.
+
+    Each worker opens its own BinaryView, while every request goes through one RequestBroker in this
+    process, so the workers share the client's endpoints, response cache and concurrency limit.
+    Workers are spawned rather than forked, since the Binary Ninja core is not fork-safe. Paths listed
+    more than once are renamed once, and binaries with the same file name get distinct output files.
+
+    Args:
+        client (OllamaClient): The Ollama client instance.
+        paths (list): The binaries or databases to rename.
+        output_directory (str): The directory results are written to.
+        jobs (int): The number of worker processes.
+        save (bool): Whether to save the renamed databases.
+        resume (bool): Whether to continue interrupted runs from their checkpoints.
+        initializer (callable, optional): Called first in every worker process.
+
+    Returns:
+        dict: The summary of the run, also written to <output_directory>/summary.json.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    unique = list(dict.fromkeys(paths))
+    if len(unique) < len(paths):
+        log_warn(f"Skipping {len(paths) - len(unique)} binaries listed more than once")
+    paths = unique
+    names = output_names(paths)
+    telemetry = client.get_telemetry().start("BatchRename")
+    broker = RequestBroker(client, telemetry)
+    BrokerManager.register("broker", callable=lambda: broker)
+    authkey = os.urandom(32)
+    server = BrokerManager(address=("127.0.0.1", 0), authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, name="ollama-batch-broker", daemon=True).start()
+
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, jobs), mp_context=get_context("spawn"), initializer=_init_worker,
+                                 initargs=(server.address, authkey, initializer)) as pool:
+            futures = {pool.submit(rename_binary, path, output_directory, save, resume, names[path]): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    log_info(f"Renamed {result['renamed']} functions of {result['binary']} in {result['seconds']:.1f}s")
+                except Exception as e:
+                    result = {"binary": futures[future], "error": str(e)}
+                    log_warn(f"Failed to rename {futures[future]}: {e}")
+                results.append(result)
+    finally:
+        server.stop_event.set()
+
+    summary = {"binaries": sorted(results, key=lambda result: result["binary"]), "telemetry": telemetry.report()}
+    with open(os.path.join(output_directory, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def read_paths(arguments):
+    """
+    Expand the binary arguments of the command line. An argument starting with @ names a file
+    listing one binary per line.
+
+    Args:
+        arguments (list): The command line arguments.
+
+    Returns:
+        list: The paths of the binaries.
+    """
+    paths = []
+    for argument in arguments:
+        if argument.startswith("@"):
+            with open(argument[1:]) as f:
+                paths.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        else:
+            paths.append(argument)
+    return paths
+
+def main(argv=None):
+    """
+    Run the headless batch rename from the command line.
+
+    Args:
+        argv (list, optional): The command line arguments, defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Rename all functions of many binaries with Ollama, without the UI.")
+    parser.add_argument("binaries", nargs="+", help="binaries or .bndb databases, or @file listing one per line")
+    parser.add_argument("--host", default="localhost", help="ollama host, several separated by commas")
+    parser.add_argument("--port", default="11434")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--fast-model", help="model asked first, escalating doubtful names to --model")
+    parser.add_argument("--cascade-samples", type=int, default=2,
+                        help="answers sampled from the fast model to estimate its confidence")
+    parser.add_argument("--cascade-confidence", type=float, default=0.5,
+                        help="share of samples that must agree with a fast answer to keep it")
+    parser.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="number of binaries analyzed at once")
+    parser.add_argument("--parallel-requests", type=int, default=4,
+                        help="requests kept in flight across all binaries")
+    parser.add_argument("--prompt-token-budget", type=int, default=4000)
+    parser.add_argument("--pack-token-budget", type=int, default=1000)
+    parser.add_argument("--keep-alive", default="30m")
+    parser.add_argument("--similarity-threshold", type=float, default=0.8,
+                        help="reuse accepted names of functions at least this similar, 0 to disable")
+    parser.add_argument("--output", default="ollama-names", help="directory for the JSON results and databases")
+    parser.add_argument("--save", action="store_true", help="save the renamed databases as .bndb files")
+    parser.add_argument("--resume", action="store_true", help="continue interrupted binaries from their checkpoints")
+    args = parser.parse_args(argv)
+
+    client = OllamaClient(None)
+    client.set_host(args.host)
+    client.set_port(args.port)
+    client.set_parallel_requests(args.parallel_requests)
+    client.set_prompt_token_budget(args.prompt_token_budget)
+    client.set_pack_token_budget(args.pack_token_budget)
+    client.set_keep_alive(args.keep_alive)
+    client.get_similarity_index().threshold = args.similarity_threshold
+    client.init_client()
+    client.set_model(args.model)
+    client.set_fast_model(args.fast_model)
+    client.set_cascade_samples(args.cascade_samples)
+    client.set_cascade_confidence(args.cascade_confidence)
+
+    summary = run_batch(client, read_paths(args.binaries), args.output, args.jobs, args.save, args.resume)
+    failed = [result for result in summary["binaries"] if "error" in result]
+    print(f"Renamed {len(summary['binaries']) - len(failed)} binaries, {len(failed)} failed. "
+          f"Summary written to {os.path.join(args.output, 'summary.json')}")
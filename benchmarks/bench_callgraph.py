@@ -0,0 +1,91 @@
+"""
+Benchmark the call-graph traversal used by "Rename all functions" against synthetic call graphs.
+
+Run from the plugin directory:
+
+    python benchmarks/bench_callgraph.py --sizes 10000 100000 1000000 --json callgraph.json
+
+Binary Ninja is not required. Pass --networkx to also time the previous networkx based traversal
+when networkx is installed.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from harness import load_plugin_module
+from fake_binaryninja import SyntheticBinaryView
+
+def time_traversal(traverse, bv, measure_memory):
+    """
+    Time a traversal and optionally measure its peak memory.
+
+    Args:
+        traverse (callable): Takes the BinaryView and returns an iterator of functions.
+        bv (SyntheticBinaryView): The synthetic binary.
+        measure_memory (bool): Whether to trace allocations, which slows the run down.
+
+    Returns:
+        dict: The time to the first function, the total time, the number of functions and the peak memory.
+    """
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    iterator = iter(traverse(bv))
+    next(iterator)
+    first = time.perf_counter() - start
+    count = 1 + sum(1 for _ in iterator)
+    total = time.perf_counter() - start
+    peak = None
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"first_seconds": first, "total_seconds": total, "functions": count, "peak_bytes": peak}
+
+def networkx_traversal(bv):
+    """
+    The previous traversal: a networkx DiGraph of function objects and a DFS post-order.
+
+    Args:
+        bv (SyntheticBinaryView): The synthetic binary.
+
+    Returns:
+        iterator: The functions in DFS post-order.
+    """
+    import networkx as nx
+    by_address = {function.start: function for function in bv.functions}
+    call_graph = nx.DiGraph()
+    call_graph.add_nodes_from(bv.functions)
+    for function in bv.functions:
+        for address in function.callee_addresses:
+            call_graph.add_edge(function, by_address[address])
+    return nx.dfs_postorder_nodes(call_graph)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--memory", action="store_true", help="measure peak memory with tracemalloc")
+    parser.add_argument("--networkx", action="store_true", help="also time the networkx traversal")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    utils = load_plugin_module("utils")
+    results = []
+    for size in args.sizes:
+        bv = SyntheticBinaryView(size)
+        engines = [("callgraph", utils.traverse_functions_bottom_up)]
+        if args.networkx:
+            engines.append(("networkx", networkx_traversal))
+        for engine, traverse in engines:
+            result = {"benchmark": "traverse_functions_bottom_up", "engine": engine, "size": size}
+            result.update(time_traversal(traverse, bv, args.memory))
+            results.append(result)
+            peak = f"{result['peak_bytes'] / 2 ** 20:8.1f} MiB" if result["peak_bytes"] is not None else ""
+            print(f"{engine:10} {size:>9} functions  first {result['first_seconds']:8.3f}s  "
+                  f"total {result['total_seconds']:8.3f}s  {peak}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure how long Binary Ninja takes to load the plugin, and which heavy modules loading pulls in.
+
+Run from the plugin directory:
+
+    python benchmarks/bench_import.py --repeat 5 --max-ms 50 --json import.json
+
+Every measurement imports the plugin package, including the command registrations of __init__.py,
+in a fresh interpreter after binaryninja is imported, so only the plugin's own cost is counted. The
+time of the first Ollama command creating the client is measured separately. The script exits with
+an error if --max-ms is exceeded or loading imports any of the modules that should only be imported
+once an Ollama command runs, so load time regressions fail loudly.
+
+Binary Ninja is not required.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from harness import PACKAGE, PLUGIN_DIR
+
+# Modules that are only needed once an Ollama command runs.
+DEFERRED_MODULES = ["ollama", "httpx", "PySide6", "asyncio"]
+
+MEASURE = """
+import importlib.util, json, os, sys, time
+sys.path.insert(0, {benchmarks!r})
+try:
+    import binaryninja
+except ImportError:
+    from fake_binaryninja import install
+    install()
+before = set(sys.modules)
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location({package!r}, os.path.join({plugin!r}, "__init__.py"),
+                                              submodule_search_locations=[{plugin!r}])
+package = importlib.util.module_from_spec(spec)
+sys.modules[{package!r}] = package
+spec.loader.exec_module(package)
+load = time.perf_counter() - started
+loaded = set(sys.modules) - before
+started = time.perf_counter()
+package.plugin.get_client(None)
+first_command = time.perf_counter() - started
+print(json.dumps({{"load_seconds": load, "first_command_seconds": first_command, "modules": len(loaded),
+                  "deferred_loaded": sorted(name for name in {deferred!r} if name in loaded)}}))
+"""
+
+def measure():
+    """
+    Load the plugin in a fresh interpreter.
+
+    Returns:
+        dict: The load time, the time of the first command, the number of modules loading imported
+            and the deferred modules among them.
+    """
+    code = MEASURE.format(benchmarks=sys.path[0], package=PACKAGE, plugin=PLUGIN_DIR, deferred=DEFERRED_MODULES)
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(f"Loading the plugin failed:\n{process.stderr}")
+    return json.loads(process.stdout.splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="number of fresh interpreters to measure")
+    parser.add_argument("--max-ms", type=float, help="fail if the median load time exceeds this many milliseconds")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    result = {
+        "benchmark": "plugin_import",
+        "load_seconds": statistics.median(run["load_seconds"] for run in runs),
+        "first_command_seconds": statistics.median(run["first_command_seconds"] for run in runs),
+        "modules": runs[-1]["modules"],
+        "deferred_loaded": runs[-1]["deferred_loaded"],
+    }
+    print(f"load {result['load_seconds'] * 1000:8.1f} ms  first command {result['first_command_seconds'] * 1000:8.1f} ms  "
+          f"{result['modules']} modules")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    if result["deferred_loaded"]:
+        print(f"Loading the plugin imported {', '.join(result['deferred_loaded'])}")
+        failed = True
+    if args.max_ms is not None and result["load_seconds"] * 1000 > args.max_ms:
+        print(f"Load time exceeds {args.max_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
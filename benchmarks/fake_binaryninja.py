@@ -0,0 +1,370 @@
+"""
+A stand-in for the parts of the binaryninja module the plugin uses, plus a synthetic BinaryView.
+
+install() registers this module as "binaryninja", so the plugin can be imported and its tasks run
+without a Binary Ninja license. SyntheticBinaryView generates call graphs and HLIL of controllable
+size; HLIL is generated on access, so views with 100k+ functions stay small in memory.
+"""
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+
+_user_directory = tempfile.mkdtemp(prefix="binaryninja-ollama-bench-")
+_log = []
+
+def install(user_directory=None, quiet=True):
+    """
+    Register this module as the binaryninja module.
+
+    Args:
+        user_directory (str, optional): The directory returned by user_directory().
+        quiet (bool): Whether to drop log messages instead of printing them.
+    """
+    global _user_directory, _quiet
+    if user_directory is not None:
+        _user_directory = user_directory
+    _quiet = quiet
+    sys.modules["binaryninja"] = sys.modules[__name__]
+
+_quiet = True
+
+def _emit(level, message):
+    if not _quiet:
+        print(f"[{level}] {message}")
+
+def log_info(message):
+    _emit("info", message)
+
+def log_warn(message):
+    _emit("warn", message)
+
+def log_error(message):
+    _emit("error", message)
+
+def log_debug(message):
+    pass
+
+def user_directory():
+    return _user_directory
+
+def show_message_box(title, text, buttons=0, icon=0):
+    _emit("message", f"{title}: {text}")
+    return MessageBoxButtonResult.OKButton
+
+def load(path, update_analysis=True, options=None):
+    """
+    Open a synthetic view. Paths named like "synthetic-<size>-<seed>" choose the size and seed.
+
+    Args:
+        path (str): The path of the binary.
+
+    Returns:
+        SyntheticBinaryView: The view.
+    """
+    match = re.search(r"synthetic-(\d+)-(\d+)", os.path.basename(path))
+    size, seed = (int(match.group(1)), int(match.group(2))) if match else (1000, 0)
+    view = SyntheticBinaryView(size, seed=seed)
+    view.file.filename = path
+    return view
+
+def execute_on_main_thread(function):
+    function()
+
+def execute_on_main_thread_and_wait(function):
+    function()
+
+class MessageBoxButtonSet:
+    OKButtonSet = 0
+    YesNoButtonSet = 1
+    YesNoCancelButtonSet = 2
+
+class MessageBoxIcon:
+    InformationIcon = 0
+    QuestionIcon = 1
+    WarningIcon = 2
+    ErrorIcon = 3
+
+class MessageBoxButtonResult:
+    NoButton = 0
+    YesButton = 1
+    OKButton = 2
+    CancelButton = 3
+
+class PluginCommand:
+    """
+    Records command registrations instead of adding them to a UI.
+    """
+    commands = []
+
+    @classmethod
+    def register(cls, name, description, action, is_valid=None):
+        cls.commands.append((name, description, action))
+
+    register_for_address = register
+    register_for_function = register
+    register_for_high_level_il_function = register
+    register_for_high_level_il_instruction = register
+
+class BackgroundTaskThread(threading.Thread):
+    """
+    A background task running on a plain thread.
+
+    Attributes:
+        progress (str): The progress text of the task.
+        cancelled (bool): Whether the task was cancelled.
+    """
+    def __init__(self, initial_progress_text="", can_cancel=False):
+        super().__init__(daemon=True)
+        self.progress = initial_progress_text
+        self.can_cancel = can_cancel
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def finish(self):
+        pass
+
+class BinaryDataNotification:
+    """
+    Base class of analysis notifications. SyntheticBinaryView only sends them from notify_function_updated.
+    """
+    def __init__(self, notifications=None):
+        self.notifications = notifications
+
+class BasicBlock:
+    """
+    An HLIL basic block that is reachable from the entry block.
+    """
+    start = 0
+    incoming_edges = ()
+
+_BLOCK = BasicBlock()
+
+class Variable:
+    """
+    A function variable whose name can be changed. Renaming it makes it user-defined and updates the
+    analysis of its function.
+
+    Attributes:
+        name (str): The name of the variable.
+    """
+    def __init__(self, name, function=None):
+        self._name = name
+        self._function = function
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = name
+        if self._function is not None:
+            self._function._user_variables.add(self)
+            self._function.update_analysis()
+
+    def __repr__(self):
+        return self.name
+
+class HighLevelILInstruction:
+    """
+    One HLIL line of a synthetic function.
+
+    Attributes:
+        address (int): The address of the instruction.
+        vars (list): The variables the instruction uses.
+        il_basic_block (BasicBlock): The block of the instruction.
+    """
+    def __init__(self, address, render, variables):
+        self.address = address
+        self._render = render
+        self.vars = variables
+        self.il_basic_block = _BLOCK
+
+    def __str__(self):
+        return self._render()
+
+class HighLevelILFunction:
+    """
+    The HLIL of a synthetic function.
+
+    Attributes:
+        source_function (Function): The function the HLIL belongs to.
+        instructions (list): The HLIL lines.
+    """
+    def __init__(self, source_function, instructions):
+        self.source_function = source_function
+        self.instructions = instructions
+        self._analysis = source_function._analysis
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        return (isinstance(other, HighLevelILFunction) and self.source_function is other.source_function
+                and self._analysis == other._analysis)
+
+    def __hash__(self):
+        return hash((self.source_function.start, self._analysis))
+
+class Function:
+    """
+    A synthetic function. Its HLIL is generated on access and mentions the current names of its
+    callees, so renames propagate into the prompts of callers like in Binary Ninja. As in Binary Ninja,
+    HLIL objects compare equal until the analysis of the function is updated.
+
+    Attributes:
+        view (SyntheticBinaryView): The view the function belongs to.
+        start (int): The start address.
+        name (str): The name of the function.
+        callee_addresses (list): The addresses of the functions it calls.
+        lines (int): The number of HLIL lines.
+    """
+    def __init__(self, view, start, lines, seed):
+        self.view = view
+        self.start = start
+        self.name = f"sub_{start:x}"
+        self.callee_addresses = []
+        self.lines = lines
+        self._seed = seed
+        self._variables = None
+        self._user_variables = set()
+        self._analysis = 0
+
+    @property
+    def total_bytes(self):
+        return self.lines * 12
+
+    @property
+    def callees(self):
+        return [self.view.get_function_at(address) for address in self.callee_addresses]
+
+    @property
+    def variables(self):
+        if self._variables is None:
+            count = max(1, min(40, self.lines // 3))
+            self._variables = [Variable(f"var_{i * 8 + 8:x}", self) for i in range(count)]
+        return self._variables
+
+    def update_analysis(self):
+        self._analysis += 1
+
+    def is_var_user_defined(self, var):
+        return var in self._user_variables
+
+    @property
+    def hlil(self):
+        rng = random.Random(self._seed)
+        variables = self.variables
+        instructions = []
+        callees = self.callee_addresses
+        for i in range(self.lines):
+            address = self.start + i * 4
+            used = [variables[rng.randrange(len(variables))], variables[rng.randrange(len(variables))]]
+            if callees and i % 5 == 1:
+                callee = self.view.get_function_at(callees[(i // 5) % len(callees)])
+                instructions.append(HighLevelILInstruction(
+                    address, lambda callee=callee, used=used: f"{used[0].name} = {callee.name}({used[1].name})", used))
+            elif i % 7 == 3:
+                constant = rng.randrange(1 << 16)
+                instructions.append(HighLevelILInstruction(
+                    address, lambda used=used, constant=constant: f"if ({used[0].name} == {constant:#x})", used[:1]))
+            else:
+                constant = rng.randrange(1 << 12)
+                instructions.append(HighLevelILInstruction(
+                    address, lambda used=used, constant=constant: f"{used[0].name} = {used[1].name} + {constant:#x}", used))
+        return HighLevelILFunction(self, instructions)
+
+class FileMetadata:
+    """
+    The file of a synthetic view.
+
+    Attributes:
+        filename (str): The name of the database.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    def close(self):
+        pass
+
+class SyntheticBinaryView:
+    """
+    A BinaryView stand-in with a random call graph and HLIL of controllable size.
+
+    Most calls go to functions with a lower index, as in a layered program, while a small share
+    points upwards and forms recursive clusters.
+
+    Attributes:
+        functions (list): The synthetic functions.
+        file (FileMetadata): The file of the view.
+    """
+    def __init__(self, size, mean_callees=4, mean_lines=20, recursion=0.02, seed=0):
+        """
+        Initialize the SyntheticBinaryView.
+
+        Args:
+            size (int): The number of functions.
+            mean_callees (float): The mean number of callees per function.
+            mean_lines (float): The mean number of HLIL lines per function.
+            recursion (float): The share of calls that point to a function with a higher index.
+            seed (int): The random seed.
+        """
+        rng = random.Random(seed)
+        self.file = FileMetadata(f"synthetic-{size}-{seed}.bndb")
+        self.functions = [Function(self, 0x400000 + i * 0x100, 1 + int(rng.expovariate(1 / mean_lines)), rng.random())
+                          for i in range(size)]
+        self._by_address = {function.start: function for function in self.functions}
+        self._metadata = {}
+        self._notifications = []
+        for i, function in enumerate(self.functions):
+            for _ in range(int(rng.expovariate(1 / mean_callees))):
+                if i and rng.random() > recursion:
+                    j = rng.randrange(i)
+                else:
+                    j = rng.randrange(size)
+                function.callee_addresses.append(self.functions[j].start)
+
+    def get_function_at(self, address):
+        return self._by_address.get(address)
+
+    def get_functions_containing(self, address):
+        function = self._by_address.get(address & ~0xff)
+        return [function] if function is not None else []
+
+    def begin_undo_actions(self):
+        return "undo"
+
+    def commit_undo_actions(self, *args):
+        pass
+
+    def store_metadata(self, key, value):
+        self._metadata[key] = value
+
+    def query_metadata(self, key):
+        return self._metadata[key]
+
+    def register_notification(self, notification):
+        self._notifications.append(notification)
+
+    def unregister_notification(self, notification):
+        self._notifications.remove(notification)
+
+    def notify_function_updated(self, function):
+        for notification in list(self._notifications):
+            notification.function_updated(self, function)
+
+    def update_analysis(self):
+        pass
+
+    def create_database(self, path):
+        with open(path, "w") as f:
+            json.dump({hex(function.start): function.name for function in self.functions}, f)
+        return True
+
+BinaryView = SyntheticBinaryView
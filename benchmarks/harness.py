@@ -0,0 +1,34 @@
+"""
+Helpers shared by the benchmark scripts: importing plugin modules outside of Binary Ninja.
+"""
+import importlib
+import os
+import sys
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "binaryninja_ollama"
+
+def load_plugin_module(name):
+    """
+    Import a module of the plugin without running its __init__.py, which registers UI commands.
+
+    If Binary Ninja is not installed, the fake_binaryninja stand-in is registered in its place.
+
+    Args:
+        name (str): The module name, e.g. "callgraph".
+
+    Returns:
+        module: The imported module.
+    """
+    if "binaryninja" not in sys.modules:
+        try:
+            import binaryninja
+        except ImportError:
+            from fake_binaryninja import install
+            install()
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
@@ -0,0 +1,314 @@
+"""
+A local mock of the Ollama HTTP API with configurable latency and generation speed.
+
+Supports /api/generate (streaming and non-streaming, including JSON formats and schemas for single
+names, batched variable names and packed function names), /api/tags and /api/version. Names are derived from a hash of the prompt, so runs are
+deterministic. After the name the mock keeps "explaining" until num_predict is reached, like a
+chatty model, and pads JSON answers with whitespace like models constrained to a JSON format, so the
+generated token counts and disconnects show how early the client stops a generation.
+
+Run standalone to point a real Binary Ninja session at it:
+
+    python benchmarks/mock_ollama.py --port 11500 --latency 0.05 --tokens-per-second 80
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERBS = ["parse", "init", "read", "write", "handle", "process", "check", "update", "free", "alloc", "send", "decode"]
+NOUNS = ["header", "buffer", "packet", "config", "entry", "table", "string", "state", "request", "node", "file", "key"]
+CHATTER = " This function appears to handle the data passed in by the caller and returns a status code."
+JSON_PADDING = "\n" * 64
+
+_VARIABLES = re.compile(r"For each of the variables (.*?) in the above")
+_QUOTED = re.compile(r"'([^']+)'")
+_PACKED_FUNCTION = re.compile(r"Function (\d+):\n(.*?)\n\n", re.S)
+
+def name_for(text, salt=""):
+    """
+    Derive a deterministic identifier from text.
+
+    Args:
+        text (str): The text to derive the name from.
+        salt (str): Extra text to tell several names for one prompt apart.
+
+    Returns:
+        str: The identifier.
+    """
+    digest = hashlib.sha1((salt + text).encode("utf-8")).digest()
+    return f"{VERBS[digest[0] % len(VERBS)]}_{NOUNS[digest[1] % len(NOUNS)]}"
+
+def tokenize(text):
+    """
+    Split text into pseudo tokens of up to four characters.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The tokens.
+    """
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+class MockOllamaStats:
+    """
+    Counters of the requests the mock server handled.
+
+    Attributes:
+        requests (int): The number of generate requests.
+        prompt_tokens (list): The estimated prompt tokens of every generate request.
+        generated_tokens (int): The number of tokens sent back.
+        disconnects (int): The number of streams the client closed before they finished.
+        in_flight (int): The number of generate requests being handled.
+        max_in_flight (int): The highest number of concurrent generate requests.
+        busy_seconds (float): The summed time generate requests were handled.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = []
+        self.generated_tokens = 0
+        self.disconnects = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def to_dict(self):
+        """
+        Get the counters as a dict.
+
+        Returns:
+            dict: The counters.
+        """
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens_total": sum(self.prompt_tokens),
+                "prompt_tokens_mean": sum(self.prompt_tokens) / len(self.prompt_tokens) if self.prompt_tokens else 0.0,
+                "prompt_tokens_max": max(self.prompt_tokens, default=0),
+                "generated_tokens": self.generated_tokens,
+                "disconnects": self.disconnects,
+                "max_in_flight": self.max_in_flight,
+                "busy_seconds": self.busy_seconds,
+            }
+
+class MockOllamaServer:
+    """
+    A threaded HTTP server imitating an Ollama server.
+
+    Attributes:
+        latency (float): Fixed seconds added to every generate request.
+        prompt_tokens_per_second (float): The speed prompts are evaluated at.
+        tokens_per_second (float): The speed tokens are generated at.
+        stats (MockOllamaStats): The request counters.
+        url (str): The URL of the server once started.
+        killed (bool): Whether the server was killed, see kill.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.005, prompt_tokens_per_second=20000.0,
+                 tokens_per_second=400.0, model="mock:latest"):
+        """
+        Initialize the MockOllamaServer.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on, 0 for any free port.
+            latency (float): Fixed seconds added to every generate request.
+            prompt_tokens_per_second (float): The speed prompts are evaluated at.
+            tokens_per_second (float): The speed tokens are generated at.
+            model (str): The model name listed by /api/tags.
+        """
+        self.latency = latency
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.tokens_per_second = tokens_per_second
+        self.model = model
+        self.stats = MockOllamaStats()
+        self.killed = False
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        """
+        Serve requests on a background thread.
+
+        Returns:
+            MockOllamaServer: The server.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving requests.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def kill(self):
+        """
+        Simulate a crashed server: requests in flight and on open keep-alive connections are dropped
+        without an answer, and new connections are refused.
+        """
+        self.killed = True
+        self.stop()
+
+    def answer(self, request):
+        """
+        Build the full answer the mock model gives to a generate request.
+
+        Args:
+            request (dict): The generate request.
+
+        Returns:
+            str: The answer.
+        """
+        prompt = request.get("prompt") or ""
+        variables = _VARIABLES.search(prompt)
+        options = request.get("options") or {}
+        if options.get("temperature"):
+            # Sampled answers disagree with the deterministic one for about a quarter of the prompts.
+            seed = str(options.get("seed", ""))
+            sample = lambda text: name_for(text, seed) if hashlib.sha1((seed + text).encode("utf-8")).digest()[2] < 64 else name_for(text)
+        else:
+            sample = name_for
+        if request.get("format") and "numbered HLIL" in prompt:
+            return json.dumps({number: sample(hlil) for number, hlil in _PACKED_FUNCTION.findall(prompt)}) + JSON_PADDING
+        if request.get("format") and variables:
+            names = _QUOTED.findall(variables.group(1))
+            return json.dumps({variable: name_for(prompt, variable).split("_")[1] for variable in names}) + JSON_PADDING
+        if isinstance(request.get("format"), dict):
+            return json.dumps({"name": sample(prompt)}) + JSON_PADDING
+        return name_for(prompt) + "\n" + CHATTER * 8
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, payload):
+                data = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if server.killed:
+                    self.close_connection = True
+                    return
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"model": server.model, "name": server.model, "size": 0}]})
+                elif self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-mock"})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if server.killed:
+                    self.close_connection = True
+                    return
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+                server._generate(self, request)
+
+        return Handler
+
+    def _generate(self, handler, request):
+        """
+        Answer a generate request, sleeping to simulate prompt evaluation and generation.
+
+        Args:
+            handler (BaseHTTPRequestHandler): The request handler.
+            request (dict): The generate request.
+        """
+        started = time.monotonic()
+        prompt = request.get("prompt") or ""
+        prompt_tokens = len(prompt) // 4 + 1
+        with self.stats.lock:
+            self.stats.requests += 1
+            self.stats.prompt_tokens.append(prompt_tokens)
+            self.stats.in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+
+        limit = (request.get("options") or {}).get("num_predict") or 256
+        tokens = tokenize(self.answer(request))[:limit] if prompt else []
+        prompt_seconds = prompt_tokens / self.prompt_tokens_per_second if prompt else 0.0
+        token_seconds = 1 / self.tokens_per_second
+        done = {
+            "model": request.get("model"), "done": True, "done_reason": "stop", "context": [1, 2, 3],
+            "total_duration": 0, "load_duration": 0, "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_seconds * 1e9), "eval_count": len(tokens),
+            "eval_duration": int(len(tokens) * token_seconds * 1e9),
+        }
+        sent = 0
+        try:
+            time.sleep(self.latency + prompt_seconds)
+            if self.killed:
+                handler.close_connection = True
+                return
+            if request.get("stream", True):
+                handler.send_response(200)
+                handler.send_header("Content-Type", "application/x-ndjson")
+                handler.send_header("Transfer-Encoding", "chunked")
+                handler.end_headers()
+                for token in tokens:
+                    time.sleep(token_seconds)
+                    handler._send_chunk({"model": request.get("model"), "response": token, "done": False})
+                    sent += 1
+                done["total_duration"] = int((time.monotonic() - started) * 1e9)
+                handler._send_chunk(dict(done, response=""))
+                handler.wfile.write(b"0\r\n\r\n")
+                handler.wfile.flush()
+            else:
+                time.sleep(len(tokens) * token_seconds)
+                sent = len(tokens)
+                done["total_duration"] = int((time.monotonic() - started) * 1e9)
+                handler._send_json(dict(done, response="".join(tokens)))
+        except (BrokenPipeError, ConnectionResetError):
+            with self.stats.lock:
+                self.stats.disconnects += 1
+            handler.close_connection = True
+        finally:
+            with self.stats.lock:
+                self.stats.in_flight -= 1
+                self.stats.generated_tokens += sent
+                self.stats.busy_seconds += time.monotonic() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.05, help="fixed seconds per request")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, args.latency, args.prompt_tokens_per_second, args.tokens_per_second)
+    print(f"Mock ollama server listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats.to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Offline throughput benchmarks of the plugin against a mock Ollama server and synthetic binaries.
+
+Run from the plugin directory (requires the plugin's pip dependencies, not Binary Ninja or a GPU):
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 --json results.json
+
+Scenarios:
+    traverse                  build the call graph and walk it bottom-up (traverse_functions_bottom_up)
+    rename_all_functions      run RenameAllFunctions on the whole synthetic binary
+    rename_function_variables run RenameFunctionVariables on a sample of functions
+    rename_all_variables      run RenameAllVariables on the whole synthetic binary
+    endpoints                 run RenameAllFunctions over --endpoints mock servers and kill one mid-run
+    batch                     run the headless batch mode on several synthetic binaries with a process pool
+
+Every result records wall time, the requests, prompt sizes, generated tokens and peak concurrency
+seen by the mock server, and the plugin's own telemetry report, so regressions in scheduling, prompt
+size and graph-build time show up as changed numbers.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from fake_binaryninja import SyntheticBinaryView, install
+from harness import load_plugin_module
+from mock_ollama import MockOllamaServer
+
+SCENARIOS = ["traverse", "rename_all_functions", "rename_function_variables", "rename_all_variables", "endpoints", "batch"]
+
+# Spawned batch workers import this file as their main module; loading the batch module here registers
+# the plugin package (and the binaryninja stand-in) before the workers unpickle their tasks.
+batch = load_plugin_module("batch")
+
+def new_client(bv, server, parallel_requests):
+    """
+    Create a fresh OllamaClient connected to the mock server, with an empty user directory.
+
+    Args:
+        bv (SyntheticBinaryView): The synthetic binary.
+        server (MockOllamaServer): The mock server.
+        parallel_requests (int): The number of requests kept in flight.
+
+    Returns:
+        OllamaClient: The client.
+    """
+    install(user_directory=tempfile.mkdtemp(prefix="binaryninja-ollama-bench-"))
+    ollama_client = load_plugin_module("ollama_client")
+    previous = ollama_client.OllamaClient._instance
+    if previous is not None and previous.client is not None:
+        previous.client.close()
+    ollama_client.OllamaClient._instance = None
+
+    client = ollama_client.OllamaClient(bv)
+    client.set_host(server.url)
+    client.set_port("")
+    client.init_client()
+    client.set_model(server.model)
+    client.set_parallel_requests(parallel_requests)
+    return client
+
+def run_traverse(size, args):
+    """
+    Time building and walking the call graph.
+
+    Args:
+        size (int): The number of functions.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The result.
+    """
+    utils = load_plugin_module("utils")
+    bv = SyntheticBinaryView(size, mean_lines=args.lines, seed=args.seed)
+    started = time.perf_counter()
+    iterator = iter(utils.traverse_functions_bottom_up(bv))
+    next(iterator)
+    first = time.perf_counter() - started
+    count = 1 + sum(1 for _ in iterator)
+    return {"first_function_seconds": first, "wall_seconds": time.perf_counter() - started, "functions": count}
+
+def run_rename_all_functions(size, args):
+    """
+    Run RenameAllFunctions on a synthetic binary against a fresh mock server.
+
+    Args:
+        size (int): The number of functions.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The result.
+    """
+    rename_tasks = load_plugin_module("rename_tasks")
+    bv = SyntheticBinaryView(size, mean_lines=args.lines, seed=args.seed)
+    server = new_server(args)
+    try:
+        client = new_client(bv, server, args.parallel)
+        task = rename_tasks.RenameAllFunctions(client, bv)
+        started = time.perf_counter()
+        task.run()
+        wall = time.perf_counter() - started
+    finally:
+        server.stop()
+    renamed = sum(1 for function in bv.functions if not function.name.startswith("sub_"))
+    return {"wall_seconds": wall, "functions": size, "renamed": renamed,
+            "functions_per_second": size / wall, "server": server.stats.to_dict(),
+            "telemetry": client.get_telemetry().tasks["RenameAllFunctions"].report()}
+
+def run_rename_function_variables(size, args):
+    """
+    Run RenameFunctionVariables on a sample of functions of a synthetic binary.
+
+    Args:
+        size (int): The number of functions of the binary.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The result.
+    """
+    rename_tasks = load_plugin_module("rename_tasks")
+    bv = SyntheticBinaryView(size, mean_lines=args.lines, seed=args.seed)
+    sample = bv.functions[:min(size, args.variable_functions)]
+    server = new_server(args)
+    try:
+        client = new_client(bv, server, args.parallel)
+        started = time.perf_counter()
+        for function in sample:
+            rename_tasks.RenameFunctionVariables(client, bv, function.hlil).run()
+        wall = time.perf_counter() - started
+    finally:
+        server.stop()
+    variables = sum(len(function.variables) for function in sample)
+    renamed = sum(1 for function in sample for variable in function.variables if not variable.name.startswith("var_"))
+    return {"wall_seconds": wall, "functions": len(sample), "variables": variables, "renamed": renamed,
+            "variables_per_second": variables / wall, "server": server.stats.to_dict(),
+            "telemetry": client.get_telemetry().tasks["RenameFunctionVariables"].report()}
+
+def run_rename_all_variables(size, args):
+    """
+    Run RenameAllVariables on a synthetic binary against a fresh mock server.
+
+    Args:
+        size (int): The number of functions.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The result.
+    """
+    rename_tasks = load_plugin_module("rename_tasks")
+    bv = SyntheticBinaryView(size, mean_lines=args.lines, seed=args.seed)
+    server = new_server(args)
+    try:
+        client = new_client(bv, server, args.parallel)
+        task = rename_tasks.RenameAllVariables(client, bv)
+        started = time.perf_counter()
+        task.run()
+        wall = time.perf_counter() - started
+    finally:
+        server.stop()
+    variables = sum(len(function.variables) for function in bv.functions)
+    renamed = sum(1 for function in bv.functions for variable in function.variables if not variable.name.startswith("var_"))
+    return {"wall_seconds": wall, "functions": size, "variables": variables, "renamed": renamed,
+            "variables_per_second": variables / wall, "server": server.stats.to_dict(),
+            "telemetry": client.get_telemetry().tasks["RenameAllVariables"].report()}
+
+def run_endpoints(size, args):
+    """
+    Run RenameAllFunctions over several mock servers and kill the first one a third of the way through.
+
+    Checks that every function still gets its name and that the endpoint report splits the requests
+    over the servers, with the failures on the killed one.
+
+    Args:
+        size (int): The number of functions.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The result. Failed checks are listed under "errors".
+    """
+    rename_tasks = load_plugin_module("rename_tasks")
+    bv = SyntheticBinaryView(size, mean_lines=args.lines, seed=args.seed)
+    servers = [new_server(args) for _ in range(max(2, args.endpoints))]
+    killed = servers[0]
+    try:
+        client = new_client(bv, servers[0], args.parallel)
+        client.set_host(", ".join(server.url for server in servers))
+        client.init_client()
+        pool = client.get_endpoint_pool()
+        counters = pool.snapshot()
+        task = rename_tasks.RenameAllFunctions(client, bv)
+        done = threading.Event()
+
+        def kill():
+            while not done.is_set() and killed.stats.requests < size // (3 * len(servers)):
+                time.sleep(0.01)
+            if not done.is_set():
+                killed.kill()
+
+        killer = threading.Thread(target=kill, daemon=True)
+        killer.start()
+        started = time.perf_counter()
+        try:
+            task.run()
+        finally:
+            done.set()
+        wall = time.perf_counter() - started
+        killer.join()
+        report = pool.report(counters, wall)
+    finally:
+        for server in servers:
+            if not server.killed:
+                server.stop()
+
+    errors = []
+    unnamed = [function.name for function in bv.functions if function.name.startswith("sub_")]
+    if unnamed:
+        errors.append(f"{len(unnamed)} functions were not renamed after the endpoint was killed")
+    if not killed.killed:
+        errors.append("the run finished before the endpoint was killed")
+    for row in report:
+        if row["requests"] == 0:
+            errors.append(f"{row['url']} completed no requests")
+    if report[0]["failures"] == 0:
+        errors.append("no request failed on the killed endpoint")
+    return {"wall_seconds": wall, "functions": size, "endpoints": report, "errors": errors,
+            "functions_per_second": size / wall, "server": [server.stats.to_dict() for server in servers]}
+
+def run_batch(size, args):
+    """
+    Run the headless batch mode on several synthetic binaries of one size.
+
+    A copy of the first binary in another directory has the same file name, and a second batch renames
+    a copy of a binary from the first one in a fresh worker pool. Checks that every binary gets its own
+    names file holding a name for each function, that the copies get the same names, and that the
+    second batch is answered from the response cache shared through the parent process.
+
+    Args:
+        size (int): The number of functions of every binary.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The result. Failed checks are listed under "errors".
+    """
+    server = new_server(args)
+    output = tempfile.mkdtemp(prefix="binaryninja-ollama-batch-")
+    paths = [os.path.join(output, "binaries", f"synthetic-{size}-{seed}") for seed in range(args.binaries)]
+    paths.append(os.path.join(output, "copy", os.path.basename(paths[0])))
+    rerun = os.path.join(output, "rerun", os.path.basename(paths[-2]))
+    try:
+        client = new_client(None, server, args.parallel)
+        # Names reused from the similarity index depend on the order the workers finish in, so the
+        # copies could not be compared.
+        client.get_similarity_index().threshold = 0
+        started = time.perf_counter()
+        summary = batch.run_batch(client, paths, os.path.join(output, "names"), args.jobs)
+        wall = time.perf_counter() - started
+        requests = server.stats.requests
+        rerun_summary = batch.run_batch(client, [rerun], os.path.join(output, "rerun-names"), 1)
+        rerun_requests = server.stats.requests - requests
+    finally:
+        server.stop()
+
+    errors = [f"{result['binary']}: {result['error']}" for result in summary["binaries"] + rerun_summary["binaries"]
+              if "error" in result]
+    names = {}
+    for result in summary["binaries"] + rerun_summary["binaries"]:
+        if "error" not in result:
+            with open(result["names"]) as f:
+                written = json.load(f)
+            names[result["binary"]] = written["names"]
+            if written["binary"] != result["binary"]:
+                errors.append(f"{result['names']} names the binary {written['binary']}")
+            if len(written["names"]) != size or not all(written["names"].values()):
+                errors.append(f"{result['names']} holds {sum(map(bool, written['names'].values()))} of {size} names")
+    outputs = [result.get("names") for result in summary["binaries"]]
+    if len(set(outputs)) != len(paths):
+        errors.append(f"binaries with the same file name share names files: {outputs}")
+    if names.get(paths[0]) != names.get(paths[-1]):
+        errors.append(f"the copies {paths[0]} and {paths[-1]} got different names")
+    if rerun_requests or not rerun_summary["telemetry"]["cache_hits"]:
+        errors.append(f"the rerun in a new worker sent {rerun_requests} requests instead of using the shared cache")
+    return {"wall_seconds": wall, "binaries": len(paths), "jobs": args.jobs,
+            "renamed": sum(result.get("renamed", 0) for result in summary["binaries"]), "errors": errors,
+            "rerun_cache_hits": rerun_summary["telemetry"]["cache_hits"], "rerun_requests": rerun_requests,
+            "functions_per_second": size * len(paths) / wall, "server": server.stats.to_dict(),
+            "telemetry": summary["telemetry"]}
+
+def new_server(args):
+    """
+    Start a mock server configured from the command line.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        MockOllamaServer: The started server.
+    """
+    return MockOllamaServer(latency=args.latency, prompt_tokens_per_second=args.prompt_tokens_per_second,
+                            tokens_per_second=args.tokens_per_second).start()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--parallel", type=int, default=4, help="requests kept in flight")
+    parser.add_argument("--lines", type=float, default=20, help="mean HLIL lines per function")
+    parser.add_argument("--variable-functions", type=int, default=200,
+                        help="functions sampled by rename_function_variables")
+    parser.add_argument("--endpoints", type=int, default=3, help="mock servers used by endpoints")
+    parser.add_argument("--binaries", type=int, default=4, help="synthetic binaries renamed by batch")
+    parser.add_argument("--jobs", type=int, default=2, help="worker processes used by batch")
+    parser.add_argument("--latency", type=float, default=0.002, help="mock server seconds per request")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=200000.0)
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    runners = {
+        "traverse": run_traverse,
+        "rename_all_functions": run_rename_all_functions,
+        "rename_function_variables": run_rename_function_variables,
+        "rename_all_variables": run_rename_all_variables,
+        "endpoints": run_endpoints,
+        "batch": run_batch,
+    }
+    results = []
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            result = {"scenario": scenario, "size": size, "parallel": args.parallel}
+            result.update(runners[scenario](size, args))
+            results.append(result)
+            print(f"{scenario:26} {size:>7} functions  {result['wall_seconds']:8.2f}s", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    failed = [(result["scenario"], result["size"], error) for result in results for error in result.get("errors", ())]
+    for scenario, size, error in failed:
+        print(f"FAILED {scenario} {size}: {error}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
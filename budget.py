@@ -0,0 +1,129 @@
+import heapq
+import time
+
+class RenameBudget:
+    """
+    A time and token budget for renaming all functions, spent on the most useful names first.
+
+    Functions are ranked by cheap static signals: how many functions call them (names of widely
+    used functions show up everywhere in the database) relative to the tokens their prompt is
+    expected to cost. The bottom-up order is kept wherever it does not hold back a valuable function:
+    callees inherit part of the value of their callers, so the leaves of valuable call chains are
+    named first, and a caller is only scheduled once its callees are done.
+
+    Attributes:
+        seconds (float): The maximum run time, None for no limit.
+        tokens (int): The maximum number of prompt and generated tokens, None for no limit.
+        started (float): The monotonic time the run started.
+        skipped (list): The functions that were not sent because the budget ran out.
+    """
+    # Share of a caller's value that its callees inherit.
+    DECAY = 0.5
+
+    # Rough number of machine code bytes per HLIL token, used to estimate prompt sizes without rendering HLIL.
+    BYTES_PER_TOKEN = 4
+
+    # Tokens of every request that do not depend on the function: instructions, question and answer.
+    REQUEST_OVERHEAD_TOKENS = 100
+
+    def __init__(self, seconds=None, tokens=None):
+        """
+        Initialize the RenameBudget.
+
+        Args:
+            seconds (float, optional): The maximum run time.
+            tokens (int, optional): The maximum number of prompt and generated tokens.
+        """
+        self.seconds = seconds
+        self.tokens = tokens
+        self.started = time.monotonic()
+        self.skipped = []
+
+    def start(self):
+        """
+        Start the clock of the time budget.
+        """
+        self.started = time.monotonic()
+        self.skipped = []
+
+    def spent_tokens(self, telemetry):
+        """
+        Get the number of tokens spent so far.
+
+        Args:
+            telemetry (TaskTelemetry): The counters of the run.
+
+        Returns:
+            int: The prompt and generated tokens of every request of the run.
+        """
+        return sum(telemetry.prompt_tokens) + telemetry.generated_tokens
+
+    def exhausted(self, telemetry):
+        """
+        Check whether the budget is used up.
+
+        Args:
+            telemetry (TaskTelemetry): The counters of the run.
+
+        Returns:
+            bool: True once the time or token limit is reached.
+        """
+        if self.seconds is not None and time.monotonic() - self.started >= self.seconds:
+            return True
+        return self.tokens is not None and self.spent_tokens(telemetry) >= self.tokens
+
+    def expected_tokens(self, function, prompt_token_budget):
+        """
+        Estimate the tokens a request for a function will cost, without rendering its HLIL.
+
+        Args:
+            function (Function): The function.
+            prompt_token_budget (int): The maximum number of HLIL tokens of a prompt.
+
+        Returns:
+            int: The expected number of tokens.
+        """
+        return min(prompt_token_budget, function.total_bytes // self.BYTES_PER_TOKEN) + self.REQUEST_OVERHEAD_TOKENS
+
+    def order(self, call_graph, prompt_token_budget):
+        """
+        Order the functions of a call graph by value while keeping callees ahead of their callers.
+
+        Args:
+            call_graph (CallGraph): The call graph.
+            prompt_token_budget (int): The maximum number of HLIL tokens of a prompt.
+
+        Returns:
+            list: The node numbers, most valuable call chains first.
+        """
+        bottom_up = list(call_graph.bottom_up())
+        position = [0] * len(call_graph)
+        for i, node in enumerate(bottom_up):
+            position[node] = i
+
+        fan_in = call_graph.fan_in()
+        priority = [(1 + fan_in[node]) / self.expected_tokens(call_graph.functions[node], prompt_token_budget)
+                    for node in range(len(call_graph))]
+
+        # Callers come after their callees in bottom_up, so walking it backwards visits every caller
+        # before the callees it passes its value on to. Calls into recursive cycles are not dependencies.
+        remaining = [0] * len(call_graph)
+        dependents = [[] for _ in range(len(call_graph))]
+        for node in reversed(bottom_up):
+            for callee in call_graph.callees(node):
+                if position[callee] < position[node]:
+                    priority[callee] = max(priority[callee], priority[node] * self.DECAY)
+                    remaining[node] += 1
+                    dependents[callee].append(node)
+
+        ready = [(-priority[node], position[node], node) for node in bottom_up if remaining[node] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, _, node = heapq.heappop(ready)
+            order.append(node)
+            for dependent in dependents[node]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, (-priority[dependent], position[dependent], dependent))
+        return order
@@ -0,0 +1,399 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from .prompts import fit_hlil, is_reachable
+
+_IDENTIFIER = re.compile(r"\b[A-Za-z_]\w*\b")
+
+class ResponseCache:
+    """
+    A persistent SQLite cache of Ollama responses with least-recently-used eviction.
+
+    Entries are keyed by model, prompt template version and a hash of the whitespace-normalized
+    prompt, so re-running a task on the same or a rebuilt binary only queries the server for
+    functions whose HLIL actually changed.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        max_entries (int): The maximum number of entries kept before the least recently used are evicted.
+        max_age (float): The maximum number of seconds an entry may go unused before it is evicted.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that had to go to the server.
+    """
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, path, max_entries=100000, max_age_days=30):
+        """
+        Initialize the ResponseCache. The database is opened on first use.
+
+        Args:
+            path (str): The path of the SQLite database.
+            max_entries (int): The maximum number of entries to keep.
+            max_age_days (float): The number of days an unused entry is kept.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self):
+        """
+        Open the database and create the schema if needed. Must be called with the lock held.
+
+        Returns:
+            sqlite3.Connection: The open connection.
+        """
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def make_key(model, template_version, prompt, format=None, options=None):
+        """
+        Build the cache key for a request.
+
+        Args:
+            model (str): The model the request is sent to.
+            template_version (int): The version of the prompt templates.
+            prompt (str): The prompt, including the HLIL.
+            format (str or dict, optional): The structured output format of the request, e.g. "json" or a JSON schema.
+            options (dict, optional): The model options, which tell sampled answers apart.
+
+        Returns:
+            str: The cache key.
+        """
+        normalized = " ".join(prompt.split())
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        if isinstance(format, dict):
+            format = json.dumps(format, sort_keys=True)
+        if options:
+            digest += ":" + json.dumps(options, sort_keys=True)
+        return f"{model}:{template_version}:{format or ''}:{digest}"
+
+    def get(self, key):
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: The cached response text, or None on a miss.
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT response, last_used FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        """
+        Store a response, evicting old entries every EVICTION_INTERVAL writes.
+
+        Args:
+            key (str): The cache key.
+            response (str): The response text.
+        """
+        with self._lock:
+            connection = self._connect()
+            now = time.time()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICTION_INTERVAL == 0:
+                self._evict(connection, now)
+            connection.commit()
+
+    def _evict(self, connection, now):
+        """
+        Remove entries that are too old or beyond max_entries, least recently used first.
+        Must be called with the lock held.
+
+        Args:
+            connection (sqlite3.Connection): The open connection.
+            now (float): The current time.
+        """
+        connection.execute("DELETE FROM responses WHERE last_used < ?", (now - self.max_age,))
+        connection.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        """
+        Remove every entry from the cache and reset the counters.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM responses")
+            connection.commit()
+            connection.execute("VACUUM")
+            self.hits = 0
+            self.misses = 0
+
+    def size(self):
+        """
+        Get the number of cached responses.
+
+        Returns:
+            int: The number of entries in the cache.
+        """
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def hit_rate(self):
+        """
+        Get the fraction of lookups answered from the cache.
+
+        Returns:
+            float: The hit rate, or 0.0 if there were no lookups.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+class ContextCache:
+    """
+    A bounded in-memory cache of the conversation contexts Ollama returned for the base prompts of functions.
+
+    A context holds the tokens of a function's HLIL as evaluated by the model. Follow-up questions
+    about the same function send only the short question together with the context instead of the
+    whole HLIL again. Entries are keyed by model and function address and carry a version of the HLIL,
+    so a context is dropped once the function's code changes or any of its variables or callees is
+    renamed, since follow-up questions refer to the current names.
+
+    Attributes:
+        max_entries (int): The maximum number of contexts kept before the least recently used are evicted.
+    """
+    def __init__(self, max_entries=128):
+        """
+        Initialize the ContextCache.
+
+        Args:
+            max_entries (int): The maximum number of contexts to keep.
+        """
+        self.max_entries = max_entries
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_version(hlil, identifiers=True):
+        """
+        Build the version of a function's HLIL.
+
+        Args:
+            hlil (str): The rendered HLIL.
+            identifiers (bool): Whether renaming variables or callees changes the version. Without
+                identifiers only changed code (structure, constants) does.
+
+        Returns:
+            str: The version.
+        """
+        text = " ".join(hlil.split())
+        if not identifiers:
+            text = _IDENTIFIER.sub("_", text)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, model, function, version):
+        """
+        Look up the context of a function.
+
+        Args:
+            model (str): The model the context was produced by.
+            function (int): The start address of the function.
+            version (str): The current version of the function's HLIL.
+
+        Returns:
+            list: The context tokens, or None if there is no context for this version of the function.
+        """
+        with self._lock:
+            entry = self._contexts.get((model, function))
+            if entry is None or entry[0] != version:
+                return None
+            self._contexts.move_to_end((model, function))
+            return entry[1]
+
+    def put(self, model, function, version, context):
+        """
+        Store the context of a function, evicting the least recently used contexts if the cache is full.
+
+        Args:
+            model (str): The model the context was produced by.
+            function (int): The start address of the function.
+            version (str): The version of the function's HLIL.
+            context (list): The context tokens returned by Ollama.
+        """
+        with self._lock:
+            self._contexts[(model, function)] = (version, context)
+            self._contexts.move_to_end((model, function))
+            while len(self._contexts) > self.max_entries:
+                self._contexts.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove every context.
+        """
+        with self._lock:
+            self._contexts.clear()
+
+class HlilCache:
+    """
+    A bounded in-memory cache of the rendered HLIL of functions, for the interactive commands.
+
+    Rendering every instruction of a large function takes seconds, and the commands renaming a
+    function, all its variables or a single variable each need the same rendering. The rendered lines
+    are kept per function and fitted to the budget and focus variables of every request, together
+    with the version of the prompts built from them.
+
+    An entry is only valid for the HLIL object it was rendered from. Binary Ninja creates a new one
+    whenever the function's analysis changes, e.g. after a variable is renamed, and the entry keeps the
+    old one alive so it cannot be mistaken for a new one. Callee names are rendered from the current
+    symbols without a new analysis, so an entry is also dropped once a callee was renamed.
+
+    Attributes:
+        max_entries (int): The maximum number of functions kept before the least recently used are evicted.
+        hits (int): The number of renders answered from the cache.
+        misses (int): The number of renders that had to render the HLIL.
+    """
+    # The most fitted texts kept per function, e.g. for different focus variables.
+    MAX_RENDERS = 8
+
+    def __init__(self, max_entries=32):
+        """
+        Initialize the HlilCache.
+
+        Args:
+            max_entries (int): The maximum number of functions to keep.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, hlil, budget=None, focus=()):
+        """
+        Render the HLIL of a function for a prompt, reusing its rendered lines while its analysis is unchanged.
+
+        Args:
+            hlil (HighLevelILFunction): The HighLevelIL representation of the function.
+            budget (int, optional): The maximum number of tokens the rendered HLIL may take up.
+            focus (iterable, optional): Names of variables whose lines must be kept.
+
+        Returns:
+            tuple: (text, hit) where text is the rendered HLIL, as returned by render_hlil, and hit tells
+                whether the lines came from the cache.
+        """
+        function = hlil.source_function.start
+        callees = tuple(callee.name for callee in hlil.source_function.callees)
+        key = (budget, tuple(sorted(focus)))
+        with self._lock:
+            entry = self._entries.get(function)
+            hit = entry is not None and entry["hlil"] == hlil and entry["callees"] == callees
+            if hit:
+                self._entries.move_to_end(function)
+                self.hits += 1
+                text = entry["renders"].get(key)
+                if text is not None:
+                    return text, True
+            else:
+                self.misses += 1
+
+        if not hit:
+            entry = {"hlil": hlil, "callees": callees, "lines": [str(instr) for instr in hlil.instructions],
+                     "reachable": None, "renders": {}}
+
+        def reachable():
+            if entry["reachable"] is None:
+                entry["reachable"] = [is_reachable(instr) for instr in hlil.instructions]
+            return entry["reachable"]
+
+        text = fit_hlil(entry["lines"], budget, focus, reachable)
+        with self._lock:
+            if len(entry["renders"]) >= self.MAX_RENDERS:
+                entry["renders"].clear()
+            entry["renders"][key] = text
+            if not hit:
+                self._entries[function] = entry
+                self._entries.move_to_end(function)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return text, hit
+
+    def version(self, hlil):
+        """
+        Get the version of rendered HLIL, see ContextCache.make_version, computing it once per text.
+
+        Args:
+            hlil (str): The rendered HLIL.
+
+        Returns:
+            str: The version.
+        """
+        with self._lock:
+            version = self._versions.get(hlil)
+            if version is not None:
+                self._versions.move_to_end(hlil)
+                return version
+        version = ContextCache.make_version(hlil)
+        with self._lock:
+            self._versions[hlil] = version
+            while len(self._versions) > self.max_entries:
+                self._versions.popitem(last=False)
+        return version
+
+    def invalidate(self, function):
+        """
+        Drop the rendered HLIL of a function.
+
+        Args:
+            function (int): The start address of the function.
+        """
+        with self._lock:
+            self._entries.pop(function, None)
+
+    def hit_rate(self):
+        """
+        Get the fraction of renders answered from the cache.
+
+        Returns:
+            float: The hit rate, or 0.0 if nothing was rendered.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
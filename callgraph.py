@@ -0,0 +1,183 @@
+from array import array
+
+class CallGraph:
+    """
+    A compact call graph with integer-indexed adjacency arrays.
+
+    Functions are numbered in the order they are listed by the BinaryView and the callees of every
+    function are stored in one flat array (compressed sparse rows), so building and traversing the
+    graph stays cheap even for binaries with hundreds of thousands of functions.
+
+    Attributes:
+        functions (list): The functions, indexed by their node number.
+        offsets (array): offsets[i]:offsets[i + 1] is the slice of targets holding the callees of node i.
+        targets (array): The callee node numbers of all functions.
+    """
+    def __init__(self, functions, offsets, targets):
+        """
+        Initialize the CallGraph.
+
+        Args:
+            functions (list): The functions, indexed by their node number.
+            offsets (array): The start of every node's callees in targets, followed by len(targets).
+            targets (array): The callee node numbers of all functions.
+        """
+        self.functions = functions
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_binary_view(cls, bv):
+        """
+        Build the call graph of a BinaryView in a single pass over its functions.
+
+        Callees are read as addresses, which avoids creating a Function object for every call edge.
+
+        Args:
+            bv (binaryninja.BinaryView): The binary view representing the binary analysis context.
+
+        Returns:
+            CallGraph: The call graph.
+        """
+        return cls.from_functions(list(bv.functions))
+
+    @classmethod
+    def from_functions(cls, functions):
+        """
+        Build the call graph between some functions. Calls to functions outside the list are ignored.
+
+        Args:
+            functions (list): The functions.
+
+        Returns:
+            CallGraph: The call graph.
+        """
+        return cls.from_addresses(functions, [function.start for function in functions],
+                                  lambda i: functions[i].callee_addresses)
+
+    @classmethod
+    def from_addresses(cls, functions, addresses, callee_addresses):
+        """
+        Build a call graph from function start addresses and a callee address lookup.
+
+        Args:
+            functions (list): The functions, indexed by their node number.
+            addresses (list): The start address of every function.
+            callee_addresses (callable): Returns the addresses called by the function with a given node number.
+
+        Returns:
+            CallGraph: The call graph. Calls to addresses that are not function starts are ignored.
+        """
+        index = {address: i for i, address in enumerate(addresses)}
+        offsets = array('l', [0])
+        targets = array('l')
+        for i in range(len(functions)):
+            seen = set()
+            for address in callee_addresses(i):
+                j = index.get(address)
+                if j is not None and j not in seen:
+                    seen.add(j)
+                    targets.append(j)
+            offsets.append(len(targets))
+        return cls(functions, offsets, targets)
+
+    def __len__(self):
+        """
+        Get the number of functions in the graph.
+
+        Returns:
+            int: The number of nodes.
+        """
+        return len(self.functions)
+
+    def callees(self, node):
+        """
+        Get the callees of a node.
+
+        Args:
+            node (int): The node number.
+
+        Returns:
+            array: The node numbers of the callees.
+        """
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def fan_in(self):
+        """
+        Count the distinct callers of every node.
+
+        Returns:
+            array: The number of callers, indexed by node number.
+        """
+        counts = array('l', [0]) * len(self.functions)
+        for callee in self.targets:
+            counts[callee] += 1
+        return counts
+
+    def components(self):
+        """
+        Lazily yield the strongly connected components of the graph in bottom-up order.
+
+        This is an iterative version of Tarjan's algorithm: a component is yielded as soon as it is
+        complete, after every component it calls into. Recursive clusters of functions come out as a
+        single component, non-recursive functions as a component of one.
+
+        Yields:
+            list: The node numbers of a strongly connected component.
+        """
+        count = len(self.functions)
+        offsets, targets = self.offsets, self.targets
+        order = array('l', [-1]) * count
+        lowlink = array('l', [0]) * count
+        on_stack = bytearray(count)
+        stack = []
+        counter = 0
+
+        for root in range(count):
+            if order[root] != -1:
+                continue
+            order[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [(root, offsets[root])]
+
+            while work:
+                node, edge = work[-1]
+                if edge < offsets[node + 1]:
+                    work[-1] = (node, edge + 1)
+                    callee = targets[edge]
+                    if order[callee] == -1:
+                        order[callee] = lowlink[callee] = counter
+                        counter += 1
+                        stack.append(callee)
+                        on_stack[callee] = 1
+                        work.append((callee, offsets[callee]))
+                    elif on_stack[callee] and order[callee] < lowlink[node]:
+                        lowlink[node] = order[callee]
+                    continue
+
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    if lowlink[node] < lowlink[caller]:
+                        lowlink[caller] = lowlink[node]
+                if lowlink[node] == order[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    yield component
+
+    def bottom_up(self):
+        """
+        Lazily yield the node numbers of all functions, callees before their callers.
+
+        Yields:
+            int: The node numbers in bottom-up order.
+        """
+        for component in self.components():
+            yield from component
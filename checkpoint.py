@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import time
+
+class RenameCheckpoint:
+    """
+    Periodically saved progress of a "Rename all functions" run, kept in a sidecar file.
+
+    The sidecar lives in the Binary Ninja user directory rather than in the database metadata, so the
+    progress survives a crash even if the database was never saved.
+
+    Attributes:
+        path (str): The path of the sidecar file.
+        completed (dict): Maps the start address of every processed function to its new name,
+            or None if Ollama did not identify a proper name.
+        name_counter (dict): The name deduplication counters of the run.
+        interval (float): The number of seconds between periodic saves.
+        batch (int): The number of processed functions that triggers a save.
+    """
+    VERSION = 1
+
+    def __init__(self, directory, bv, interval=30, batch=50, task="rename_all_functions"):
+        """
+        Initialize the RenameCheckpoint.
+
+        Args:
+            directory (str): The directory holding the sidecar files.
+            bv (BinaryView): The BinaryView being renamed.
+            interval (float): The number of seconds between periodic saves.
+            batch (int): The number of processed functions that triggers a save.
+            task (str): The task the checkpoint belongs to, so different tasks keep separate sidecar files.
+        """
+        key = hashlib.sha256(bv.file.filename.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(directory, f"{task}-{key}.json")
+        self.completed = {}
+        self.name_counter = {}
+        self.interval = interval
+        self.batch = batch
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def exists(self):
+        """
+        Check whether a checkpoint from an earlier run exists.
+
+        Returns:
+            bool: True if the sidecar file exists.
+        """
+        return os.path.exists(self.path)
+
+    def load(self):
+        """
+        Restore the progress of an earlier run.
+
+        Returns:
+            bool: True if a checkpoint was loaded, False if none exists or it is unreadable.
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get("version") != self.VERSION:
+            return False
+        self.completed = {int(address, 16): name for address, name in state["completed"].items()}
+        self.name_counter = state["name_counter"]
+        return True
+
+    def record(self, address, name):
+        """
+        Record a processed function and save the checkpoint if it is due.
+
+        Args:
+            address (int): The start address of the function.
+            name (str): The new name of the function, or None if no proper name was found.
+        """
+        self.completed[address] = name
+        self._unsaved += 1
+        if self._unsaved >= self.batch or time.monotonic() - self._saved_at >= self.interval:
+            self.save()
+
+    def save(self):
+        """
+        Write the checkpoint to the sidecar file, replacing it atomically.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = {
+            "version": self.VERSION,
+            "completed": {hex(address): name for address, name in self.completed.items()},
+            "name_counter": self.name_counter,
+        }
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.path)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def remove(self):
+        """
+        Delete the sidecar file once the run has finished.
+        """
+        if self.exists():
+            os.remove(self.path)
@@ -0,0 +1,128 @@
+import hashlib
+import re
+import threading
+from concurrent.futures import Future
+
+# Names Binary Ninja generates from addresses and stack offsets. They differ between copies of the
+# same code, so they are replaced by placeholders numbered in order of first use.
+_GENERATED_NAME = re.compile(r"\b(sub|j_sub|data|var|label|jump_table|func)_([0-9a-fA-F]+)\b")
+
+# Hexadecimal constants of five or more digits are almost always addresses. Smaller constants
+# (sizes, flags, error codes) are kept, since they are often all that tells two functions apart.
+_ADDRESS = re.compile(r"\b0x[0-9a-fA-F]{5,}\b")
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_hlil(text):
+    """
+    Normalize rendered HLIL so copies of the same code at different addresses compare equal.
+
+    Generated names are renamed consistently (the first sub_ becomes sub_0, the second sub_1, and so on),
+    so the data flow between them is preserved. Names given by the user or by earlier renames are kept.
+
+    Args:
+        text (str): The rendered HLIL.
+
+    Returns:
+        str: The normalized HLIL.
+    """
+    placeholders = {}
+    counters = {}
+
+    def placeholder(match):
+        name = match.group(0)
+        if name not in placeholders:
+            prefix = match.group(1)
+            counters[prefix] = counters.get(prefix, -1) + 1
+            placeholders[name] = f"{prefix}_{counters[prefix]}"
+        return placeholders[name]
+
+    text = _GENERATED_NAME.sub(placeholder, text)
+    text = _ADDRESS.sub("ADDR", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+def structural_key(text):
+    """
+    Hash the normalized form of rendered HLIL.
+
+    Args:
+        text (str): The rendered HLIL.
+
+    Returns:
+        str: The hex digest identifying the structure of the function.
+    """
+    return hashlib.sha256(normalize_hlil(text).encode("utf-8")).hexdigest()
+
+class StructuralDeduplicator:
+    """
+    Shares one answer between functions whose HLIL is identical after normalization.
+
+    Statically linked binaries contain many copies of the same code (thunks, template instantiations,
+    inlined library functions). The first function of each group is sent to the model; every later
+    member waits for that answer instead of sending its own request.
+
+    Attributes:
+        groups (int): The number of distinct structures seen.
+        duplicates (int): The number of functions that reused the answer of an earlier group member.
+    """
+    def __init__(self):
+        """
+        Initialize the StructuralDeduplicator.
+        """
+        self.groups = 0
+        self.duplicates = 0
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    def generate(self, text, generate):
+        """
+        Get the answer for rendered HLIL, generating it only for the first member of its group.
+
+        Safe to call from several worker threads. A member that arrives while the first request of its
+        group is still running blocks until that request finishes.
+
+        Args:
+            text (str): The rendered HLIL.
+            generate (callable): Called with the HLIL to produce the answer for a new group.
+
+        Returns:
+            object: The answer of the group.
+        """
+        return self.generate_many([text], lambda texts: [generate(texts[0])])[0]
+
+    def generate_many(self, texts, generate_many):
+        """
+        Get the answers for several pieces of rendered HLIL, generating them only for new groups.
+
+        Args:
+            texts (list): The rendered HLIL of every function.
+            generate_many (callable): Called with the list of HLIL that starts new groups. Returns the
+                list of their answers.
+
+        Returns:
+            list: The answers, in the order of texts.
+        """
+        keys = [structural_key(text) for text in texts]
+        answers = []
+        leaders = []
+        with self._lock:
+            for text, key in zip(texts, keys):
+                answer = self._answers.get(key)
+                if answer is None:
+                    answer = Future()
+                    self._answers[key] = answer
+                    leaders.append((text, answer))
+                    self.groups += 1
+                else:
+                    self.duplicates += 1
+                answers.append(answer)
+
+        if leaders:
+            try:
+                for (_, answer), result in zip(leaders, generate_many([text for text, _ in leaders])):
+                    answer.set_result(result)
+            except Exception as e:
+                for _, answer in leaders:
+                    if not answer.done():
+                        answer.set_exception(e)
+        return [answer.result() for answer in answers]
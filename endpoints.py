@@ -0,0 +1,500 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+import httpx
+from ollama import AsyncClient, ResponseError
+from binaryninja import log_info, log_warn
+
+# Errors that mean an endpoint could not be reached, as opposed to the server rejecting the request.
+TRANSPORT_ERRORS = (httpx.TransportError, ConnectionError)
+
+# Status codes of a server that is overloaded or restarting rather than rejecting the request.
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+class EndpointDown(ConnectionError):
+    """
+    A request was abandoned because the health check found its endpoint down.
+    """
+
+def parse_endpoints(hosts, port):
+    """
+    Parse the server setting into a list of endpoint URLs.
+
+    Args:
+        hosts (str): One or more hosts separated by commas, e.g. "http://gpu1, http://gpu2:11500",
+            "[::1]" or "https://proxy/ollama".
+        port (str): The port used for hosts that do not specify one.
+
+    Returns:
+        list: The endpoint URLs.
+    """
+    urls = []
+    for host in hosts.split(","):
+        host = host.strip().rstrip("/")
+        if not host:
+            continue
+        if "://" not in host:
+            host = f"http://{host}"
+        parts = urlsplit(host)
+        if parts.port is None and port:
+            parts = parts._replace(netloc=f"{parts.netloc}:{port}")
+        urls.append(urlunsplit(parts))
+    return urls
+
+class Endpoint:
+    """
+    One Ollama server of an EndpointPool and its load and throughput counters.
+
+    Attributes:
+        url (str): The URL of the server.
+        client (AsyncClient): The Ollama client bound to the server.
+        health_client (AsyncClient): A client with a short timeout used for health checks.
+        healthy (bool): Whether the server answered its last health check or request.
+        outstanding (int): The number of requests currently sent to the server.
+        requests (int): The number of requests the server completed.
+        failures (int): The number of requests that failed to reach the server.
+        errors (int): The number of requests the server answered with an error, e.g. 503 while busy.
+        busy_seconds (float): The summed duration of all completed requests.
+        in_flight (set): The tasks of the generate requests currently sent to the server. Only used on the event loop.
+        abandoned (set): The tasks of in_flight that were cancelled because the server went down.
+    """
+    def __init__(self, url, client, health_client):
+        """
+        Initialize the Endpoint.
+
+        Args:
+            url (str): The URL of the server.
+            client (AsyncClient): The Ollama client bound to the server.
+            health_client (AsyncClient): A client with a short timeout used for health checks.
+        """
+        self.url = url
+        self.client = client
+        self.health_client = health_client
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.in_flight = set()
+        self.abandoned = set()
+
+class EndpointPool:
+    """
+    Routes requests over several Ollama servers, sending each to the healthy server with the fewest
+    outstanding requests and moving requests to another server when one goes down.
+
+    Every endpoint is served by an ollama AsyncClient whose HTTP connections are kept alive and reused.
+    All requests and health checks run on one shared EventLoopThread. The pool offers the synchronous
+    generate and list calls of an ollama Client, so background tasks can use it in its place.
+
+    Generation has no read timeout, since answers to large prompts can take minutes. An endpoint that
+    accepts connections but stops answering is caught by the health checks instead, which cancel its
+    requests so they are sent to the other endpoints.
+
+    Attributes:
+        endpoints (list): The endpoints of the pool.
+        event_loop (EventLoopThread): The loop all requests run on.
+        health_interval (float): The number of seconds between health checks.
+    """
+    # Seconds a health check may take before the endpoint is considered down.
+    HEALTH_TIMEOUT = 5
+
+    # Rounds over all endpoints before a request fails, and the seconds waited before the first
+    # repeated round, doubling every round.
+    MAX_RETRY_ROUNDS = 3
+    RETRY_BACKOFF = 0.5
+
+    # Seconds between checks for outstanding requests while the pool is closed.
+    CLOSE_POLL_INTERVAL = 0.5
+
+    # Outcomes of a request sent to an endpoint, see _release.
+    COMPLETED = "completed"
+    UNREACHABLE = "unreachable"
+    ERROR = "error"
+    CANCELLED = "cancelled"
+
+    # Idle connections kept open per endpoint, and for how many seconds.
+    KEEPALIVE_CONNECTIONS = 32
+    KEEPALIVE_EXPIRY = 300
+
+    def __init__(self, urls, event_loop, client_factory=AsyncClient, health_interval=30):
+        """
+        Initialize the EndpointPool and start its health checks.
+
+        Args:
+            urls (list): The endpoint URLs.
+            event_loop (EventLoopThread): The loop all requests run on.
+            client_factory (callable): Creates an async client for an endpoint URL.
+            health_interval (float): The number of seconds between health checks.
+        """
+        if not urls:
+            raise RuntimeError("No Ollama endpoints configured.")
+        limits = httpx.Limits(max_keepalive_connections=self.KEEPALIVE_CONNECTIONS, keepalive_expiry=self.KEEPALIVE_EXPIRY)
+        timeout = httpx.Timeout(None, connect=self.HEALTH_TIMEOUT)
+        self.endpoints = [Endpoint(url, client_factory(host=url, limits=limits, timeout=timeout),
+                                   client_factory(host=url, timeout=self.HEALTH_TIMEOUT))
+                          for url in urls]
+        self.event_loop = event_loop
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._health_checks = event_loop.submit(self._check_health())
+
+    def close(self):
+        """
+        Stop the health checks and close the connections of every endpoint once the requests still
+        in flight are done.
+
+        Returns:
+            concurrent.futures.Future: Completes once every connection is closed.
+        """
+        self._health_checks.cancel()
+        return self.event_loop.submit(self._close_clients())
+
+    async def _close_clients(self):
+        """
+        Wait for the outstanding requests of every endpoint, then close its clients.
+        """
+        while any(endpoint.outstanding for endpoint in self.endpoints):
+            await asyncio.sleep(self.CLOSE_POLL_INTERVAL)
+        for endpoint in self.endpoints:
+            for client in (endpoint.client, endpoint.health_client):
+                close = getattr(client, "close", None)
+                if close is not None:
+                    await close()
+
+    async def _check_health(self):
+        """
+        Periodically ask every endpoint for its models and update its health. The requests still in
+        flight on an endpoint that is down are cancelled, so generate_async sends them to another one.
+        """
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for endpoint in self.endpoints:
+                try:
+                    await endpoint.health_client.list()
+                    healthy = True
+                except Exception:
+                    healthy = False
+                with self._lock:
+                    if healthy != endpoint.healthy:
+                        log_info(f"Ollama endpoint {endpoint.url} is {'up' if healthy else 'down'}")
+                    endpoint.healthy = healthy
+                if not healthy and endpoint.in_flight:
+                    log_warn(f"Moving {len(endpoint.in_flight)} requests off the Ollama endpoint {endpoint.url}")
+                    for request in endpoint.in_flight:
+                        endpoint.abandoned.add(request)
+                        request.cancel()
+
+    def _acquire(self, excluded):
+        """
+        Pick the healthy endpoint with the fewest outstanding requests and reserve a slot on it.
+
+        Args:
+            excluded (set): Endpoints that already failed for this request.
+
+        Returns:
+            Endpoint: The chosen endpoint.
+
+        Raises:
+            RuntimeError: If no endpoint is left to try.
+        """
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in excluded]
+            if not candidates:
+                raise RuntimeError("All Ollama endpoints are unreachable.")
+            # Prefer healthy endpoints, but still try the others before giving up on a request.
+            endpoint = min(candidates, key=lambda endpoint: (not endpoint.healthy, endpoint.outstanding, endpoint.requests))
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _release(self, endpoint, started, outcome):
+        """
+        Release the slot reserved on an endpoint and update its counters.
+
+        Only completed requests count towards the throughput of the endpoint and mark it as healthy.
+
+        Args:
+            endpoint (Endpoint): The endpoint the request was sent to.
+            started (float): The monotonic time the request was sent.
+            outcome (str): COMPLETED, UNREACHABLE if the endpoint could not be reached, ERROR if the
+                server answered with an error, or CANCELLED if the caller gave up on the request.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if outcome == self.COMPLETED:
+                endpoint.requests += 1
+                endpoint.busy_seconds += time.monotonic() - started
+                endpoint.healthy = True
+            elif outcome == self.UNREACHABLE:
+                endpoint.failures += 1
+                if endpoint.healthy:
+                    log_warn(f"Ollama endpoint {endpoint.url} is down, moving its requests to the other endpoints")
+                endpoint.healthy = False
+            elif outcome == self.ERROR:
+                endpoint.errors += 1
+
+    def generate(self, on_retry=None, until=None, **kwargs):
+        """
+        Send a generate request to the least loaded endpoint, failing over to the others.
+
+        Args:
+            on_retry (callable, optional): Called every time the request is sent again.
+            until (callable, optional): Stream the answer and stop the generation as soon as this
+                returns the length of the part to keep, given the text generated so far.
+            **kwargs: The arguments of ollama.AsyncClient.generate.
+
+        Returns:
+            dict: The response.
+        """
+        return self.event_loop.run(self.generate_async(on_retry, until, **kwargs))
+
+    @staticmethod
+    def _retryable(error):
+        """
+        Check whether a failed request should be sent again.
+
+        Args:
+            error (Exception): The error of the request.
+
+        Returns:
+            bool: True for transport errors and for servers that are busy or restarting.
+        """
+        return isinstance(error, TRANSPORT_ERRORS) or (isinstance(error, ResponseError)
+                                                       and error.status_code in RETRY_STATUS_CODES)
+
+    async def _next_endpoint(self, excluded, attempt, error, on_retry):
+        """
+        Pick the endpoint for the next attempt of a request. Once every endpoint has failed, wait with
+        exponential backoff and start a new round over all of them.
+
+        Args:
+            excluded (set): Endpoints that failed in the current round, cleared for a new round.
+            attempt (list): The number of the current round, in a list so it can be updated.
+            error (Exception): The error of the previous attempt, None for the first attempt.
+            on_retry (callable): Called if the request is sent again, may be None.
+
+        Returns:
+            Endpoint: The chosen endpoint, with a slot reserved on it.
+
+        Raises:
+            RuntimeError: If the request failed MAX_RETRY_ROUNDS rounds.
+        """
+        if len(excluded) == len(self.endpoints):
+            if attempt[0] >= self.MAX_RETRY_ROUNDS:
+                raise RuntimeError(f"Ollama request failed on every endpoint after {attempt[0]} rounds: {error}") from error
+            await asyncio.sleep(self.RETRY_BACKOFF * 2 ** (attempt[0] - 1))
+            attempt[0] += 1
+            excluded.clear()
+        if error is not None and on_retry is not None:
+            on_retry()
+        return self._acquire(excluded)
+
+    async def generate_async(self, on_retry=None, until=None, **kwargs):
+        """
+        Send a generate request to the least loaded endpoint, failing over to the others and retrying
+        with backoff once all of them failed.
+
+        Args:
+            on_retry (callable, optional): Called every time the request is sent again.
+            until (callable, optional): Stream the answer and stop the generation as soon as this
+                returns the length of the part to keep, given the text generated so far.
+            **kwargs: The arguments of ollama.AsyncClient.generate.
+
+        Returns:
+            dict: The response.
+        """
+        excluded = set()
+        attempt = [1]
+        error = None
+        while True:
+            endpoint = await self._next_endpoint(excluded, attempt, error, on_retry)
+            started = time.monotonic()
+            try:
+                response = await self._send(endpoint, kwargs, until)
+            except BaseException as e:
+                if isinstance(e, TRANSPORT_ERRORS):
+                    outcome = self.UNREACHABLE
+                elif isinstance(e, Exception):
+                    outcome = self.ERROR
+                else:
+                    outcome = self.CANCELLED
+                self._release(endpoint, started, outcome)
+                if not self._retryable(e):
+                    raise
+                excluded.add(endpoint)
+                error = e
+                continue
+            self._release(endpoint, started, self.COMPLETED)
+            return response
+
+    @classmethod
+    async def _send(cls, endpoint, kwargs, until=None):
+        """
+        Send a generate request to an endpoint, as a task the health checks can cancel.
+
+        Args:
+            endpoint (Endpoint): The endpoint.
+            kwargs (dict): The arguments of ollama.AsyncClient.generate.
+            until (callable, optional): Stream the answer and stop early, see _stream.
+
+        Returns:
+            dict: The response.
+
+        Raises:
+            EndpointDown: If the request was cancelled because the endpoint went down.
+        """
+        if until is None:
+            request = asyncio.ensure_future(endpoint.client.generate(**kwargs))
+        else:
+            request = asyncio.ensure_future(cls._stream(endpoint.client, kwargs, until))
+        endpoint.in_flight.add(request)
+        try:
+            return await request
+        except asyncio.CancelledError:
+            # Cancelling the caller cancels the request as well, which must not be retried.
+            if request not in endpoint.abandoned:
+                raise
+            raise EndpointDown(f"Ollama endpoint {endpoint.url} is down") from None
+        finally:
+            endpoint.in_flight.discard(request)
+            endpoint.abandoned.discard(request)
+
+    @staticmethod
+    async def _stream(client, kwargs, until):
+        """
+        Stream a generate request and stop it once the answer is complete.
+
+        Closing the stream closes the connection, which makes Ollama stop generating, so a model that
+        keeps writing after its answer does not hold the GPU until num_predict is reached.
+
+        Args:
+            client (ollama.AsyncClient): The client of the endpoint.
+            kwargs (dict): The arguments of ollama.AsyncClient.generate.
+            until (callable): Given the text generated so far, returns the length of the answer once it
+                is complete, None before.
+
+        Returns:
+            dict: The final response. A stopped response holds the answer and the number of chunks
+                received as eval_count, as Ollama only reports its counters at the end.
+        """
+        stream = await client.generate(stream=True, **kwargs)
+        text = ""
+        chunks = 0
+        response = {}
+        try:
+            async for chunk in stream:
+                response = dict(chunk)
+                text += chunk.get('response') or ""
+                chunks += 1
+                end = until(text)
+                if end is not None and not chunk.get('done'):
+                    response.update(response=text[:end], done=True, done_reason="stop", eval_count=chunks)
+                    return response
+        finally:
+            await stream.aclose()
+        response['response'] = text
+        return response
+
+    def warm_up(self, model, keep_alive):
+        """
+        Load a model on every endpoint in the background, so the first request does not pay for it.
+
+        Args:
+            model (str): The model to load.
+            keep_alive (str): How long the servers should keep the model loaded.
+
+        Returns:
+            concurrent.futures.Future: Completes once every endpoint has answered.
+        """
+        async def load(endpoint):
+            try:
+                await endpoint.client.generate(model=model, prompt="", keep_alive=keep_alive)
+                log_info(f"Loaded {model} on ollama endpoint {endpoint.url}")
+            except Exception as e:
+                log_warn(f"Failed to load {model} on ollama endpoint {endpoint.url}: {e}")
+
+        async def load_all():
+            await asyncio.gather(*(load(endpoint) for endpoint in self.endpoints))
+
+        return self.event_loop.submit(load_all())
+
+    def list(self):
+        """
+        List the models of the first endpoint that answers.
+
+        Returns:
+            ListResponse: The models available on the endpoint.
+        """
+        return self.event_loop.run(self.list_async())
+
+    async def list_async(self):
+        """
+        List the models of the first endpoint that answers.
+
+        Returns:
+            ListResponse: The models available on the endpoint.
+        """
+        error = None
+        for endpoint in sorted(self.endpoints, key=lambda endpoint: not endpoint.healthy):
+            try:
+                return await endpoint.client.list()
+            except TRANSPORT_ERRORS as e:
+                error = e
+        raise RuntimeError("All Ollama endpoints are unreachable.") from error
+
+    def snapshot(self):
+        """
+        Capture the counters of every endpoint, to report on a single run later.
+
+        Returns:
+            dict: The completed requests, failures, errors and busy seconds per endpoint URL.
+        """
+        with self._lock:
+            return {endpoint.url: (endpoint.requests, endpoint.failures, endpoint.errors, endpoint.busy_seconds)
+                    for endpoint in self.endpoints}
+
+    def report(self, since=None, elapsed=None):
+        """
+        Summarize the per-endpoint throughput.
+
+        Args:
+            since (dict, optional): A snapshot taken at the start of the run.
+            elapsed (float, optional): The wall-clock duration of the run in seconds.
+
+        Returns:
+            list: One dict per endpoint with its URL, health, completed requests, failures, errors and
+                requests per minute.
+        """
+        since = since or {}
+        rows = []
+        with self._lock:
+            for endpoint in self.endpoints:
+                requests, failures, errors, busy_seconds = since.get(endpoint.url, (0, 0, 0, 0.0))
+                requests = endpoint.requests - requests
+                row = {
+                    "url": endpoint.url,
+                    "healthy": endpoint.healthy,
+                    "requests": requests,
+                    "failures": endpoint.failures - failures,
+                    "errors": endpoint.errors - errors,
+                    "mean_latency": (endpoint.busy_seconds - busy_seconds) / requests if requests else 0.0,
+                }
+                if elapsed:
+                    row["requests_per_minute"] = requests * 60 / elapsed
+                rows.append(row)
+        return rows
+
+    def log_report(self, since=None, elapsed=None):
+        """
+        Log the per-endpoint throughput.
+
+        Args:
+            since (dict, optional): A snapshot taken at the start of the run.
+            elapsed (float, optional): The wall-clock duration of the run in seconds.
+        """
+        for row in self.report(since, elapsed):
+            rate = f", {row['requests_per_minute']:.1f} requests/min" if "requests_per_minute" in row else ""
+            log_info(f"Ollama endpoint {row['url']}: {row['requests']} requests, {row['failures']} failures, "
+                     f"{row['errors']} errors, {row['mean_latency']:.2f}s mean latency{rate}")
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+class EventLoopThread:
+    """
+    An asyncio event loop running on its own daemon thread.
+
+    All network I/O of the plugin runs on this loop. Background tasks submit coroutines to it from
+    their own threads and wait for the results.
+
+    Attributes:
+        loop (asyncio.AbstractEventLoop): The event loop.
+    """
+    def __init__(self):
+        """
+        Initialize the EventLoopThread and start the loop.
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="ollama-event-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the loop without waiting for it.
+
+        Args:
+            coroutine (coroutine): The coroutine to run.
+
+        Returns:
+            concurrent.futures.Future: The future of the coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine):
+        """
+        Run a coroutine on the loop and wait for its result.
+
+        Args:
+            coroutine (coroutine): The coroutine to run.
+
+        Returns:
+            object: The result of the coroutine.
+        """
+        return self.submit(coroutine).result()
@@ -0,0 +1,23 @@
+"""
+Headless batch renaming. Requires a Binary Ninja license with headless support.
+
+    python headless.py --model llama3:latest --jobs 4 --output names @binaries.txt
+
+See batch.py for the options.
+"""
+import os
+import sys
+import types
+
+# Make the plugin importable as a package, so its relative imports resolve. This also runs in the
+# spawned worker processes, which import this file as their main module.
+PACKAGE = "binaryninja_ollama"
+if PACKAGE not in sys.modules:
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [os.path.dirname(os.path.abspath(__file__))]
+    sys.modules[PACKAGE] = package
+
+from binaryninja_ollama.batch import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import json
+import keyword
+import re
+import unicodedata
+
+# The identifiers models are constrained to answer with: snake_case, starting with a letter.
+IDENTIFIER_PATTERN = "^[a-z][a-z0-9_]*$"
+MAX_IDENTIFIER_LENGTH = 64
+
+# More words than this reads like a description rather than a name.
+MAX_IDENTIFIER_WORDS = 8
+
+# Words that cannot be used as names in the decompiled C or in Python scripts. They get a trailing
+# underscore, e.g. class_.
+RESERVED_NAMES = set(keyword.kwlist) | {
+    "auto", "bool", "break", "case", "char", "const", "continue", "default", "do", "double", "else",
+    "enum", "extern", "float", "for", "goto", "if", "inline", "int", "long", "register", "restrict",
+    "return", "short", "signed", "sizeof", "static", "struct", "switch", "typedef", "union",
+    "unsigned", "void", "volatile", "while", "true", "false", "null", "nullptr",
+}
+
+# Names Binary Ninja generates from an address or offset: sub_401000, its thunk j_sub_401000, data_404000
+# and var_18. An answer like this would leave the function or variable looking unnamed.
+_GENERATED_NAME = re.compile(r"^(?:j_)?(?:sub|data|var)_(?=[0-9a-f]*[0-9])[0-9a-f]+$")
+
+# Names Binary Ninja gives variables that were not named by a user: stack and argument slots, a few
+# roles like loop counters, each optionally with a suffix for further versions. Register-named variables
+# are checked against the registers of the architecture.
+_GENERATED_VARIABLE_NAME = re.compile(r"^(?:var_[0-9a-f]+|arg_?[0-9a-f]+|i|j|k|result|cond(?:_[0-9a-f]+)?)(?:_\d+)?$")
+_VERSION_SUFFIX = re.compile(r"_\d+$")
+
+# Words that say nothing about what a function does. A name made up only of them, like process_data
+# or handle_function, is generic.
+GENERIC_WORDS = {
+    "data", "do", "execute", "func", "function", "generic", "get", "handle", "handler", "helper", "impl",
+    "info", "internal", "logic", "main", "misc", "operation", "perform", "process", "routine", "run",
+    "set", "something", "stuff", "sub", "task", "thing", "unknown", "util", "utility", "value", "work",
+    "wrapper",
+}
+
+_CAMEL_CASE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+def identifier_schema(keys=("name",)):
+    """
+    Build the JSON schema of a structured answer holding one identifier per key.
+
+    Passed as the format of a generate request, it constrains the model to a JSON object whose values
+    are snake_case identifiers, so it cannot answer with a sentence.
+
+    Args:
+        keys (iterable): The keys of the answer, e.g. the current variable names.
+
+    Returns:
+        dict: The JSON schema.
+    """
+    keys = list(keys)
+    identifier = {"type": "string", "pattern": IDENTIFIER_PATTERN, "maxLength": MAX_IDENTIFIER_LENGTH}
+    return {"type": "object", "properties": {key: identifier for key in keys}, "required": keys}
+
+def is_valid_identifier(name):
+    """
+    Check whether a name can be applied as it is.
+
+    Args:
+        name (str): The name.
+
+    Returns:
+        bool: True for a snake_case identifier that is neither reserved nor a generated name.
+    """
+    return (isinstance(name, str) and re.fullmatch(IDENTIFIER_PATTERN, name) is not None
+            and len(name) <= MAX_IDENTIFIER_LENGTH and name not in RESERVED_NAMES and not _GENERATED_NAME.match(name))
+
+def sanitize_identifier(text):
+    """
+    Turn a model's answer into a usable snake_case identifier.
+
+    Quotes and call parentheses are dropped, accented letters lose their accents, camelCase and
+    separators such as spaces or dashes become underscores, leading digits are removed, long names are
+    cut at a word boundary and reserved words get a trailing underscore. Answers with letters that have
+    no ASCII form, e.g. Cyrillic or CJK, are rejected rather than cut down to their ASCII part.
+
+    Args:
+        text (str): The answer.
+
+    Returns:
+        str: The identifier, or None if the answer cannot be turned into a name.
+    """
+    if not isinstance(text, str):
+        return None
+    text = text.strip().strip("`'\"").split("(", 1)[0]
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    if any(char.isalnum() and not char.isascii() for char in text):
+        return None
+    name = _SEPARATORS.sub("_", _CAMEL_CASE.sub("_", text).lower()).strip("_").lstrip("0123456789_")
+    words = name.split("_")
+    if not name or len(words) > MAX_IDENTIFIER_WORDS:
+        return None
+    while len(name) > MAX_IDENTIFIER_LENGTH and len(words) > 1:
+        words.pop()
+        name = "_".join(words)
+    name = name[:MAX_IDENTIFIER_LENGTH]
+    if name in RESERVED_NAMES:
+        name += "_"
+    return name if is_valid_identifier(name) else None
+
+def parse_names(text, keys):
+    """
+    Read the identifiers of a structured answer.
+
+    Args:
+        text (str): The JSON answer.
+        keys (iterable): The keys to read.
+
+    Returns:
+        tuple: (names, sanitized) where names maps every key with a usable answer to its identifier,
+            and sanitized is the number of answers that had to be repaired.
+    """
+    try:
+        answer = json.loads(text)
+    except ValueError:
+        answer = None
+    if not isinstance(answer, dict):
+        return {}, 0
+    names = {}
+    sanitized = 0
+    for key in keys:
+        value = answer.get(key)
+        name = sanitize_identifier(value)
+        if name is not None:
+            names[key] = name
+            sanitized += name != value
+    return names, sanitized
+
+def json_object_end(text):
+    """
+    Find where the JSON object a structured answer starts with is closed.
+
+    Models constrained to a JSON format can keep generating whitespace after the object until
+    num_predict is reached, so a streamed answer is complete at this point.
+
+    Args:
+        text (str): The answer generated so far.
+
+    Returns:
+        int: The index after the closing brace, or None while the object is still open.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return None
+
+def is_generated_variable_name(name, registers=()):
+    """
+    Check whether a variable still has the name Binary Ninja gave it, judging from the name alone.
+
+    This is a fallback for where Function.is_var_user_defined is not available: a user may well have
+    chosen a name like result or i on purpose.
+
+    Args:
+        name (str): The name of the variable.
+        registers (iterable): The register names of the architecture, e.g. rax or x0.
+
+    Returns:
+        bool: True for names like var_18, arg2, rax_1 or result, False for names chosen by a user.
+    """
+    return bool(_GENERATED_VARIABLE_NAME.match(name)) or _VERSION_SUFFIX.sub("", name) in registers
+
+def is_generic_name(name):
+    """
+    Check whether a name only consists of words that say nothing about what a function does.
+
+    Args:
+        name (str): The name.
+
+    Returns:
+        bool: True for names like process_data or do_something.
+    """
+    return all(word in GENERIC_WORDS or word.isdigit() for word in name.split("_") if word)
+
+def name_agreement(name, samples):
+    """
+    Estimate the confidence in a name from how well independently sampled answers agree with it.
+
+    A sample agrees when it shares at least half of the words of the two names, so parse_header and
+    parse_http_header agree while parse_header and free_buffer do not.
+
+    Args:
+        name (str): The name.
+        samples (list): The sampled names, None where a sample had no usable answer.
+
+    Returns:
+        float: The share of samples agreeing with the name, 1.0 without samples.
+    """
+    if not samples:
+        return 1.0
+    words = set(name.split("_"))
+    agreeing = 0
+    for sample in samples:
+        if sample is not None:
+            sample_words = set(sample.split("_"))
+            agreeing += len(words & sample_words) * 2 >= len(words | sample_words)
+    return agreeing / len(samples)
@@ -1,6 +1,14 @@
-from ollama import Client, list, ListResponse
-from binaryninja import log_info
-from .rename_tasks import RenameAllFunctions, RenameVariable, RenameFunction, RenameFunctionVariables
+import os
+import time
+from binaryninja import log_info, user_directory
+from .auto_rename import AutoRenamer
+from .cache import ContextCache, HlilCache, ResponseCache
+from .event_loop import EventLoopThread
+from .telemetry import Telemetry
+from .naming import identifier_schema, is_generic_name, json_object_end, name_agreement, parse_names
+from .prompts import estimate_tokens
+from .similarity import SimilarityIndex
+from .rename_tasks import IndexFunctionNames, RenameAllFunctions, RenameAllVariables, RenameVariable, RenameFunction, RenameFunctionVariables
 
 class OllamaClient:
     """
@@ -8,6 +16,29 @@ class OllamaClient:
     """
     _instance = None
 
+    # Bump whenever a prompt template changes so stale cached responses are not reused.
+    TEMPLATE_VERSION = 3
+
+    # Instructions shared by every question about a single function. They come before the HLIL and
+    # never change, so the servers can reuse their KV prefix cache across requests.
+    BASE_PROMPT = (
+        "You are given the HLIL decompiled code of a function. "
+        "Answer the question that follows the Function with names only, without any explanation or other text. "
+    )
+
+    # Hard caps on the number of tokens generated for a single name.
+    FUNCTION_NAME_MAX_TOKENS = 32
+    VARIABLE_NAME_MAX_TOKENS = 16
+
+    # Tokens of the JSON object wrapped around a structured answer.
+    JSON_OVERHEAD_TOKENS = 8
+
+    # Temperature of the answers sampled from the fast model to estimate its confidence.
+    SAMPLE_TEMPERATURE = 0.8
+
+    # Functions with fewer HLIL lines than this may be packed into one request with other small functions.
+    PACKED_FUNCTION_MAX_LINES = 10
+
     def __new__(cls, bv):
         """
         Ensure that only one instance of the class is created.
@@ -36,6 +67,22 @@ class OllamaClient:
             self.port = None
             self.client = None
             self.model = None
+            self.fast_model = None
+            self.cascade_samples = 2
+            self.cascade_confidence = 0.5
+            self.parallel_requests = 4
+            self.prompt_token_budget = 4000
+            self.pack_token_budget = 1000
+            self.rename_chunk_size = 200
+            self.prefetch_megabytes = 16
+            self.keep_alive = "30m"
+            self.event_loop = None
+            self.telemetry = Telemetry(os.path.join(user_directory(), "ollama", "reports"))
+            self.cache = ResponseCache(os.path.join(user_directory(), "ollama", "response_cache.sqlite"))
+            self.contexts = ContextCache()
+            self.hlil_cache = HlilCache()
+            self.similarity = SimilarityIndex(os.path.join(user_directory(), "ollama", "similarity_index.sqlite"))
+            self.auto_renamer = None
             self._initialized = True
 
     def get_host(self):
@@ -43,7 +90,7 @@ class OllamaClient:
         Get the current host.
 
         Returns:
-            str: The current host.
+            str: The current host, or several hosts separated by commas.
         """
         return self.host
 
@@ -65,12 +112,138 @@ class OllamaClient:
         """
         return self.model
 
+    def get_fast_model(self):
+        """
+        Get the fast model function names are asked from first.
+
+        Returns:
+            str: The fast model, or None if the cascade is disabled.
+        """
+        return self.fast_model
+
+    def get_cascade_samples(self):
+        """
+        Get the number of answers sampled from the fast model to estimate its confidence.
+
+        Returns:
+            int: The number of samples, 0 if the confidence is not checked.
+        """
+        return self.cascade_samples
+
+    def get_cascade_confidence(self):
+        """
+        Get the share of samples that must agree with a fast answer for it to be kept.
+
+        Returns:
+            float: The confidence threshold.
+        """
+        return self.cascade_confidence
+
+    def get_parallel_requests(self):
+        """
+        Get the maximum number of requests kept in flight by bulk tasks.
+
+        Returns:
+            int: The maximum number of concurrent requests.
+        """
+        return self.parallel_requests
+
+    def get_prompt_token_budget(self):
+        """
+        Get the maximum number of tokens the HLIL of a function may take up in a prompt.
+
+        Returns:
+            int: The prompt token budget.
+        """
+        return self.prompt_token_budget
+
+    def get_pack_token_budget(self):
+        """
+        Get the maximum number of HLIL tokens of small functions packed into one request.
+
+        Returns:
+            int: The pack token budget, 0 if packing is disabled.
+        """
+        return self.pack_token_budget
+
+    def get_rename_chunk_size(self):
+        """
+        Get the number of suggested function names applied to the BinaryView at once by bulk renaming.
+
+        Returns:
+            int: The rename chunk size.
+        """
+        return self.rename_chunk_size
+
+    def get_prefetch_megabytes(self):
+        """
+        Get the amount of HLIL bulk renaming may prepare ahead of the requests.
+
+        Returns:
+            int: The size of the HLIL prefetch buffer in megabytes.
+        """
+        return self.prefetch_megabytes
+
+    def get_keep_alive(self):
+        """
+        Get how long the servers keep the model loaded after a request.
+
+        Returns:
+            str: The keep alive duration, e.g. "30m".
+        """
+        return self.keep_alive
+
+    def get_telemetry(self):
+        """
+        Get the performance telemetry of the client.
+
+        Returns:
+            Telemetry: The telemetry.
+        """
+        return self.telemetry
+
+    def get_endpoint_pool(self):
+        """
+        Get the pool of Ollama servers requests are routed to.
+
+        Returns:
+            EndpointPool: The endpoint pool, or None if the client is not initialized.
+        """
+        return self.client
+
+    def get_cache(self):
+        """
+        Get the persistent response cache.
+
+        Returns:
+            ResponseCache: The response cache.
+        """
+        return self.cache
+
+    def get_hlil_cache(self):
+        """
+        Get the in-memory cache of rendered HLIL.
+
+        Returns:
+            HlilCache: The HLIL cache.
+        """
+        return self.hlil_cache
+
+    def get_similarity_index(self):
+        """
+        Get the persistent index of accepted function names.
+
+        Returns:
+            SimilarityIndex: The similarity index.
+        """
+        return self.similarity
+
     def set_host(self, host):
         """
         Set the host.
 
         Args:
-            host (str): The host to be set.
+            host (str): The host to be set, or several hosts separated by commas.
         """
         self.host = host
 
@@ -87,17 +260,125 @@ class OllamaClient:
         """
         Set the model.
 
+        The model is loaded on the servers in the background, so the first rename does not wait for it.
+
         Args:
             model (str): The model to be set.
         """
         self.model = model
+        if self.client is not None:
+            self.client.warm_up(self.model, self.keep_alive)
+
+    def set_fast_model(self, fast_model):
+        """
+        Set the fast model function names are asked from first, before escalating to the model.
+
+        Args:
+            fast_model (str): The fast model, or None to send every function to the model.
+        """
+        self.fast_model = fast_model or None
+        if self.client is not None and self.fast_model is not None:
+            self.client.warm_up(self.fast_model, self.keep_alive)
+
+    def set_cascade_samples(self, cascade_samples):
+        """
+        Set the number of answers sampled from the fast model to estimate its confidence.
+
+        Args:
+            cascade_samples (int): The number of samples, 0 to only escalate invalid and generic names.
+        """
+        self.cascade_samples = max(0, int(cascade_samples))
+
+    def set_cascade_confidence(self, cascade_confidence):
+        """
+        Set the share of samples that must agree with a fast answer for it to be kept.
+
+        Args:
+            cascade_confidence (float): The confidence threshold between 0 and 1.
+        """
+        self.cascade_confidence = min(1.0, max(0.0, float(cascade_confidence)))
+
+    def set_keep_alive(self, keep_alive):
+        """
+        Set how long the servers keep the model loaded after a request.
+
+        Args:
+            keep_alive (str): The keep alive duration, e.g. "30m", or "-1" to keep it loaded indefinitely.
+        """
+        self.keep_alive = keep_alive
+
+    def set_parallel_requests(self, parallel_requests):
+        """
+        Set the maximum number of requests kept in flight by bulk tasks.
+
+        This should usually match OLLAMA_NUM_PARALLEL on the server.
+
+        Args:
+            parallel_requests (int): The maximum number of concurrent requests.
+        """
+        self.parallel_requests = max(1, int(parallel_requests))
     
+    def set_prompt_token_budget(self, prompt_token_budget):
+        """
+        Set the maximum number of tokens the HLIL of a function may take up in a prompt.
+
+        This should stay below the context size of the model, or prompts will be truncated by the server.
+
+        Args:
+            prompt_token_budget (int): The prompt token budget.
+        """
+        self.prompt_token_budget = max(1, int(prompt_token_budget))
+
+    def set_pack_token_budget(self, pack_token_budget):
+        """
+        Set the maximum number of HLIL tokens of small functions packed into one request.
+
+        Args:
+            pack_token_budget (int): The pack token budget, 0 to send every function on its own.
+        """
+        self.pack_token_budget = max(0, int(pack_token_budget))
+
+    def set_rename_chunk_size(self, rename_chunk_size):
+        """
+        Set the number of suggested function names applied to the BinaryView at once by bulk renaming.
+
+        Larger chunks mean fewer analysis updates, smaller chunks make names show up sooner.
+
+        Args:
+            rename_chunk_size (int): The rename chunk size.
+        """
+        self.rename_chunk_size = max(1, int(rename_chunk_size))
+
+    def set_prefetch_megabytes(self, prefetch_megabytes):
+        """
+        Set the amount of HLIL bulk renaming may prepare ahead of the requests.
+
+        HLIL is generated and rendered on a separate thread while requests are running. Once this much
+        is waiting to be sent, the thread pauses until the requests catch up.
+
+        Args:
+            prefetch_megabytes (float): The size of the HLIL prefetch buffer in megabytes.
+        """
+        self.prefetch_megabytes = max(1, float(prefetch_megabytes))
+
     def init_client(self):
         """
         Initialize the Ollama client.
+
+        The host may list several servers separated by commas. Requests are then routed over all of them
+        by an EndpointPool, which runs them on the client's event loop. The ollama and httpx modules are
+        imported and the event loop is started here, the first time a server is configured.
         """
         if self.host is not None and self.port is not None:
-            self.client = Client(host=f"{self.host}:{self.port}")
+            from .endpoints import EndpointPool, parse_endpoints
+            if self.event_loop is None:
+                self.event_loop = EventLoopThread()
+            if self.client is not None:
+                self.client.close()
+            self.client = EndpointPool(parse_endpoints(self.host, self.port), self.event_loop)
+            for model in (self.model, self.fast_model):
+                if model is not None:
+                    self.client.warm_up(model, self.keep_alive)
 
     def is_set(self):
         """
@@ -134,7 +415,7 @@ class OllamaClient:
             except Exception as e:
                 raise RuntimeError("Client initialization failed. Check server configuration.") from e
         try:
-            response: ListResponse = list()
+            response = self.client.list()
             models = []
             for model in response.models:
                 models.append(model.model)
@@ -142,77 +423,405 @@ class OllamaClient:
         except Exception as e:
             raise Exception("Failed to retrieve models from the Ollama server.") from e
 
-    def get_variable_name(self, variable, hlil):
+    def get_variable_name(self, variable, hlil, telemetry=None, function=None):
         """
         Get a suggested name for a variable.
 
         Args:
             variable (str): The current variable name.
             hlil (str): The HLIL decompiled code snippet.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            function (int, optional): The start address of the function, to reuse its conversation context.
 
         Returns:
             str: The suggested variable name.
         """
-        prompt = (
-                     f"In one word, what should the variable '{variable}' be named in the below Function? "
-                     f"The name must meet the following criteria: all lowercase letters, usable in Python code"
+        question = (
+            f"In one word, what should the variable '{variable}' be named in the above Function? "
+            f"The name must meet the following criteria: all lowercase letters, usable in Python code. "
+            f"Respond with a JSON object holding the name as \"name\"."
         )
-        prompt += f"Function:\n{hlil}\n\n"
-        response = self.generate(
-            model=self.model,
-            prompt=prompt,
-            stream=False
-        ) 
-        variable_name = response['response']
-        
-        # Check if the variable name is a single word with no spaces
-        if " " not in variable_name.strip():
-            return variable_name.strip()
-        else:
-            return None
+        return self.generate_identifier(hlil, question, self.VARIABLE_NAME_MAX_TOKENS, telemetry, function)
+
+    def get_variable_names(self, variables, hlil, telemetry=None, function=None, function_name=None):
+        """
+        Get suggested names for several variables of a function with a single request.
+
+        Variables that are missing from the answer or received an invalid name are asked for again in
+        one small follow-up request. The follow-up reuses the conversation context of the first request
+        when one is available, and otherwise only contains the HLIL lines mentioning the variables.
+
+        Args:
+            variables (list): The current variable names.
+            hlil (str): The HLIL decompiled code snippet.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            function (int, optional): The start address of the function, to reuse its conversation context.
+            function_name (str, optional): The name of the function, as extra context when it was named.
+
+        Returns:
+            dict: A mapping of current variable names to suggested names. Variables without a proper
+                suggestion are left out.
+        """
+        if not variables:
+            return {}
+        names = self._request_variable_names(variables, hlil, telemetry, function, function_name)
+        missing = [variable for variable in variables if variable not in names]
+        if missing:
+            if function is None or self.contexts.get(self.model, function, self.hlil_cache.version(hlil)) is None:
+                lines = [line for line in hlil.splitlines() if any(variable in line for variable in missing)]
+                hlil = "\n".join(lines) or hlil
+                function = None
+            names.update(self._request_variable_names(missing, hlil, telemetry, function, function_name))
+        return names
+
+    def _request_variable_names(self, variables, hlil, telemetry=None, function=None, function_name=None):
+        """
+        Send one structured request asking for a name for every given variable.
+
+        Args:
+            variables (list): The current variable names.
+            hlil (str): The HLIL decompiled code snippet.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            function (int, optional): The start address of the function, to reuse its conversation context.
+            function_name (str, optional): The name of the function, as extra context when it was named.
+
+        Returns:
+            dict: A mapping of current variable names to valid suggested names.
+        """
+        # The name goes into the question rather than the base prompt, which stays shared by every
+        # question about the function.
+        question = (
+            (f"The above Function is named '{function_name}'. " if function_name else "") +
+            f"For each of the variables {', '.join(repr(variable) for variable in variables)} in the above Function, "
+            f"suggest a one word name. The names must meet the following criteria: all lowercase letters, usable in Python code. "
+            f"Respond with a JSON object that maps every current variable name to its new name."
+        )
+        response = self.ask(
+            hlil,
+            question,
+            function=function,
+            format=identifier_schema(variables),
+            options={"num_predict": self.VARIABLE_NAME_MAX_TOKENS * len(variables) + self.JSON_OVERHEAD_TOKENS},
+            telemetry=telemetry,
+            accept=lambda text: bool(parse_names(text, variables)[0])
+        )
+        return self.read_names(response, variables, telemetry)
 
-    def get_function_name(self, hlil):
+    def get_function_name(self, hlil, telemetry=None, function=None):
         """
         Get a suggested name for a function.
 
         Args:
             hlil (str): The HLIL decompiled code snippet.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            function (int, optional): The start address of the function, to reuse its conversation context.
 
         Returns:
             str: The suggested function name.
         """
+        if self.fast_model is not None:
+            return self.cascade_function_names([hlil], telemetry, function)[0]
+        return self._request_function_names([hlil], telemetry, function)[0]
+
+    def get_function_names(self, hlils, telemetry=None):
+        """
+        Get suggested names for several small functions with a single request.
+
+        Functions that are missing from the answer or received an invalid name, also after the model
+        cascade, are asked for again one by one with get_function_name.
+
+        Args:
+            hlils (list): The HLIL decompiled code snippet of every function.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+
+        Returns:
+            list: The suggested function names, in the order of hlils. None where no proper name was found.
+        """
+        if len(hlils) == 1:
+            return [self.get_function_name(hlils[0], telemetry)]
+        if self.fast_model is not None:
+            names = self.cascade_function_names(hlils, telemetry)
+        else:
+            names = self._request_function_names(hlils, telemetry)
+        return [name if name is not None else self.get_function_name(hlil, telemetry)
+                for name, hlil in zip(names, hlils)]
+
+    def cascade_function_names(self, hlils, telemetry=None, function=None):
+        """
+        Name functions with the fast model, escalating doubtful answers to the strong model.
+
+        An answer is escalated when it is not a usable name, when it is generic (e.g. process_data), or
+        when too few of cascade_samples answers sampled from the fast model at a higher temperature
+        agree with it. The samples are sent without the function's conversation context, which holds
+        the first answer, so they are independent of it. Escalated functions are sent to the strong
+        model together; if it has no usable answer either, the fast model's name is kept.
+
+        Args:
+            hlils (list): The HLIL decompiled code snippet of every function.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            function (int, optional): The start address of a single function, to reuse its conversation context.
+
+        Returns:
+            list: The suggested function names, in the order of hlils. None where no proper name was found.
+        """
+        names = self._request_function_names(hlils, telemetry, function, self.fast_model)
+        candidates = [i for i, name in enumerate(names) if name is not None and not is_generic_name(name)]
+        confidence = {i: 1.0 for i in candidates}
+        if candidates and self.cascade_samples:
+            samples = [self._request_function_names([hlils[i] for i in candidates], telemetry, None, self.fast_model,
+                                                    {"temperature": self.SAMPLE_TEMPERATURE, "seed": seed})
+                       for seed in range(1, self.cascade_samples + 1)]
+            for position, i in enumerate(candidates):
+                confidence[i] = name_agreement(names[i], [sample[position] for sample in samples])
+
+        escalated = []
+        for i, name in enumerate(names):
+            if name is None:
+                reason = "invalid"
+            elif is_generic_name(name):
+                reason = "generic"
+            elif confidence[i] < self.cascade_confidence:
+                reason = "low_confidence"
+            else:
+                continue
+            escalated.append(i)
+            if telemetry is not None:
+                telemetry.record_escalation(reason)
+        if telemetry is not None:
+            telemetry.record_tier("fast", len(hlils), len(hlils) - len(escalated))
+
+        if escalated:
+            strong = self._request_function_names([hlils[i] for i in escalated], telemetry,
+                                                  function if len(hlils) == 1 else None)
+            if telemetry is not None:
+                telemetry.record_tier("strong", len(escalated), sum(1 for name in strong if name is not None))
+            for i, name in zip(escalated, strong):
+                if name is not None:
+                    names[i] = name
+        return names
+
+    def _request_function_names(self, hlils, telemetry=None, function=None, model=None, options=None):
+        """
+        Ask one model for the names of one or more functions. Several functions are packed into one request.
+
+        Args:
+            hlils (list): The HLIL decompiled code snippet of every function.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            function (int, optional): The start address of a single function, to reuse its conversation context.
+            model (str, optional): The model to ask, defaults to the strong model.
+            options (dict, optional): Extra model options, e.g. the temperature and seed of a sample.
+
+        Returns:
+            list: The names, in the order of hlils. None where the answer had no usable name.
+        """
+        if len(hlils) == 1:
+            question = (
+                f"Provide a Python-style function name that describes what the above Function is doing. "
+                f"The name must meet the following criteria: all lowercase letters, usable in Python code, with underscores between words. "
+                f"Respond with a JSON object holding the function name as \"name\"."
+            )
+            return [self.generate_identifier(hlils[0], question, self.FUNCTION_NAME_MAX_TOKENS, telemetry, function,
+                                             model, options)]
+
         prompt = (
-            f"Given the following HLIL decompiled code snippet, provide a Python-style function name that describes what the code is doing. "
-            f"The name must meet the following criteria: all lowercase letters, usable in Python code, with underscores between words. "
-            f"Only return the function name and no other explanation or text data included."
+            f"Given the following numbered HLIL decompiled code snippets, provide a Python-style function name for each that describes what its code is doing. "
+            f"The names must meet the following criteria: all lowercase letters, usable in Python code, with underscores between words. "
+            f"Respond with a JSON object that maps every function number to its name."
         )
-        prompt += f"Function:\n{hlil}\n\n"
+        numbers = [str(number) for number in range(1, len(hlils) + 1)]
+        for number, hlil in zip(numbers, hlils):
+            prompt += f"Function {number}:\n{hlil}\n\n"
         response = self.generate(
-            model=self.model,
+            model=model or self.model,
             prompt=prompt,
-            stream=False
-        ) 
-        function_name = response['response']
-        
-        # Check if the function name is a single word with no spaces
-        if " " not in function_name.strip():
-            return function_name.strip()
-        else:
-            return None
-    
-    def generate(self, model, prompt, stream):
+            format=identifier_schema(numbers),
+            options={"num_predict": self.FUNCTION_NAME_MAX_TOKENS * len(hlils) + self.JSON_OVERHEAD_TOKENS, **(options or {})},
+            telemetry=telemetry,
+            accept=lambda text: bool(parse_names(text, numbers)[0])
+        )
+        names = self.read_names(response, numbers, telemetry)
+        return [names.get(number) for number in numbers]
+
+    def render_function_hlil(self, hlil, focus=(), telemetry=None):
+        """
+        Render the HLIL of a function for a prompt within the prompt token budget, reusing the rendering
+        of earlier commands while the function's analysis is unchanged.
+
+        Args:
+            hlil (HighLevelILFunction): The HighLevelIL representation of the function.
+            focus (iterable, optional): Names of variables whose lines must be kept.
+            telemetry (TaskTelemetry, optional): The counters of the task, which record the cache hit rate.
+
+        Returns:
+            str: The rendered HLIL.
+        """
+        text, hit = self.hlil_cache.render(hlil, self.prompt_token_budget, focus)
+        if telemetry is not None:
+            telemetry.record_render(hit)
+        return text
+
+    def base_prompt(self, hlil):
+        """
+        Build the part of a prompt that is shared by every question about a function.
+
+        The static instructions come first and are identical for every request, so servers can reuse
+        their KV prefix cache for them. The question follows the HLIL.
+
+        Args:
+            hlil (str): The HLIL decompiled code snippet.
+
+        Returns:
+            str: The base prompt.
+        """
+        return f"{self.BASE_PROMPT}Function:\n{hlil}\n\n"
+
+    def ask(self, hlil, question, function=None, format=None, options=None, telemetry=None, model=None, accept=None):
+        """
+        Ask a question about a function, reusing the function's conversation context when one is stored.
+
+        With a stored context only the question is sent. Otherwise the base prompt is sent along with
+        the question and the returned context is stored for later questions about the same function.
+
+        Args:
+            hlil (str): The HLIL decompiled code snippet.
+            question (str): The question about the function.
+            function (int, optional): The start address of the function, None to send the whole prompt
+                without storing a context.
+            format (str or dict, optional): The structured output format, "json" or a JSON schema.
+            options (dict, optional): Model options such as num_predict.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            model (str, optional): The model to ask, defaults to the strong model.
+            accept (callable, optional): Given the answer, whether it is usable and may be cached.
+
+        Returns:
+            dict: The response.
+        """
+        model = model or self.model
+        prompt = self.base_prompt(hlil) + question
+        context = None
+        version = None
+        if function is not None:
+            version = self.hlil_cache.version(hlil)
+            context = self.contexts.get(model, function, version)
+
+        response = self.generate(
+            model=model,
+            prompt=question if context is not None else prompt,
+            format=format,
+            options=options,
+            telemetry=telemetry,
+            context=context,
+            cache_prompt=prompt,
+            accept=accept
+        )
+        if function is not None and context is None and response.get('context'):
+            self.contexts.put(model, function, version, response['context'])
+        return response
+
+    def generate_identifier(self, hlil, question, max_tokens, telemetry=None, function=None, model=None, options=None):
+        """
+        Generate a single identifier with a structured request.
+
+        The answer is constrained by a JSON schema to one snake_case identifier, so the model cannot
+        answer with a sentence, and it is checked and repaired locally before it is used.
+
+        Args:
+            hlil (str): The HLIL decompiled code snippet.
+            question (str): The question asking for the identifier.
+            max_tokens (int): The maximum number of tokens the model may generate for the name.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            function (int, optional): The start address of the function, to reuse its conversation context.
+            model (str, optional): The model to ask, defaults to the strong model.
+            options (dict, optional): Extra model options, e.g. the temperature and seed of a sample.
+
+        Returns:
+            str: The identifier, or None if the model did not answer with a usable name.
+        """
+        response = self.ask(
+            hlil,
+            question,
+            function=function,
+            format=identifier_schema(),
+            options={"num_predict": max_tokens + self.JSON_OVERHEAD_TOKENS, **(options or {})},
+            telemetry=telemetry,
+            model=model,
+            accept=lambda text: bool(parse_names(text, ["name"])[0])
+        )
+        return self.read_names(response, ["name"], telemetry).get("name")
+
+    def read_names(self, response, keys, telemetry=None):
+        """
+        Read the identifiers of a structured answer and record how useful the generation was.
+
+        Args:
+            response (dict): The response of a request with an identifier_schema format.
+            keys (list): The keys of the answer.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+
+        Returns:
+            dict: Maps every key with a usable answer to its identifier.
+        """
+        names, sanitized = parse_names(response['response'], keys)
+        if telemetry is not None and not response.get('cached'):
+            if names:
+                telemetry.record_names(len(names), sanitized)
+            else:
+                telemetry.record_wasted()
+        return names
+
+    def generate(self, model, prompt, format=None, options=None, telemetry=None, context=None, cache_prompt=None, accept=None):
         """
         Generate a response from the Ollama server.
 
+        Responses are served from and stored in the persistent response cache, which only keeps answers
+        that accept allows, so a rejected answer is asked again rather than replayed. Structured answers
+        are streamed and the generation is stopped as soon as the JSON object is closed.
+
         Args:
             model (str): The model to be used.
             prompt (str): The prompt to be sent.
-            stream (bool): Whether to stream the response.
+            format (str or dict, optional): The structured output format, "json" or a JSON schema.
+            options (dict, optional): Model options such as num_predict.
+            telemetry (TaskTelemetry, optional): The counters of the task making the request.
+            context (list, optional): The context of an earlier request the prompt continues.
+            cache_prompt (str, optional): The full prompt the answer depends on, used as the cache key
+                when prompt only holds a follow-up question.
+            accept (callable, optional): Given the answer, whether it is usable and may be cached. All
+                answers are cached without it.
 
         Returns:
-            dict: The response from the server.
-        """
-        return self.client.generate(model=model, prompt=prompt, stream=stream)
+            dict: The response from the server. Cached responses are marked with 'cached'.
+        """
+        kwargs = {}
+        if telemetry is not None:
+            kwargs['on_retry'] = telemetry.record_retry
+        if format is not None:
+            kwargs['format'] = format
+            kwargs['until'] = json_object_end
+        if options is not None:
+            kwargs['options'] = options
+        if context is not None:
+            kwargs['context'] = context
+
+        key = ResponseCache.make_key(model, self.TEMPLATE_VERSION, cache_prompt or prompt, format, options)
+        cached = self.cache.get(key)
+        if cached is not None and accept is not None and not accept(cached):
+            cached = None
+        if telemetry is not None:
+            telemetry.record_cache(cached is not None)
+        if cached is not None:
+            return {'response': cached, 'cached': True}
+
+        started = time.monotonic()
+        response = self.client.generate(model=model, prompt=prompt, keep_alive=self.keep_alive, **kwargs)
+        if not response.get('prompt_eval_count'):
+            # A stopped stream ends before Ollama reports the prompt size.
+            response['prompt_eval_count'] = estimate_tokens(cache_prompt or prompt)
+        if telemetry is not None:
+            telemetry.record_response(response, time.monotonic() - started)
+        if accept is None or accept(response['response']):
+            self.cache.put(key, response['response'])
+        return response
 
     def rename_function_variables(self, hlil):
         """
@@ -224,6 +833,13 @@ class OllamaClient:
         rename_function_variables = RenameFunctionVariables(self, self.bv, hlil)
         rename_function_variables.start()
 
+    def rename_all_variables(self):
+        """
+        Rename the variables of all functions in the current BinaryView.
+        """
+        rename_all_variables = RenameAllVariables(self, self.bv)
+        rename_all_variables.start()
+
     def rename_target_variable(self, inst):
         """
         Rename a target variable.
@@ -244,10 +860,47 @@ class OllamaClient:
         rename_target_function = RenameFunction(self, self.bv, hlil)
         rename_target_function.start()
 
-    def rename_all_functions(self):
+    def rename_all_functions(self, resume=False, review=None, dry_run=False, budget=None):
         """
         Rename all functions in the current BinaryView.
+
+        Args:
+            resume (bool): Whether to continue from the checkpoint of an earlier run.
+            review (callable, optional): Called with the suggested (function, name) tuples once the run
+                is done. Returns the tuples to apply.
+            dry_run (bool): Whether to only write the suggested names to a JSON file.
+            budget (RenameBudget, optional): The time and token budget of the run.
         """
-        rename_all_functions = RenameAllFunctions(self, self.bv)
+        rename_all_functions = RenameAllFunctions(self, self.bv, resume, review, dry_run, budget)
         rename_all_functions.start()
 
+    def index_function_names(self):
+        """
+        Add the named functions of the current BinaryView to the similarity index.
+        """
+        index_function_names = IndexFunctionNames(self, self.bv)
+        index_function_names.start()
+
+    def is_auto_rename_enabled(self):
+        """
+        Check whether new and changed functions are renamed automatically.
+
+        Returns:
+            bool: True if an AutoRenamer is registered with the current BinaryView.
+        """
+        return self.auto_renamer is not None
+
+    def set_auto_rename(self, enabled):
+        """
+        Start or stop renaming new and changed functions of the current BinaryView automatically.
+
+        Args:
+            enabled (bool): Whether functions are renamed automatically.
+        """
+        if enabled and self.auto_renamer is None:
+            self.auto_renamer = AutoRenamer(self, self.bv)
+            self.auto_renamer.start()
+        elif not enabled and self.auto_renamer is not None:
+            self.auto_renamer.stop()
+            self.auto_renamer = None
+
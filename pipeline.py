@@ -0,0 +1,158 @@
+import threading
+import time
+
+MEGABYTE = 1 << 20
+
+class HlilPrefetcher:
+    """
+    Prepares the HLIL of functions on a producer thread, ahead of the scheduler that sends it to the model.
+
+    Getting the HLIL of a function can force analysis, and rendering it takes time, during which the
+    servers would idle if both happened right before each request. The producer walks the items in
+    traversal order and keeps the rendered HLIL in a buffer until the scheduler takes it, pausing while
+    the buffer holds max_bytes or more, so memory stays flat on huge binaries. Runs that may stop early,
+    such as budgeted ones, also cap the number of buffered items so little HLIL is rendered in vain.
+
+    The scheduler takes items roughly, but not strictly, in traversal order. When it waits for an item
+    that was not produced yet, the producer ignores the cap until that item is produced, so the two
+    can never wait for each other.
+
+    Attributes:
+        max_bytes (int): The amount of rendered HLIL, in characters, the buffer may hold before the producer pauses.
+        max_items (int): The number of rendered items the buffer may hold before the producer pauses, None for no limit.
+        busy_seconds (float): The seconds the producer spent getting and rendering HLIL.
+        blocked_seconds (float): The seconds the producer waited because the buffer was full.
+        starved_seconds (float): The seconds the scheduler waited for HLIL that was not produced yet.
+        peak_bytes (int): The largest amount of rendered HLIL held in the buffer.
+    """
+    def __init__(self, items, render, max_bytes, size=len, max_items=None):
+        """
+        Initialize the HlilPrefetcher.
+
+        Args:
+            items (list): The items in traversal order, e.g. call graph nodes in bottom-up order.
+            render (callable): Called on the producer thread with an item. Returns its rendered HLIL, or
+                None if the item needs no request.
+            max_bytes (int): The amount of rendered HLIL the buffer may hold before the producer pauses.
+            size (callable): Returns the amount of rendered HLIL in a result of render, for results
+                that carry more than the HLIL.
+            max_items (int, optional): The number of rendered items the buffer may hold before the producer pauses.
+        """
+        self.max_bytes = max(1, int(max_bytes))
+        self.max_items = max(1, int(max_items)) if max_items is not None else None
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.starved_seconds = 0.0
+        self.peak_bytes = 0
+        self._items = items
+        self._render = render
+        self._size = size
+        self._position = {item: i for i, item in enumerate(items)}
+        self._buffer = {}
+        self._bytes = 0
+        self._count = 0
+        self._produced = 0
+        self._wanted = -1
+        self._stopped = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="HlilPrefetcher", daemon=True)
+
+    def start(self):
+        """
+        Start the producer thread.
+        """
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the producer thread and drop the HLIL that was not taken.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._buffer.clear()
+        self._bytes = 0
+        self._count = 0
+
+    def take(self, item):
+        """
+        Take the rendered HLIL of an item, waiting for the producer if it is not ready yet.
+
+        Args:
+            item: The item.
+
+        Returns:
+            str: The rendered HLIL, or None if the item needs no request.
+
+        Raises:
+            Exception: The error the producer ran into while rendering this or an earlier item.
+        """
+        index = self._position[item]
+        with self._condition:
+            if index >= self._produced and self._error is None:
+                waiting = time.perf_counter()
+                self._wanted = max(self._wanted, index)
+                self._condition.notify_all()
+                while index >= self._produced and self._error is None:
+                    self._condition.wait()
+                self.starved_seconds += time.perf_counter() - waiting
+            if index >= self._produced:
+                raise self._error
+            hlil = self._buffer.pop(index)
+            if hlil is not None:
+                self._bytes -= self._size(hlil)
+                self._count -= 1
+                self._condition.notify_all()
+            return hlil
+
+    def _run(self):
+        """
+        Render the HLIL of every item in traversal order until all are produced or the prefetcher is stopped.
+        """
+        try:
+            for index, item in enumerate(self._items):
+                with self._condition:
+                    if self._full() and self._wanted < index and not self._stopped:
+                        waiting = time.perf_counter()
+                        while self._full() and self._wanted < index and not self._stopped:
+                            self._condition.wait()
+                        self.blocked_seconds += time.perf_counter() - waiting
+                    if self._stopped:
+                        return
+                started = time.perf_counter()
+                hlil = self._render(item)
+                self.busy_seconds += time.perf_counter() - started
+                with self._condition:
+                    self._buffer[index] = hlil
+                    if hlil is not None:
+                        self._bytes += self._size(hlil)
+                        self._count += 1
+                        self.peak_bytes = max(self.peak_bytes, self._bytes)
+                    self._produced = index + 1
+                    self._condition.notify_all()
+        except Exception as error:
+            with self._condition:
+                self._error = error
+                self._condition.notify_all()
+
+    def _full(self):
+        """
+        Check whether the buffer is full. Must be called with the condition held.
+
+        Returns:
+            bool: True once the buffer holds max_bytes or max_items.
+        """
+        return self._bytes >= self.max_bytes or (self.max_items is not None and self._count >= self.max_items)
+
+    def record(self, telemetry):
+        """
+        Record the utilization of the producer and the time the scheduler waited for it.
+
+        Args:
+            telemetry (TaskTelemetry): The counters of the run.
+        """
+        telemetry.record_stage("hlil", self.busy_seconds)
+        telemetry.record_stage("hlil_blocked", self.blocked_seconds)
+        telemetry.record_stage("hlil_starved", self.starved_seconds)
@@ -1,7 +1,27 @@
 import os
-from binaryninja import PluginCommand, BinaryView, log_info, show_message_box, MessageBoxButtonSet, MessageBoxIcon
-from .ollama_client import OllamaClient
-from .ui import OllamaConnectionDialog, OllamaModelDialog
+from binaryninja import PluginCommand, BinaryView, log_info, log_warn, show_message_box, MessageBoxButtonSet, MessageBoxIcon, execute_on_main_thread_and_wait
+from .budget import RenameBudget
+from .naming import sanitize_identifier
+
+# Binary Ninja imports the plugin at startup, also in sessions that never use it. The client (ollama,
+# httpx, asyncio) and the dialogs (PySide6) are only imported once an Ollama command runs.
+_client = None
+
+def get_client(bv):
+    """
+    Get the Ollama client, importing and creating it the first time an Ollama command runs.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+
+    Returns:
+        OllamaClient: The single instance of the OllamaClient class.
+    """
+    global _client
+    if _client is None:
+        from .ollama_client import OllamaClient
+        _client = OllamaClient(bv)
+    return _client
 
 def set_server_dialog(bv):
     """
@@ -13,7 +33,8 @@ def set_server_dialog(bv):
     Returns:
         bool: True if the server details were set successfully, False otherwise.
     """
-    client = OllamaClient(bv)
+    from .ui import OllamaConnectionDialog
+    client = get_client(bv)
     dialog = OllamaConnectionDialog(client.get_host(), client.get_port())
     if dialog.exec_():
         host = dialog.host.text()
@@ -34,16 +55,173 @@ def set_model_dialog(bv):
     Returns:
         bool: True if the model was set successfully, False otherwise.
     """
-    client = OllamaClient(bv)
+    from .ui import OllamaModelDialog
+    client = get_client(bv)
     if not client.is_set():
         set_server_dialog(bv)
-    model_dialog = OllamaModelDialog(client.get_model(), client.get_available_models())
+    model_dialog = OllamaModelDialog(client.get_model(), client.get_available_models(), client.get_fast_model())
     if model_dialog.exec_():
         model = model_dialog.model_combo.currentText()
         client.set_model(model)
+        fast_model = model_dialog.fast_model_combo.currentText()
+        client.set_fast_model(None if fast_model == OllamaModelDialog.NO_FAST_MODEL else fast_model)
         return True
     return False
 
+def set_options_dialog(bv):
+    """
+    Display a dialog to set the performance options for the Ollama client.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+
+    Returns:
+        bool: True if the options were set successfully, False otherwise.
+    """
+    from .ui import OllamaOptionsDialog
+    client = get_client(bv)
+    cache = client.get_cache()
+    similarity = client.get_similarity_index()
+    dialog = OllamaOptionsDialog(client.get_parallel_requests(), client.get_prompt_token_budget(),
+                                 client.get_pack_token_budget(), client.get_rename_chunk_size(), client.get_prefetch_megabytes(), client.get_keep_alive(), cache.max_entries, cache.max_age / 86400,
+                                 similarity.threshold, client.get_cascade_samples(), client.get_cascade_confidence())
+    if dialog.exec_():
+        # Read every field before applying any, so a typo leaves all options unchanged.
+        try:
+            parallel_requests = int(dialog.parallel_requests.text())
+            prompt_token_budget = int(dialog.prompt_token_budget.text())
+            pack_token_budget = int(dialog.pack_token_budget.text())
+            rename_chunk_size = int(dialog.rename_chunk_size.text())
+            prefetch_megabytes = float(dialog.prefetch_megabytes.text())
+            cache_max_entries = int(dialog.cache_max_entries.text())
+            cache_max_age = float(dialog.cache_max_age.text())
+            similarity_threshold = float(dialog.similarity_threshold.text())
+            cascade_samples = int(dialog.cascade_samples.text())
+            cascade_confidence = float(dialog.cascade_confidence.text())
+        except ValueError:
+            show_message_box("Ollama Options", "Options must be numbers. No option was changed.",
+                             MessageBoxButtonSet.OKButtonSet, MessageBoxIcon.ErrorIcon)
+            return False
+        client.set_parallel_requests(parallel_requests)
+        client.set_prompt_token_budget(prompt_token_budget)
+        client.set_pack_token_budget(pack_token_budget)
+        client.set_rename_chunk_size(rename_chunk_size)
+        client.set_prefetch_megabytes(prefetch_megabytes)
+        client.set_keep_alive(dialog.keep_alive.text())
+        cache.max_entries = cache_max_entries
+        cache.max_age = cache_max_age * 86400
+        similarity.threshold = min(1.0, max(0.0, similarity_threshold))
+        client.set_cascade_samples(cascade_samples)
+        client.set_cascade_confidence(cascade_confidence)
+        return True
+    return False
+
+def clear_cache_command(bv):
+    """
+    Remove every response from the persistent Ollama response cache.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    cache = get_client(bv).get_cache()
+    entries = cache.size()
+    cache.clear()
+    log_info(f"Cleared {entries} cached ollama responses from {cache.path}")
+
+def show_cache_statistics_command(bv):
+    """
+    Display the size and hit/miss counters of the persistent Ollama response cache and the hit/miss
+    counters of the in-memory HLIL cache.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    client = get_client(bv)
+    cache = client.get_cache()
+    hlil_cache = client.get_hlil_cache()
+    show_message_box("Ollama Response Cache",
+                     f"Entries: {cache.size()}\nHits: {cache.hits}\nMisses: {cache.misses}\n"
+                     f"Hit rate: {cache.hit_rate():.1%}\nLocation: {cache.path}\n\n"
+                     f"HLIL cache hits: {hlil_cache.hits}\nHLIL cache misses: {hlil_cache.misses}\n"
+                     f"HLIL cache hit rate: {hlil_cache.hit_rate():.1%}",
+                     MessageBoxButtonSet.OKButtonSet, MessageBoxIcon.InformationIcon)
+
+def index_function_names_command(bv):
+    """
+    Add the named functions of the current BinaryView to the similarity index, so later builds reuse their names.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    get_client(bv).index_function_names()
+
+def clear_similarity_index_command(bv):
+    """
+    Remove every accepted name from the similarity index.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    index = get_client(bv).get_similarity_index()
+    entries = index.size()
+    index.clear()
+    log_info(f"Cleared {entries} function names from {index.path}")
+
+def enable_auto_rename_command(bv):
+    """
+    Rename functions automatically as analysis adds or changes them.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    client = get_client(bv)
+    if not client.is_set():
+        set_model_dialog(bv)
+    client.set_auto_rename(True)
+
+def disable_auto_rename_command(bv):
+    """
+    Stop renaming new and changed functions automatically.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    get_client(bv).set_auto_rename(False)
+
+def is_auto_rename_disabled(bv):
+    """
+    Check whether the command enabling automatic renaming applies.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+
+    Returns:
+        bool: True if functions are not renamed automatically yet.
+    """
+    return _client is None or not _client.is_auto_rename_enabled()
+
+def is_auto_rename_enabled(bv):
+    """
+    Check whether the command disabling automatic renaming applies.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+
+    Returns:
+        bool: True if functions are renamed automatically.
+    """
+    return _client is not None and _client.is_auto_rename_enabled()
+
+def write_performance_report_command(bv):
+    """
+    Write the session-wide performance report of every Ollama task type to a JSON file.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    path = get_client(bv).get_telemetry().write_session_report()
+    log_info(f"Ollama performance report written to {path}")
+
 def rename_function_variables_command(bv, func):
     """
     Rename the variables of a function using the Ollama client.
@@ -52,7 +230,7 @@ def rename_function_variables_command(bv, func):
         bv (BinaryView): The current BinaryView instance.
         func (Function): The function whose variables are to be renamed.
     """
-    client = OllamaClient(bv)
+    client = get_client(bv)
     if not client.is_set():
         set_model_dialog(bv)
     client.rename_function_variables(func)
@@ -65,7 +243,7 @@ def rename_variable_command(bv, inst):
         bv (BinaryView): The current BinaryView instance.
         inst (Instruction): The instruction containing the variable to be renamed.
     """
-    client = OllamaClient(bv)
+    client = get_client(bv)
     if not client.is_set():
         set_model_dialog(bv)
     client.rename_target_variable(inst)
@@ -78,7 +256,7 @@ def rename_function_HLIL_command(bv, func):
         bv (BinaryView): The current BinaryView instance.
         func (Function): The function to be renamed.
     """
-    client = OllamaClient(bv)
+    client = get_client(bv)
     if not client.is_set():
         set_model_dialog(bv)
     client.rename_target_function(func)
@@ -90,8 +268,109 @@ def rename_all_functions_command(bv):
     Args:
         bv (BinaryView): The current BinaryView instance.
     """
-    client = OllamaClient(bv)
+    client = get_client(bv)
     if not client.is_set():
         set_model_dialog(bv)
     client.rename_all_functions()
 
+def rename_all_variables_command(bv):
+    """
+    Rename the variables of all functions in the current BinaryView using the Ollama client.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    client = get_client(bv)
+    if not client.is_set():
+        set_model_dialog(bv)
+    client.rename_all_variables()
+
+def resume_rename_all_functions_command(bv):
+    """
+    Resume an interrupted run renaming all functions in the current BinaryView, skipping finished work.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    client = get_client(bv)
+    if not client.is_set():
+        set_model_dialog(bv)
+    client.rename_all_functions(resume=True)
+
+def review_renames(renames):
+    """
+    Show the suggested function names in a review dialog on the main thread and wait for the user.
+
+    Edited names are checked like the model's answers: they are turned into snake_case identifiers,
+    and names that cannot be, e.g. an address-based name like sub_401000, are skipped.
+
+    Args:
+        renames (list): The suggested (function, name) tuples.
+
+    Returns:
+        list: The (function, name) tuples the user approved, empty if the dialog was cancelled.
+    """
+    approved = []
+
+    def show():
+        from .ui import RenameReviewDialog
+        dialog = RenameReviewDialog([(hex(function.start), function.name, name) for function, name in renames])
+        if dialog.exec_():
+            for row, name in dialog.selected():
+                function = renames[row][0]
+                identifier = sanitize_identifier(name)
+                if identifier is None:
+                    log_warn(f"Not renaming {function.name} at {hex(function.start)}: {name!r} is not a valid name")
+                else:
+                    approved.append((function, identifier))
+
+    execute_on_main_thread_and_wait(show)
+    return approved
+
+def review_rename_all_functions_command(bv):
+    """
+    Suggest names for all functions in the current BinaryView and apply them after review.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    client = get_client(bv)
+    if not client.is_set():
+        set_model_dialog(bv)
+    client.rename_all_functions(review=review_renames)
+
+def dry_run_rename_all_functions_command(bv):
+    """
+    Suggest names for all functions in the current BinaryView and write them to a JSON file without applying them.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    client = get_client(bv)
+    if not client.is_set():
+        set_model_dialog(bv)
+    client.rename_all_functions(dry_run=True)
+
+def budgeted_rename_all_functions_command(bv):
+    """
+    Rename the most valuable functions in the current BinaryView within a time and token budget.
+
+    Args:
+        bv (BinaryView): The current BinaryView instance.
+    """
+    from .ui import RenameBudgetDialog
+    client = get_client(bv)
+    if not client.is_set():
+        set_model_dialog(bv)
+    dialog = RenameBudgetDialog("30", "")
+    if not dialog.exec_():
+        return
+    try:
+        minutes = dialog.minutes.text().strip()
+        tokens = dialog.tokens.text().strip()
+        budget = RenameBudget(float(minutes) * 60 if minutes else None, int(tokens) if tokens else None)
+    except ValueError:
+        show_message_box("Rename Budget", "Budgets must be numbers.",
+                         MessageBoxButtonSet.OKButtonSet, MessageBoxIcon.ErrorIcon)
+        return
+    client.rename_all_functions(budget=budget)
@@ -0,0 +1,194 @@
+import re
+
+# Rough number of characters per token for decompiled code, used to estimate prompt sizes.
+CHARACTERS_PER_TOKEN = 3
+
+# Lines at the start and end of a function that are always kept when the HLIL is cut down.
+HEAD_LINES = 8
+TAIL_LINES = 4
+
+# Repeated groups of up to MAX_PERIOD lines that cover at least MIN_RUN lines are collapsed.
+MAX_PERIOD = 4
+MIN_RUN = 6
+
+_NUMBER = re.compile(r"\b(?:0x[0-9a-fA-F]+|\d+)\b")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_CALL = re.compile(r"\w\(")
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens a piece of text takes up in a prompt.
+
+    Args:
+        text (str): The text to estimate.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return len(text) // CHARACTERS_PER_TOKEN + 1
+
+def render_hlil(hlil, budget=None, focus=()):
+    """
+    Render the HLIL of a function for a prompt, fitting it to a token budget.
+
+    Functions that fit the budget are rendered unchanged. Larger functions are reduced step by step:
+    unreachable blocks are dropped, repeated lines and line groups (switch cases, constant tables)
+    are collapsed, and finally the lines least useful to the model are omitted, always keeping the
+    start and end of the function and every line that mentions a focus variable.
+
+    Args:
+        hlil (HighLevelILFunction): The HighLevelIL representation of the function.
+        budget (int, optional): The maximum number of tokens the rendered HLIL may take up.
+        focus (iterable, optional): Names of variables whose lines must be kept.
+
+    Returns:
+        str: The rendered HLIL.
+    """
+    instructions = list(hlil.instructions)
+    return fit_hlil([str(instr) for instr in instructions], budget, focus,
+                    lambda: [is_reachable(instr) for instr in instructions])
+
+def fit_hlil(lines, budget=None, focus=(), reachable=None):
+    """
+    Fit the rendered lines of a function's HLIL to a token budget, as described for render_hlil.
+
+    Rendering the lines is the expensive part, so the lines can be rendered once and fitted to
+    different budgets and focus variables.
+
+    Args:
+        lines (list): The rendered HLIL lines, one per instruction.
+        budget (int, optional): The maximum number of tokens the rendered HLIL may take up.
+        focus (iterable, optional): Names of variables whose lines must be kept.
+        reachable (callable, optional): Returns whether the block of every instruction can be reached.
+            Only called for functions over the budget.
+
+    Returns:
+        str: The rendered HLIL.
+    """
+    text = "\n".join(lines)
+    if budget is None or estimate_tokens(text) <= budget:
+        return text
+
+    if reachable is not None:
+        lines = [line for line, flag in zip(lines, reachable()) if flag]
+    lines = collapse_repetitions(lines)
+    text = "\n".join(lines)
+    if estimate_tokens(text) <= budget:
+        return text
+    return "\n".join(fit_lines(lines, budget, focus))
+
+def is_reachable(instr):
+    """
+    Check whether an HLIL instruction lives in a basic block that can be reached.
+
+    Args:
+        instr (HighLevelILInstruction): The instruction to check.
+
+    Returns:
+        bool: False if the instruction's block has no incoming edges and is not the entry block.
+    """
+    block = instr.il_basic_block
+    return block is None or block.start == 0 or len(block.incoming_edges) > 0
+
+def _shape(line):
+    """
+    Reduce a line to its shape by replacing constants, so table entries compare equal.
+
+    Args:
+        line (str): The HLIL line.
+
+    Returns:
+        str: The shape of the line.
+    """
+    return _NUMBER.sub("#", _STRING.sub('""', line.strip()))
+
+def collapse_repetitions(lines):
+    """
+    Collapse runs of lines, or groups of lines, that only differ in their constants.
+
+    The first two and the last repetition of a run are kept and the rest is replaced with a comment.
+
+    Args:
+        lines (list): The HLIL lines.
+
+    Returns:
+        list: The lines with long repetitive runs collapsed.
+    """
+    shapes = [_shape(line) for line in lines]
+    result = []
+    i = 0
+    while i < len(lines):
+        best_period, best_repeats = 0, 0
+        for period in range(1, MAX_PERIOD + 1):
+            repeats = 1
+            while i + (repeats + 1) * period <= len(lines) \
+                    and shapes[i + repeats * period:i + (repeats + 1) * period] == shapes[i:i + period]:
+                repeats += 1
+            if repeats >= 4 and repeats * period >= MIN_RUN and repeats * period > best_repeats * best_period:
+                best_period, best_repeats = period, repeats
+
+        if best_period == 0:
+            result.append(lines[i])
+            i += 1
+            continue
+
+        end = i + best_repeats * best_period
+        result.extend(lines[i:i + 2 * best_period])
+        result.append(f"/* ... {(best_repeats - 3) * best_period} similar lines ... */")
+        result.extend(lines[end - best_period:end])
+        i = end
+    return result
+
+def fit_lines(lines, budget, focus=()):
+    """
+    Select the most useful lines that fit a token budget, keeping their original order.
+
+    The start and end of the function and lines mentioning a focus variable are kept first, then
+    lines containing calls, then everything else. Omitted stretches are replaced with a comment.
+
+    Args:
+        lines (list): The HLIL lines.
+        budget (int): The maximum number of tokens the selected lines may take up.
+        focus (iterable, optional): Names of variables whose lines must be kept.
+
+    Returns:
+        list: The selected lines with omission markers.
+    """
+    focus_pattern = None
+    names = [re.escape(name) for name in focus if name]
+    if names:
+        focus_pattern = re.compile(r"\b(?:" + "|".join(names) + r")\b")
+
+    def priority(index):
+        line = lines[index]
+        if index < HEAD_LINES or index >= len(lines) - TAIL_LINES:
+            return 0
+        if focus_pattern is not None and focus_pattern.search(line):
+            return 0
+        if _CALL.search(line):
+            return 1
+        return 2
+
+    # Leave room for the omission markers.
+    remaining = budget - budget // 10
+    selected = set()
+    for index in sorted(range(len(lines)), key=lambda index: (priority(index), index)):
+        cost = estimate_tokens(lines[index])
+        if cost > remaining:
+            continue
+        selected.add(index)
+        remaining -= cost
+
+    result = []
+    omitted = 0
+    for index, line in enumerate(lines):
+        if index in selected:
+            if omitted:
+                result.append(f"/* ... {omitted} lines omitted ... */")
+                omitted = 0
+            result.append(line)
+        else:
+            omitted += 1
+    if omitted:
+        result.append(f"/* ... {omitted} lines omitted ... */")
+    return result
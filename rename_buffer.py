@@ -0,0 +1,123 @@
+import contextlib
+import json
+import re
+
+_GENERATED_FUNCTION_NAME = re.compile(r"\b(?:sub|func)_[0-9a-fA-F]+\b")
+
+class RenameBuffer:
+    """
+    Collects suggested function and variable names and applies them to the BinaryView in chunks.
+
+    Setting a function or variable name makes Binary Ninja update symbols, cross references and
+    analysis. Applying names one chunk at a time, with symbol updates batched and analysis held until
+    the chunk is done, keeps the UI responsive during bulk runs and gives every chunk its own undo action.
+
+    Staged function names are substituted into the HLIL of callers, so prompts see them just as if
+    they had been applied. They stay substituted once applied, for HLIL that was rendered ahead of time.
+    Variable names are local to their function and are not substituted.
+
+    Attributes:
+        bv (BinaryView): The BinaryView the names are applied to.
+        chunk_size (int): The number of staged names that triggers applying a chunk, 0 to only apply
+            when flushed.
+        staged (list): (function or variable, name) tuples that are not applied yet.
+        applied (int): The number of names applied.
+    """
+    def __init__(self, bv, chunk_size=200):
+        """
+        Initialize the RenameBuffer.
+
+        Args:
+            bv (BinaryView): The BinaryView the names are applied to.
+            chunk_size (int): The number of staged names that triggers applying a chunk, 0 to only
+                apply when flushed.
+        """
+        self.bv = bv
+        self.chunk_size = chunk_size
+        self.staged = []
+        self.applied = 0
+        self._pending = {}
+
+    def stage(self, function, name):
+        """
+        Stage a new name for a function, applying the staged chunk once it is full.
+
+        Args:
+            function (Function): The function to rename.
+            name (str): The new name.
+        """
+        self.staged.append((function, name))
+        self._pending[function.name] = name
+        if self.chunk_size and len(self.staged) >= self.chunk_size:
+            self.flush()
+
+    def stage_variables(self, renames):
+        """
+        Stage new names for the variables of one function, applying the staged chunk once it is full.
+
+        The variables of a function are always applied in the same chunk.
+
+        Args:
+            renames (list): (variable, name) tuples.
+        """
+        self.staged.extend(renames)
+        if self.chunk_size and len(self.staged) >= self.chunk_size:
+            self.flush()
+
+    def substitute(self, hlil):
+        """
+        Replace the generated names of functions with staged names in rendered HLIL.
+
+        Args:
+            hlil (str): The rendered HLIL of a caller.
+
+        Returns:
+            str: The HLIL as it will read once the staged names are applied.
+        """
+        if not self._pending:
+            return hlil
+        return _GENERATED_FUNCTION_NAME.sub(lambda match: self._pending.get(match.group(0), match.group(0)), hlil)
+
+    def flush(self):
+        """
+        Apply every staged name.
+        """
+        self.apply(self.staged)
+        self.staged = []
+
+    def apply(self, renames):
+        """
+        Apply names to the BinaryView as one undo action, batching the symbol updates and holding
+        analysis until every name of the chunk is set.
+
+        Args:
+            renames (list): (function or variable, name) tuples to apply.
+        """
+        if not renames:
+            return
+        hold = hasattr(self.bv, "set_analysis_hold")
+        bulk = getattr(self.bv, "bulk_modify_symbols", None)
+        self.bv.begin_undo_actions()
+        if hold:
+            self.bv.set_analysis_hold(True)
+        try:
+            with bulk() if bulk is not None else contextlib.nullcontext():
+                for target, name in renames:
+                    target.name = name
+        finally:
+            if hold:
+                self.bv.set_analysis_hold(False)
+            self.bv.commit_undo_actions()
+        self.bv.update_analysis()
+        self.applied += len(renames)
+
+    def write(self, path):
+        """
+        Write the staged names to a JSON file instead of applying them.
+
+        Args:
+            path (str): The path of the file.
+        """
+        with open(path, "w") as f:
+            json.dump([{"address": hex(function.start), "name": function.name, "suggestion": name}
+                       for function, name in self.staged], f, indent=2)
@@ -1,5 +1,316 @@
-from binaryninja import PluginCommand, BackgroundTaskThread, log_info, show_message_box, MessageBoxButtonSet, MessageBoxIcon
-from .utils import traverse_functions_bottom_up
+import os
+import time
+from binaryninja import PluginCommand, BackgroundTaskThread, log_info, show_message_box, MessageBoxButtonSet, MessageBoxIcon, user_directory
+from .cache import ContextCache
+from .callgraph import CallGraph
+from .checkpoint import RenameCheckpoint
+from .dedup import StructuralDeduplicator
+from .naming import is_generated_variable_name
+from .pipeline import MEGABYTE, HlilPrefetcher
+from .scheduler import WavefrontScheduler
+from .prompts import estimate_tokens, render_hlil
+from .rename_buffer import RenameBuffer
+
+class FunctionRenamer:
+    """
+    Renames all functions of a BinaryView, independently of how the work is run.
+
+    Used by the RenameAllFunctions background task in the UI, by the headless batch mode and, limited
+    to new or changed functions, by the automatic renaming of AutoRenameFunctions.
+
+    Attributes:
+        client (OllamaClient): The Ollama client instance, or any object with the same naming and settings methods.
+        bv (BinaryView): The BinaryView to rename.
+        resume (bool): Whether to continue from the checkpoint of an earlier run.
+        buffer (RenameBuffer): The buffer suggested names are staged in.
+        defer (bool): Whether staged names are kept in the buffer for review instead of being applied.
+        budget (RenameBudget): The time and token budget of the run, None for no limit.
+        index (SimilarityIndex): The index of accepted names looked up before the model is asked.
+        suggestions (dict): Maps the start address of every named function to its signature and the
+            name suggested for it, before any numeric suffix.
+        reused (int): The number of names taken from the similarity index.
+        functions (list): The functions to rename, None for all functions of the BinaryView.
+    """
+    def __init__(self, client, bv, resume=False, buffer=None, defer=False, budget=None, functions=None):
+        """
+        Initialize the FunctionRenamer.
+
+        Args:
+            client (OllamaClient): The Ollama client instance.
+            bv (BinaryView): The BinaryView to rename.
+            resume (bool): Whether to continue from the checkpoint of an earlier run.
+            buffer (RenameBuffer, optional): The buffer suggested names are staged in. Defaults to one
+                applying chunks of the client's rename chunk size.
+            defer (bool): Whether to keep every suggestion in the buffer for review instead of applying it.
+                The buffer's chunk size must then be 0.
+            budget (RenameBudget, optional): The time and token budget of the run. With a budget the most
+                valuable functions are renamed first and the run stops once the budget is used up.
+            functions (list, optional): Only rename these functions, callees before callers among them.
+                Names already used in the BinaryView then get the usual numeric suffix.
+        """
+        self.client = client
+        self.bv = bv
+        self.resume = resume
+        self.buffer = buffer if buffer is not None else RenameBuffer(bv, self.client.get_rename_chunk_size())
+        self.defer = defer
+        self.budget = budget
+        self.index = self.client.get_similarity_index()
+        self.suggestions = {}
+        self.reused = 0
+        self.functions = functions
+
+    def run(self, telemetry, progress=None, cancelled=None):
+        """
+        Rename all functions in the BinaryView.
+
+        Requests are kept in flight concurrently by a WavefrontScheduler, while renames are applied
+        on this thread in bottom-up order so callers are only prompted once their callees are named.
+        HLIL is generated and rendered ahead of the requests by an HlilPrefetcher, and names staged
+        after it was rendered are substituted in before it is sent.
+        Small functions that are ready at the same time are packed into shared requests. Functions
+        whose HLIL is identical after normalization share a single request, and every copy receives
+        the name with the usual numeric suffix. Functions similar to one in the similarity index reuse
+        its accepted name without a request. Names are staged in the RenameBuffer and applied in
+        chunks, unless they are deferred for review. Progress is checkpointed periodically so a
+        cancelled, crashed or budget-limited run can be resumed.
+
+        Args:
+            telemetry (TaskTelemetry): The counters of the run.
+            progress (callable, optional): Called with a progress message after every function.
+            cancelled (callable, optional): Returns True once the run should stop.
+
+        Returns:
+            dict: Maps the start address of every processed function to its new name, or None if
+                Ollama did not identify a proper name. Includes functions of a resumed run.
+        """
+        progress = progress or (lambda text: None)
+        directory = os.path.join(user_directory(), "ollama", "checkpoints")
+        if self.functions is None:
+            checkpoint = RenameCheckpoint(directory, self.bv)
+            call_graph = CallGraph.from_binary_view(self.bv)
+        else:
+            checkpoint = RenameCheckpoint(directory, self.bv, task="auto_rename")
+            checkpoint.name_counter.update(self.count_names(self.bv.functions))
+            call_graph = CallGraph.from_functions(self.functions)
+        if self.resume:
+            if checkpoint.load():
+                self.restore_checkpoint(checkpoint, progress)
+            else:
+                log_info("No checkpoint found, renaming all functions from the start")
+
+        scheduler = WavefrontScheduler(self.client.get_parallel_requests())
+        deduplicator = StructuralDeduplicator()
+        name_counter = checkpoint.name_counter
+        finished = False
+        if self.budget is not None:
+            self.budget.start()
+            order = self.budget.order(call_graph, self.client.get_prompt_token_budget())
+        else:
+            order = call_graph.bottom_up()
+        order = list(order)
+        # A budgeted run may stop at any function, so HLIL is only prepared for the requests the scheduler
+        # may dispatch next.
+        prefetcher = HlilPrefetcher(order, lambda node: self.render_function(call_graph.functions[node], checkpoint, telemetry),
+                                    self.client.get_prefetch_megabytes() * MEGABYTE,
+                                    max_items=scheduler.lookahead + scheduler.max_workers if self.budget is not None else None)
+        prefetcher.start()
+
+        try:
+            results = scheduler.run(order, call_graph.callees,
+                                    lambda node: self.prepare_function(call_graph.functions[node], prefetcher.take(node),
+                                                                       checkpoint, telemetry),
+                                    lambda hlil: self.name_functions([hlil], deduplicator, telemetry)[0],
+                                    cancelled,
+                                    self.pack_cost,
+                                    lambda hlils: self.name_functions(hlils, deduplicator, telemetry),
+                                    self.client.get_pack_token_budget())
+            for node, (new_name, signature, reused) in results:
+                function = call_graph.functions[node]
+                self.reused += reused
+                if new_name:
+                    self.suggestions[function.start] = (signature, new_name)
+                    if new_name in name_counter:
+                        name_counter[new_name] += 1
+                        new_name = f"{new_name}_{name_counter[new_name]}"
+                    else:
+                        name_counter[new_name] = 1
+                    progress(f'Renamed {function.name} to {new_name} ({telemetry.progress()})')
+                    log_info(f'Renamed {function.name} to {new_name}')
+                    self.buffer.stage(function, new_name)
+                else:
+                    progress(f"Ollama didn't identify a proper name for {function.name} ({telemetry.progress()})")
+                    log_info(f"Ollama didn't identify a proper name for {function.name}")
+                checkpoint.record(function.start, new_name)
+            finished = (cancelled is None or not cancelled()) and not (self.budget and self.budget.skipped)
+        finally:
+            prefetcher.stop()
+            prefetcher.record(telemetry)
+            log_info(f"Prepared HLIL for {prefetcher.busy_seconds:.1f}s ahead of the requests "
+                     f"(peak {prefetcher.peak_bytes / MEGABYTE:.1f} MB buffered), waited {prefetcher.starved_seconds:.1f}s "
+                     f"for HLIL and {prefetcher.blocked_seconds:.1f}s for requests")
+            if not self.defer:
+                self.buffer.flush()
+                self.index.add_many(self.suggestions.values())
+            if self.budget is not None and self.budget.skipped:
+                log_info(f"Budget used up, skipped {len(self.budget.skipped)} functions")
+            if self.reused:
+                log_info(f"Reused the names of {self.reused} similar functions from the similarity index")
+            if deduplicator.duplicates:
+                log_info(f"Reused names for {deduplicator.duplicates} structurally identical functions "
+                         f"({deduplicator.groups} requests)")
+            if finished or self.defer:
+                checkpoint.remove()
+            else:
+                checkpoint.save()
+                log_info(f"Renaming stopped after {len(checkpoint.completed)} functions, "
+                         f"use \"Resume rename all functions\" to continue")
+        return checkpoint.completed
+
+    @staticmethod
+    def count_names(functions):
+        """
+        Build the name deduplication counters of functions that are already named.
+
+        Args:
+            functions (iterable): The functions.
+
+        Returns:
+            dict: Maps every name to the highest numeric suffix in use, 1 if it is only used without one.
+        """
+        counter = {}
+        for function in functions:
+            counter[function.name] = max(counter.get(function.name, 0), 1)
+            base, _, suffix = function.name.rpartition("_")
+            if base and suffix.isdigit():
+                counter[base] = max(counter.get(base, 0), int(suffix))
+        return counter
+
+    def name_functions(self, hlils, deduplicator, telemetry):
+        """
+        Name functions from the similarity index, asking the model only for the ones it does not know.
+
+        Runs on the scheduler's worker threads.
+
+        Args:
+            hlils (list): The rendered HLIL of every function.
+            deduplicator (StructuralDeduplicator): Shares requests between identical functions.
+            telemetry (TaskTelemetry): The counters of the run.
+
+        Returns:
+            list: (name, signature, reused) tuples in the order of hlils. The name is None where no proper
+                name was found, the signature None if the function is too small to be indexed, and reused
+                tells whether the name came from the index.
+        """
+        started = time.perf_counter()
+        signatures = [self.index.signature(hlil) if self.index.threshold else None for hlil in hlils]
+        names = [self.index.lookup(signature) for signature in signatures]
+        reused = [name is not None for name in names]
+        misses = [i for i, name in enumerate(names) if name is None]
+        if misses:
+            answers = deduplicator.generate_many([hlils[i] for i in misses],
+                                                 lambda hlils: self.client.get_function_names(hlils, telemetry))
+            for i, name in zip(misses, answers):
+                names[i] = name
+        telemetry.record_stage("inference", time.perf_counter() - started, self.client.get_parallel_requests())
+        return list(zip(names, signatures, reused))
+
+    def restore_checkpoint(self, checkpoint, progress):
+        """
+        Re-apply the names recorded in a checkpoint, in case they were lost with an unsaved database.
+
+        Args:
+            checkpoint (RenameCheckpoint): The loaded checkpoint.
+            progress (callable): Called with a progress message.
+        """
+        renames = []
+        for address, name in checkpoint.completed.items():
+            function = self.bv.get_function_at(address)
+            if name and function and (function.name.startswith("sub_") or function.name.startswith("func_")):
+                renames.append((function, name))
+        self.buffer.apply(renames)
+        progress(f"Resuming after {len(checkpoint.completed)} functions")
+        log_info(f"Resuming after {len(checkpoint.completed)} functions")
+
+    @staticmethod
+    def needs_name(function, checkpoint):
+        """
+        Check whether a function still needs a name.
+
+        Args:
+            function (Function): The function.
+            checkpoint (RenameCheckpoint): The checkpoint of the run.
+
+        Returns:
+            bool: False if the function is already named or was processed by an earlier run.
+        """
+        if function.start in checkpoint.completed:
+            return False
+        return function.name.startswith("sub_") or function.name.startswith("func_")
+
+    def render_function(self, function, checkpoint, telemetry):
+        """
+        Render the HLIL of a function that still needs a name.
+
+        Runs on the prefetcher's producer thread. Once the budget is used up no more HLIL is generated,
+        since the functions left will be skipped anyway.
+
+        Args:
+            function (Function): The function to render.
+            checkpoint (RenameCheckpoint): The checkpoint of the run.
+            telemetry (TaskTelemetry): The counters of the run, checked against the budget.
+
+        Returns:
+            str: The HLIL of the function, or None if the function needs no name, has no HLIL or the
+                budget is used up.
+        """
+        if not self.needs_name(function, checkpoint):
+            return None
+        if self.budget is not None and self.budget.exhausted(telemetry):
+            return None
+        hlil = function.hlil
+        if hlil:
+            return render_hlil(hlil, self.client.get_prompt_token_budget())
+        return None
+
+    def prepare_function(self, function, hlil, checkpoint, telemetry):
+        """
+        Prepare the prefetched HLIL of a function for its request, once its callees are named.
+
+        Args:
+            function (Function): The function to prepare.
+            hlil (str): The rendered HLIL of the function, None if it needs no name or was not rendered
+                because the budget was used up.
+            checkpoint (RenameCheckpoint): The checkpoint of the run.
+            telemetry (TaskTelemetry): The counters of the run, checked against the budget.
+
+        Returns:
+            str: The HLIL with the names of its callees, or None if the function needs no name or the
+                budget is used up.
+        """
+        # The budget only ever runs out further, so it is also used up here for every function the
+        # producer stopped rendering.
+        if self.budget is not None and self.budget.exhausted(telemetry):
+            if hlil is not None or self.needs_name(function, checkpoint):
+                self.budget.skipped.append(function)
+            return None
+        if hlil is None:
+            return None
+        return self.buffer.substitute(hlil)
+
+    def pack_cost(self, hlil):
+        """
+        Get the cost of packing the HLIL of a function into a request shared with other small functions.
+
+        Args:
+            hlil (str): The rendered HLIL of the function.
+
+        Returns:
+            int: The estimated number of tokens, or None if the function is too large to be packed or
+                packing is disabled.
+        """
+        if not self.client.get_pack_token_budget() or hlil.count("\n") + 1 >= self.client.PACKED_FUNCTION_MAX_LINES:
+            return None
+        return estimate_tokens(hlil)
 
 class RenameAllFunctions(BackgroundTaskThread):
     """
@@ -8,48 +319,166 @@ class RenameAllFunctions(BackgroundTaskThread):
     Attributes:
         client (OllamaClient): The Ollama client instance.
         bv (BinaryView): The current BinaryView instance.
+        review (callable): Called with the suggested (function, name) tuples once the run is done.
+            Returns the tuples to apply. None to apply names while the run progresses.
+        dry_run (bool): Whether to only write the suggested names to a JSON file.
+        budget (RenameBudget): The time and token budget of the run, None for no limit.
+        buffer (RenameBuffer): The buffer suggested names are staged in.
+        renamer (FunctionRenamer): The rename logic run by the task.
     """
-    def __init__(self, client, bv):
+    def __init__(self, client, bv, resume=False, review=None, dry_run=False, budget=None):
         """
         Initialize the RenameAllFunctions task.
 
         Args:
             client (OllamaClient): The Ollama client instance.
             bv (BinaryView): The current BinaryView instance.
+            resume (bool): Whether to continue from the checkpoint of an earlier run.
+            review (callable, optional): Called with the suggested (function, name) tuples once the
+                run is done. Returns the tuples to apply.
+            dry_run (bool): Whether to only write the suggested names to a JSON file.
+            budget (RenameBudget, optional): The time and token budget of the run.
         """
         super().__init__("Starting renaming task...", True)
         self.bv = bv
         self.client = client
+        self.review = review
+        self.dry_run = dry_run
+        self.budget = budget
+        defer = review is not None or dry_run
+        self.buffer = RenameBuffer(bv, 0 if defer else client.get_rename_chunk_size())
+        self.renamer = FunctionRenamer(client, bv, resume, self.buffer, defer, budget)
 
     def run(self):
         """
         Execute the task to rename all functions in the BinaryView.
         """
-        self.bv.begin_undo_actions()
-        sorted_functions = traverse_functions_bottom_up(self.bv)
-        name_counter = {}
+        endpoints = self.client.get_endpoint_pool()
+        endpoint_counters = endpoints.snapshot()
+        telemetry = self.client.get_telemetry().start("RenameAllFunctions")
+        started = time.monotonic()
+        try:
+            self.renamer.run(telemetry, lambda text: setattr(self, "progress", text), lambda: self.cancelled)
+        finally:
+            endpoints.log_report(endpoint_counters, time.monotonic() - started)
+            log_info(f"Performance report written to {self.client.get_telemetry().write_task_report(telemetry)}")
+            if self.budget is not None and self.budget.skipped:
+                skipped = [{"address": hex(function.start), "name": function.name} for function in self.budget.skipped]
+                path = self.client.get_telemetry().write_report(skipped, "RenameAllFunctions-skipped")
+                log_info(f"Functions skipped by the budget written to {path}")
 
-        for function in sorted_functions:
+        if self.dry_run:
+            directory = os.path.join(user_directory(), "ollama", "suggestions")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"rename_all_functions-{time.strftime('%Y%m%d-%H%M%S')}.json")
+            self.buffer.write(path)
+            log_info(f"{len(self.buffer.staged)} suggested names written to {path}")
+        elif self.review is not None and self.buffer.staged:
+            self.progress = f"Reviewing {len(self.buffer.staged)} suggested names"
+            approved = RenameBuffer(self.bv, self.client.get_rename_chunk_size())
+            staged = {function.start: name for function, name in self.buffer.staged}
+            accepted = []
+            for function, name in self.review(self.buffer.staged):
+                approved.stage(function, name)
+                signature, suggestion = self.renamer.suggestions[function.start]
+                # Keep the suggestion without its numeric suffix unless the name was edited.
+                accepted.append((signature, suggestion if name == staged[function.start] else name))
+            approved.flush()
+            self.client.get_similarity_index().add_many(accepted)
+            log_info(f"Applied {approved.applied} of {len(self.buffer.staged)} suggested names")
+
+class AutoRenameFunctions(BackgroundTaskThread):
+    """
+    A background task to rename a batch of new or changed functions queued by an AutoRenamer.
+
+    Attributes:
+        client (OllamaClient): The Ollama client instance.
+        bv (BinaryView): The current BinaryView instance.
+        auto_renamer (AutoRenamer): The notification that queued the batch.
+        addresses (set): The start addresses of the queued functions.
+    """
+    def __init__(self, client, bv, auto_renamer, addresses):
+        """
+        Initialize the AutoRenameFunctions task.
+
+        Args:
+            client (OllamaClient): The Ollama client instance.
+            bv (BinaryView): The current BinaryView instance.
+            auto_renamer (AutoRenamer): The notification that queued the batch.
+            addresses (set): The start addresses of the queued functions.
+        """
+        super().__init__(f"Renaming {len(addresses)} new or changed functions...", True)
+        self.bv = bv
+        self.client = client
+        self.auto_renamer = auto_renamer
+        self.addresses = addresses
 
-            if function.name.startswith("sub_") or function.name.startswith("func_"):  # Ignore functions that are already named
+    def run(self):
+        """
+        Execute the task to rename the queued functions that still have generated names and whose code
+        changed since they were last sent, callees before callers.
+        """
+        try:
+            functions = []
+            for address in sorted(self.addresses):
+                function = self.bv.get_function_at(address)
+                if function is None or not (function.name.startswith("sub_") or function.name.startswith("func_")):
+                    continue
                 hlil = function.hlil
-                if hlil: 
-                    function_hlil = "\n".join([str(instr) for instr in hlil.instructions])
-                    new_name = self.client.get_function_name(function_hlil)
-
-                    if new_name:
-                        if new_name in name_counter:
-                            name_counter[new_name] += 1
-                            new_name = f"{new_name}_{name_counter[new_name]}"
-                        else:
-                            name_counter[new_name] = 1
-                        self.progress = f'Renamed {function.name} to {new_name}'
-                        log_info(f'Renamed {function.name} to {new_name}')
-                        function.name = new_name
-                    else:
-                        self.progress = f"Ollama didn't identify a proper name for {function.name}"
-                        log_info(f"Ollama didn't identify a proper name for {function.name}")
-        self.bv.commit_undo_actions()
+                if not hlil:
+                    continue
+                # Renaming callees only changes identifiers, which are left out of the version.
+                version = ContextCache.make_version(render_hlil(hlil, self.client.get_prompt_token_budget()), identifiers=False)
+                if self.auto_renamer.versions.get(address) != version:
+                    self.auto_renamer.versions[address] = version
+                    functions.append(function)
+            if functions:
+                telemetry = self.client.get_telemetry().start("AutoRename")
+                FunctionRenamer(self.client, self.bv, functions=functions).run(
+                    telemetry, lambda text: setattr(self, "progress", text), lambda: self.cancelled)
+                log_info(f"Automatically renamed {len(functions)} new or changed functions")
+        finally:
+            self.auto_renamer.finished()
+
+class IndexFunctionNames(BackgroundTaskThread):
+    """
+    A background task to add the named functions of the current BinaryView to the similarity index,
+    e.g. to transfer the names of an analyzed build to the next one.
+
+    Attributes:
+        client (OllamaClient): The Ollama client instance.
+        bv (BinaryView): The current BinaryView instance.
+    """
+    def __init__(self, client, bv):
+        """
+        Initialize the IndexFunctionNames task.
+
+        Args:
+            client (OllamaClient): The Ollama client instance.
+            bv (BinaryView): The current BinaryView instance.
+        """
+        super().__init__("Indexing function names...", True)
+        self.bv = bv
+        self.client = client
+
+    def run(self):
+        """
+        Execute the task to index the names of all named functions in the BinaryView.
+        """
+        index = self.client.get_similarity_index()
+        entries = []
+        for function in self.bv.functions:
+            if self.cancelled:
+                break
+            if function.name.startswith("sub_") or function.name.startswith("func_"):
+                continue
+            hlil = function.hlil
+            if hlil:
+                entries.append((index.signature(render_hlil(hlil, self.client.get_prompt_token_budget())), function.name))
+                self.progress = f"Indexing function names ({len(entries)})"
+        index.add_many(entries)
+        indexed = sum(1 for signature, _ in entries if signature is not None)
+        log_info(f"Added {indexed} function names to the similarity index ({index.size()} entries)")
 
 class RenameFunction(BackgroundTaskThread):
     """
@@ -79,8 +508,9 @@ class RenameFunction(BackgroundTaskThread):
         Execute the task to rename the function in the BinaryView.
         """
         self.bv.begin_undo_actions()
-        function_hlil = "\n".join([str(instr) for instr in self.hlil.instructions])
-        new_name = self.client.get_function_name(function_hlil)
+        telemetry = self.client.get_telemetry().start("RenameFunction")
+        function_hlil = self.client.render_function_hlil(self.hlil, telemetry=telemetry)
+        new_name = self.client.get_function_name(function_hlil, telemetry, self.hlil.source_function.start)
         if new_name:
             self.progress = f"Renamed function to {new_name}."
             log_info(f"Renamed function to {new_name}.")
@@ -117,33 +547,171 @@ class RenameFunctionVariables(BackgroundTaskThread):
     def run(self):
         """
         Execute the task to rename variables in the function in the BinaryView.
+
+        All variables are named by a single batched request instead of one request per variable.
         """
         self.bv.begin_undo_actions()
-        function_hlil = "\n".join([str(instr) for instr in self.hlil.instructions])
+        telemetry = self.client.get_telemetry().start("RenameFunctionVariables")
+        function_hlil = self.client.render_function_hlil(self.hlil, telemetry=telemetry)
 
         vars = []
         for inst in self.hlil.instructions:
             for var in inst.vars:
                 vars.append(var)
 
-        unique_vars = list(set(vars))
-        name_counter = {}
+        unique_vars = sorted(set(vars), key=lambda var: var.name)
+        names = self.client.get_variable_names([var.name for var in unique_vars], function_hlil, telemetry,
+                                               self.hlil.source_function.start)
+        for var, name in variable_renames(unique_vars, names, lambda text: setattr(self, "progress", text)):
+            var.name = name
+        log_info(f"Performance report written to {self.client.get_telemetry().write_task_report(telemetry)}")
+        self.bv.commit_undo_actions()
 
-        for var in unique_vars:
-            name = self.client.get_variable_name(var, function_hlil)
-            if name:
-                if name in name_counter:
-                    name_counter[name] += 1
-                    name = f"{name}_{name_counter[name]}"
-                else:
-                    name_counter[name] = 1
-                self.progress = f'Renamed {var.name} to {name}'
-                log_info(f'Renamed {var.name} to {name}') 
-                var.name = name
+class RenameAllVariables(BackgroundTaskThread):
+    """
+    A background task to rename the variables of every function in the current BinaryView.
+
+    Variables that already have a user-defined name are kept. HLIL is prepared ahead by an
+    HlilPrefetcher, one request per function is kept in flight on a shared WavefrontScheduler up to
+    the parallel request limit, and the names are staged in a RenameBuffer on this thread, which
+    applies them in chunks. The name of every function that was already named is sent along as extra
+    context.
+
+    Attributes:
+        client (OllamaClient): The Ollama client instance.
+        bv (BinaryView): The current BinaryView instance.
+        buffer (RenameBuffer): The buffer the suggested names are staged in.
+    """
+    def __init__(self, client, bv):
+        """
+        Initialize the RenameAllVariables task.
+
+        Args:
+            client (OllamaClient): The Ollama client instance.
+            bv (BinaryView): The current BinaryView instance.
+        """
+        super().__init__("Starting renaming task...", True)
+        self.bv = bv
+        self.client = client
+        self.buffer = RenameBuffer(bv, client.get_rename_chunk_size())
+
+    def run(self):
+        """
+        Execute the task to rename the variables of all functions in the BinaryView.
+        """
+        telemetry = self.client.get_telemetry().start("RenameAllVariables")
+        arch = getattr(self.bv, "arch", None)
+        registers = set(arch.regs) if arch is not None else set()
+        functions = list(self.bv.functions)
+        order = list(range(len(functions)))
+        prefetcher = HlilPrefetcher(order, lambda i: self.render_function(functions[i], registers),
+                                    self.client.get_prefetch_megabytes() * MEGABYTE, lambda payload: len(payload[0]))
+        scheduler = WavefrontScheduler(self.client.get_parallel_requests())
+        started = time.monotonic()
+        renamed = 0
+        prefetcher.start()
+        try:
+            results = scheduler.run(order, lambda i: (), prefetcher.take,
+                                    lambda payload: self.name_variables(payload, telemetry),
+                                    lambda: self.cancelled)
+            for i, (variables, names) in results:
+                renames = variable_renames(variables, names)
+                self.buffer.stage_variables(renames)
+                renamed += len(renames)
+                elapsed = time.monotonic() - started
+                remaining = elapsed / (i + 1) * (len(functions) - i - 1)
+                remaining = f"{remaining / 60:.0f} min" if remaining >= 60 else f"{remaining:.0f} s"
+                self.progress = (f"Renaming variables: {i + 1}/{len(functions)} functions, {renamed} variables, "
+                                 f"about {remaining} left ({telemetry.progress()})")
+        finally:
+            prefetcher.stop()
+            prefetcher.record(telemetry)
+            self.buffer.flush()
+        log_info(f"Renamed {renamed} variables in {len(functions)} functions")
+        log_info(f"Performance report written to {self.client.get_telemetry().write_task_report(telemetry)}")
+
+    def render_function(self, function, registers):
+        """
+        Render the HLIL of a function that has variables without a user-defined name.
+
+        Runs on the prefetcher's producer thread. Variables are checked with Binary Ninja's own record of
+        user-defined variables, so names a user chose such as result or i are kept. Only where that is
+        not available is the name checked against the names Binary Ninja generates.
+
+        Args:
+            function (Function): The function to render.
+            registers (set): The register names of the architecture, for the name check.
+
+        Returns:
+            tuple: (hlil, function, variables) with the rendered HLIL and the variables to name, sorted
+                by name, or None if the function has no such variables.
+        """
+        hlil = function.hlil
+        if not hlil:
+            return None
+        is_user_defined = getattr(function, "is_var_user_defined", None)
+        if is_user_defined is not None:
+            variables = {var for instr in hlil.instructions for var in instr.vars if not is_user_defined(var)}
+        else:
+            variables = {var for instr in hlil.instructions for var in instr.vars
+                         if is_generated_variable_name(var.name, registers)}
+        if not variables:
+            return None
+        variables = sorted(variables, key=lambda var: var.name)
+        text = render_hlil(hlil, self.client.get_prompt_token_budget(), focus=[var.name for var in variables])
+        return text, function, variables
+
+    def name_variables(self, payload, telemetry):
+        """
+        Ask for the names of the variables of one function.
+
+        Runs on the scheduler's worker threads.
+
+        Args:
+            payload (tuple): (hlil, function, variables) as returned by render_function.
+            telemetry (TaskTelemetry): The counters of the run.
+
+        Returns:
+            tuple: (variables, names) where names maps current variable names to suggested names.
+        """
+        text, function, variables = payload
+        function_name = None
+        if not (function.name.startswith("sub_") or function.name.startswith("func_")):
+            function_name = function.name
+        names = self.client.get_variable_names([var.name for var in variables], text, telemetry,
+                                               function.start, function_name)
+        return variables, names
+
+def variable_renames(variables, names, progress=None):
+    """
+    Pair the variables of a function with their suggested names, giving repeated names a numeric suffix.
+
+    Args:
+        variables (list): The variables of the function.
+        names (dict): Maps current variable names to suggested names.
+        progress (callable, optional): Called with a progress message for every variable.
+
+    Returns:
+        list: (variable, name) tuples of the variables to rename.
+    """
+    progress = progress or (lambda text: None)
+    name_counter = {}
+    renames = []
+    for var in variables:
+        name = names.get(var.name)
+        if name:
+            if name in name_counter:
+                name_counter[name] += 1
+                name = f"{name}_{name_counter[name]}"
             else:
-                self.progress = f"ollama didn't identify a proper name for {var.name}"
-                log_info(f"ollama didn't identify a proper name for {var.name}")
-        self.bv.commit_undo_actions()
+                name_counter[name] = 1
+            progress(f'Renamed {var.name} to {name}')
+            log_info(f'Renamed {var.name} to {name}')
+            renames.append((var, name))
+        else:
+            progress(f"ollama didn't identify a proper name for {var.name}")
+            log_info(f"ollama didn't identify a proper name for {var.name}")
+    return renames
 
 class RenameVariable(BackgroundTaskThread):
     """
@@ -173,12 +741,13 @@ class RenameVariable(BackgroundTaskThread):
         Execute the task to rename the variable in the BinaryView.
         """
         self.bv.begin_undo_actions()
+        telemetry = self.client.get_telemetry().start("RenameVariable")
         func = self.bv.get_functions_containing(self.inst.address)[0]
-        function_hlil = "\n".join([str(instr) for instr in func.hlil.instructions])
-
         unique_vars = list(set(self.inst.vars))
+        function_hlil = self.client.render_function_hlil(func.hlil, [var.name for var in unique_vars], telemetry)
+
         for var in unique_vars:
-            name = self.client.get_variable_name(var, function_hlil) 
+            name = self.client.get_variable_name(var, function_hlil, telemetry, func.start)
             if name:
                 self.progress = f'Renamed {var.name} to {name}'
                 log_info(f'Renamed {var.name} to {name}') 
@@ -0,0 +1,170 @@
+import heapq
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class WavefrontScheduler:
+    """
+    Runs requests for an ordered list of items on a bounded worker pool while respecting call dependencies.
+
+    Items are dispatched as call-graph wavefronts: an item is only prepared and submitted once every
+    dependency that precedes it in the traversal order has been yielded back to the caller. Results are
+    yielded strictly in traversal order, so anything the caller does with them (renaming, deduplicating
+    names) happens on the caller's thread and is deterministic regardless of request completion order.
+
+    Attributes:
+        max_workers (int): The maximum number of requests kept in flight.
+        lookahead (int): How far past the oldest unfinished item the scheduler may dispatch.
+    """
+    # Seconds between cancellation checks while waiting for requests.
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, max_workers, lookahead=None):
+        """
+        Initialize the WavefrontScheduler.
+
+        Args:
+            max_workers (int): The maximum number of requests kept in flight.
+            lookahead (int, optional): How far past the oldest unfinished item the scheduler may dispatch.
+                Bounds the number of buffered results. Defaults to four times max_workers.
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.lookahead = lookahead if lookahead is not None else self.max_workers * 4
+
+    def run(self, items, dependencies, prepare, work, cancelled=None, pack_cost=None, pack_work=None, pack_budget=0):
+        """
+        Schedule work for every item and yield the results in traversal order.
+
+        Dependencies that come later in the traversal order (recursive call chains) are ignored, which
+        matches what a sequential bottom-up pass would see.
+
+        When pack_cost and pack_work are given, payloads that have a cost are packed together up to
+        pack_budget and handed to pack_work as one unit of work, which takes up a single worker. Packs
+        are built from the packable items in traversal order, independently of request timing, so the
+        same items always share a request: a pack is closed once the next packable item does not fit
+        the budget, lies a whole lookahead past the start of the pack, or depends on an item at or after
+        the start of the pack. The pack then waits until every earlier item is prepared, which may hold
+        it back until their dependencies are finished.
+
+        Args:
+            items (iterable): The items in traversal order, e.g. functions in bottom-up order.
+            dependencies (callable): Returns the items an item depends on, e.g. a function's callees.
+            prepare (callable): Called on the caller's thread once an item's dependencies are finished.
+                Returns the payload for work, or None to skip the item.
+            work (callable): Called on a worker thread with the payload. Returns the result.
+            cancelled (callable, optional): Returns True once the run should stop. Nothing new is
+                dispatched after that and requests still in flight are abandoned.
+            pack_cost (callable, optional): Returns the cost of a payload that may be packed, or None if
+                it must be handed to work on its own.
+            pack_work (callable, optional): Called on a worker thread with a list of payloads. Returns
+                the list of their results.
+            pack_budget (int): The maximum summed cost of the payloads of one pack.
+
+        Yields:
+            tuple: (item, result) for every item that was not skipped, in traversal order. An item is
+                considered finished once the caller resumes the generator after receiving it.
+        """
+        order = list(items)
+        index = {item: i for i, item in enumerate(order)}
+        remaining = [0] * len(order)
+        dependents = [[] for _ in order]
+        latest = [-1] * len(order)
+
+        for i, item in enumerate(order):
+            for dependency in set(dependencies(item)):
+                j = index.get(dependency)
+                if j is not None and j < i:
+                    remaining[i] += 1
+                    dependents[j].append(i)
+                    latest[i] = max(latest[i], j)
+
+        ready = [i for i, count in enumerate(remaining) if count == 0]
+        heapq.heapify(ready)
+        completed = {}
+        in_flight = {}
+        next_index = 0
+
+        # Payloads of prepared items that are waiting for the pack cursor, and units of work waiting for a worker.
+        packable = {}
+        queue = deque()
+        prepared = [False] * len(order)
+        cursor = 0
+        pack = []
+        pack_total = 0
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while next_index < len(order):
+                if cancelled is not None and cancelled():
+                    return
+
+                while ready and ready[0] <= next_index + self.lookahead:
+                    i = heapq.heappop(ready)
+                    payload = prepare(order[i])
+                    cost = pack_cost(payload) if payload is not None and pack_cost is not None and pack_work is not None else None
+                    prepared[i] = True
+                    if payload is None:
+                        completed[i] = (False, None)
+                    elif cost is None:
+                        queue.append([(i, payload)])
+                    else:
+                        packable[i] = (payload, cost)
+
+                while cursor < len(order):
+                    if pack and (latest[cursor] >= pack[0][0] or cursor > pack[0][0] + self.lookahead):
+                        queue.append(pack)
+                        pack = []
+                        pack_total = 0
+                    if not prepared[cursor]:
+                        break
+                    if cursor in packable:
+                        payload, cost = packable.pop(cursor)
+                        if pack and pack_total + cost > pack_budget:
+                            queue.append(pack)
+                            pack = []
+                            pack_total = 0
+                        pack.append((cursor, payload))
+                        pack_total += cost
+                    cursor += 1
+                if pack and cursor == len(order):
+                    queue.append(pack)
+                    pack = []
+                    pack_total = 0
+
+                while queue and len(in_flight) < self.max_workers:
+                    unit = queue.popleft()
+                    if len(unit) == 1:
+                        in_flight[pool.submit(lambda payload: [work(payload)], unit[0][1])] = [i for i, _ in unit]
+                    else:
+                        in_flight[pool.submit(self._run_pack, pack_work, unit)] = [i for i, _ in unit]
+
+                if next_index in completed:
+                    scheduled, result = completed.pop(next_index)
+                    if scheduled:
+                        yield order[next_index], result
+                    for dependent in dependents[next_index]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            heapq.heappush(ready, dependent)
+                    next_index += 1
+                    continue
+
+                done, _ = wait(in_flight, timeout=self.POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for i, result in zip(in_flight.pop(future), future.result()):
+                        completed[i] = (True, result)
+        finally:
+            pool.shutdown(wait=not in_flight, cancel_futures=True)
+
+    @staticmethod
+    def _run_pack(pack_work, pack):
+        """
+        Run the work of a pack of payloads on a worker thread.
+
+        Args:
+            pack_work (callable): Called with the list of payloads. Returns the list of their results.
+            pack (list): (index, payload) tuples of the packed items.
+
+        Returns:
+            list: The results, in the order of the pack.
+        """
+        return pack_work([payload for _, payload in pack])
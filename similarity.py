@@ -0,0 +1,219 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from .dedup import normalize_hlil
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# The placeholders of normalize_hlil are numbered in order of first use, so one inserted call would
+# renumber every later one. Dropping the numbers keeps a local change local.
+_PLACEHOLDER_NUMBER = re.compile(r"\b(sub|j_sub|data|var|label|jump_table|func)_\d+\b")
+
+class SimilarityIndex:
+    """
+    A persistent index of accepted function names, looked up by the similarity of the functions' HLIL.
+
+    Most functions barely change between builds of the same program. Every function is reduced to a
+    MinHash signature over shingles of its normalized HLIL tokens, whose agreement estimates the Jaccard
+    similarity of two functions. Signatures are split into bands that are stored in an indexed SQLite
+    table (locality-sensitive hashing), so a lookup only compares against the few entries sharing a
+    band with it and stays fast with millions of entries.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        threshold (float): The estimated similarity a match needs for its name to be reused, 0 to disable the index.
+        hits (int): The number of lookups that found a name in this session.
+        misses (int): The number of lookups that did not.
+    """
+    PERMUTATIONS = 64
+    BANDS = 16
+    SHINGLE_SIZE = 4
+    # Functions with fewer shingles (thunks, getters, stubs) look alike across unrelated code, so their
+    # names are not reused.
+    MIN_SHINGLES = 8
+    # The most entries read from one band bucket, so very common code cannot make a lookup slow.
+    MAX_BUCKET_CANDIDATES = 32
+
+    def __init__(self, path, threshold=0.8):
+        """
+        Initialize the SimilarityIndex. The database is created on first use.
+
+        Args:
+            path (str): The path of the SQLite database.
+            threshold (float): The estimated similarity a match needs for its name to be reused.
+        """
+        self.path = path
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """
+        Open the database and create the schema if needed. Must be called with the lock held.
+
+        Returns:
+            sqlite3.Connection: The open connection.
+        """
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS functions ("
+                "id INTEGER PRIMARY KEY, key INTEGER NOT NULL UNIQUE, name TEXT NOT NULL, "
+                "signature BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                "bucket INTEGER NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (bucket, id)) WITHOUT ROWID"
+            )
+            self._connection.commit()
+        return self._connection
+
+    @classmethod
+    def signature(cls, hlil):
+        """
+        Compute the MinHash signature of rendered HLIL.
+
+        Every shingle is hashed once with SHAKE-128, whose output provides one independent hash per
+        permutation, and the signature keeps the smallest value of every permutation.
+
+        Args:
+            hlil (str): The rendered HLIL.
+
+        Returns:
+            bytes: The signature, or None if the function is too small to be matched reliably.
+        """
+        tokens = _TOKEN.findall(_PLACEHOLDER_NUMBER.sub(r"\1", normalize_hlil(hlil)))
+        shingles = {" ".join(tokens[i:i + cls.SHINGLE_SIZE]) for i in range(len(tokens) - cls.SHINGLE_SIZE + 1)}
+        if len(shingles) < cls.MIN_SHINGLES:
+            return None
+        hashes = [array("I", hashlib.shake_128(shingle.encode("utf-8")).digest(4 * cls.PERMUTATIONS))
+                  for shingle in shingles]
+        return array("I", map(min, zip(*hashes))).tobytes()
+
+    @classmethod
+    def similarity(cls, first, second):
+        """
+        Estimate the Jaccard similarity of two functions from their signatures.
+
+        Args:
+            first (bytes): The signature of the first function.
+            second (bytes): The signature of the second function.
+
+        Returns:
+            float: The share of permutations whose minimum agrees.
+        """
+        return sum(a == b for a, b in zip(array("I", first), array("I", second))) / cls.PERMUTATIONS
+
+    @classmethod
+    def _buckets(cls, signature):
+        """
+        Split a signature into its locality-sensitive hashing bands and hash every band, together with
+        its number, to the bucket it falls into.
+
+        Args:
+            signature (bytes): The signature.
+
+        Returns:
+            list: The 64-bit bucket of every band.
+        """
+        width = len(signature) // cls.BANDS
+        return [int.from_bytes(hashlib.blake2b(bytes([band]) + signature[band * width:(band + 1) * width],
+                                               digest_size=8).digest(), "little", signed=True)
+                for band in range(cls.BANDS)]
+
+    @staticmethod
+    def _key(signature):
+        """
+        Hash a whole signature, so identical functions are stored once.
+
+        Args:
+            signature (bytes): The signature.
+
+        Returns:
+            int: The 64-bit key of the signature.
+        """
+        return int.from_bytes(hashlib.blake2b(signature, digest_size=8).digest(), "little", signed=True)
+
+    def lookup(self, signature):
+        """
+        Find the name of the most similar indexed function.
+
+        Args:
+            signature (bytes): The signature of the function to name.
+
+        Returns:
+            str: The name of the most similar function, or None if none reaches the threshold.
+        """
+        if not self.threshold or signature is None:
+            return None
+        with self._lock:
+            connection = self._connect()
+            ids = set()
+            for bucket in self._buckets(signature):
+                ids.update(row[0] for row in connection.execute(
+                    "SELECT id FROM bands WHERE bucket = ? LIMIT ?", (bucket, self.MAX_BUCKET_CANDIDATES)))
+            candidates = []
+            if ids:
+                candidates = connection.execute(
+                    f"SELECT name, signature FROM functions WHERE id IN ({','.join('?' * len(ids))})", tuple(ids)).fetchall()
+            best, name = max(((self.similarity(signature, candidate), name) for name, candidate in candidates),
+                             default=(0, None))
+            if best < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return name
+
+    def add_many(self, entries):
+        """
+        Store accepted names. A function whose signature is already indexed gets the new name.
+
+        Args:
+            entries (list): (signature, name) tuples. Entries without a signature are ignored.
+        """
+        entries = [(self._key(signature), name, signature) for signature, name in entries if signature is not None and name]
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT INTO functions (key, name, signature, created) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET name = excluded.name",
+                [(key, name, signature, now) for key, name, signature in entries]
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO bands (bucket, id) SELECT ?, id FROM functions WHERE key = ?",
+                [(bucket, key) for key, _, signature in entries for bucket in self._buckets(signature)]
+            )
+            connection.commit()
+
+    def size(self):
+        """
+        Get the number of indexed functions.
+
+        Returns:
+            int: The number of entries.
+        """
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM functions").fetchone()[0]
+
+    def clear(self):
+        """
+        Remove every entry from the index.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM bands")
+            connection.execute("DELETE FROM functions")
+            connection.commit()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,372 @@
+import json
+import os
+import threading
+import time
+
+NANOSECONDS = 1e9
+
+def percentile(values, fraction):
+    """
+    Get a percentile of a list of values using the nearest-rank method.
+
+    Args:
+        values (list): The values.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def _field(response, name):
+    """
+    Read a timing or count field of an Ollama response, which is missing from cached answers.
+
+    Args:
+        response (dict): The response.
+        name (str): The field name.
+
+    Returns:
+        int: The value of the field, or 0 if it is missing.
+    """
+    try:
+        return response.get(name) or 0
+    except AttributeError:
+        return 0
+
+class TaskTelemetry:
+    """
+    Performance counters of the requests made by one task, e.g. one run of RenameAllFunctions.
+
+    Durations reported by Ollama are in nanoseconds and are converted to seconds.
+
+    Attributes:
+        name (str): The name of the task.
+        parent (TaskTelemetry): Session-wide counters of the same task type that every record is forwarded to.
+        started (float): The wall-clock time the task started.
+        latencies (list): The wall-clock seconds of every request sent to the server.
+        prompt_tokens (list): The number of prompt tokens of every request that reported it.
+        requests (int): The number of requests sent to the server.
+        generated_tokens (int): The number of tokens generated.
+        eval_seconds (float): The seconds the servers spent generating.
+        prompt_eval_seconds (float): The seconds the servers spent evaluating prompts.
+        load_seconds (float): The seconds the servers spent loading models.
+        cache_hits (int): The number of answers served from the response cache.
+        cache_misses (int): The number of answers that had to be generated.
+        wasted (int): The number of generations whose answer was thrown away.
+        retries (int): The number of requests sent again after a transport error or a busy server.
+        names (int): The number of usable names generated.
+        sanitized (int): The number of generated names that had to be repaired to be usable.
+        tiers (dict): Maps every tier of the model cascade to the number of names it was asked for and
+            the number of its answers that were used.
+        escalations (dict): Maps every reason for escalating to the strong model to its count.
+        render_hits (int): The number of HLIL renders answered from the HLIL cache.
+        render_misses (int): The number of HLIL renders that had to render the function.
+        stages (dict): Maps every pipeline stage to the seconds spent in it and the number of threads
+            running it.
+    """
+    def __init__(self, name, parent=None):
+        """
+        Initialize the TaskTelemetry.
+
+        Args:
+            name (str): The name of the task.
+            parent (TaskTelemetry, optional): Session-wide counters to forward every record to.
+        """
+        self.name = name
+        self.parent = parent
+        self.started = time.time()
+        self.latencies = []
+        self.prompt_tokens = []
+        self.requests = 0
+        self.generated_tokens = 0
+        self.eval_seconds = 0.0
+        self.prompt_eval_seconds = 0.0
+        self.load_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.wasted = 0
+        self.retries = 0
+        self.names = 0
+        self.sanitized = 0
+        self.tiers = {}
+        self.escalations = {}
+        self.render_hits = 0
+        self.render_misses = 0
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def record_response(self, response, latency):
+        """
+        Record a request answered by the server.
+
+        Args:
+            response (dict): The response, carrying Ollama's timing fields when available.
+            latency (float): The wall-clock seconds the request took.
+        """
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            prompt_tokens = _field(response, 'prompt_eval_count')
+            if prompt_tokens:
+                self.prompt_tokens.append(prompt_tokens)
+            self.generated_tokens += _field(response, 'eval_count')
+            self.eval_seconds += _field(response, 'eval_duration') / NANOSECONDS
+            self.prompt_eval_seconds += _field(response, 'prompt_eval_duration') / NANOSECONDS
+            self.load_seconds += _field(response, 'load_duration') / NANOSECONDS
+        if self.parent is not None:
+            self.parent.record_response(response, latency)
+
+    def record_cache(self, hit):
+        """
+        Record a response cache lookup.
+
+        Args:
+            hit (bool): Whether the answer was found in the cache.
+        """
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        if self.parent is not None:
+            self.parent.record_cache(hit)
+
+    def record_wasted(self):
+        """
+        Record a generation whose answer could not be used.
+        """
+        with self._lock:
+            self.wasted += 1
+        if self.parent is not None:
+            self.parent.record_wasted()
+
+    def record_retry(self):
+        """
+        Record a request that is sent again after a transport error or a busy server.
+        """
+        with self._lock:
+            self.retries += 1
+        if self.parent is not None:
+            self.parent.record_retry()
+
+    def record_names(self, names, sanitized=0):
+        """
+        Record the usable names of a generated answer.
+
+        Args:
+            names (int): The number of usable names.
+            sanitized (int): How many of them had to be repaired.
+        """
+        with self._lock:
+            self.names += names
+            self.sanitized += sanitized
+        if self.parent is not None:
+            self.parent.record_names(names, sanitized)
+
+    def record_tier(self, tier, names, hits):
+        """
+        Record the answers of one tier of the model cascade.
+
+        Args:
+            tier (str): The tier, "fast" or "strong".
+            names (int): The number of names the tier was asked for.
+            hits (int): The number of its answers that were used.
+        """
+        with self._lock:
+            asked, used = self.tiers.get(tier, (0, 0))
+            self.tiers[tier] = (asked + names, used + hits)
+        if self.parent is not None:
+            self.parent.record_tier(tier, names, hits)
+
+    def record_escalation(self, reason):
+        """
+        Record a name escalated from the fast to the strong model.
+
+        Args:
+            reason (str): Why it was escalated: "invalid", "generic" or "low_confidence".
+        """
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        if self.parent is not None:
+            self.parent.record_escalation(reason)
+
+    def record_render(self, hit):
+        """
+        Record an HLIL cache lookup.
+
+        Args:
+            hit (bool): Whether the rendered HLIL was found in the cache.
+        """
+        with self._lock:
+            if hit:
+                self.render_hits += 1
+            else:
+                self.render_misses += 1
+        if self.parent is not None:
+            self.parent.record_render(hit)
+
+    def record_stage(self, stage, seconds, workers=1):
+        """
+        Record time spent in a stage of the rename pipeline.
+
+        Args:
+            stage (str): The stage, e.g. "hlil" for preparing HLIL or "inference" for naming requests.
+            seconds (float): The seconds spent in the stage.
+            workers (int): The number of threads running the stage.
+        """
+        with self._lock:
+            total, most = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total + seconds, max(most, workers))
+        if self.parent is not None:
+            self.parent.record_stage(stage, seconds, workers)
+
+    def progress(self):
+        """
+        Summarize the current throughput for the task progress text.
+
+        Returns:
+            str: The generated tokens per second and requests per minute.
+        """
+        elapsed = max(time.time() - self.started, 1e-9)
+        return f"{self.generated_tokens / elapsed:.1f} tok/s, {self.requests * 60 / elapsed:.1f} req/min"
+
+    def report(self):
+        """
+        Build the performance report of the task.
+
+        Returns:
+            dict: Latency percentiles, prompt size distribution, token throughput, cache hit rate,
+                wasted-generation ratio, HLIL cache hit rate, retries, useful-name throughput, the hit rates of the
+                model cascade and the utilization of the pipeline stages.
+        """
+        with self._lock:
+            elapsed = time.time() - self.started
+            lookups = self.cache_hits + self.cache_misses
+            renders = self.render_hits + self.render_misses
+            return {
+                "task": self.name,
+                "started": self.started,
+                "elapsed_seconds": elapsed,
+                "requests": self.requests,
+                "requests_per_minute": self.requests * 60 / elapsed if elapsed else 0.0,
+                "latency_seconds": {
+                    "p50": percentile(self.latencies, 0.50),
+                    "p95": percentile(self.latencies, 0.95),
+                    "p99": percentile(self.latencies, 0.99),
+                    "max": max(self.latencies, default=0.0),
+                },
+                "prompt_tokens": {
+                    "p50": percentile(self.prompt_tokens, 0.50),
+                    "p95": percentile(self.prompt_tokens, 0.95),
+                    "p99": percentile(self.prompt_tokens, 0.99),
+                    "max": max(self.prompt_tokens, default=0),
+                    "total": sum(self.prompt_tokens),
+                },
+                "generated_tokens": self.generated_tokens,
+                # Servers that do not report eval_duration, e.g. proxies in front of Ollama, fall back
+                # to the request latency.
+                "tokens_per_second": self.generated_tokens / (self.eval_seconds or sum(self.latencies) or 1),
+                "prompt_eval_seconds": self.prompt_eval_seconds,
+                "eval_seconds": self.eval_seconds,
+                "load_seconds": self.load_seconds,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+                "hlil_cache_hits": self.render_hits,
+                "hlil_cache_misses": self.render_misses,
+                "hlil_cache_hit_rate": self.render_hits / renders if renders else 0.0,
+                "wasted_generations": self.wasted,
+                "wasted_generation_ratio": self.wasted / self.requests if self.requests else 0.0,
+                "retries": self.retries,
+                "useful_names": self.names,
+                "useful_names_per_minute": self.names * 60 / elapsed if elapsed else 0.0,
+                "sanitized_names": self.sanitized,
+                "cascade": {
+                    "tiers": {tier: {"names": asked, "hits": used, "hit_rate": used / asked if asked else 0.0}
+                              for tier, (asked, used) in self.tiers.items()},
+                    "escalations": dict(self.escalations),
+                },
+                # Utilization is the share of the elapsed time the threads of a stage were busy (or
+                # waiting, for the *_blocked and *_starved stages).
+                "pipeline": {stage: {"seconds": seconds,
+                                     "utilization": seconds / (elapsed * workers) if elapsed else 0.0}
+                             for stage, (seconds, workers) in self.stages.items()},
+            }
+
+class Telemetry:
+    """
+    Collects per-request performance data of the Ollama client, aggregated per task type.
+
+    Attributes:
+        directory (str): The directory JSON reports are written to.
+        tasks (dict): Session-wide TaskTelemetry per task name.
+    """
+    def __init__(self, directory):
+        """
+        Initialize the Telemetry.
+
+        Args:
+            directory (str): The directory JSON reports are written to.
+        """
+        self.directory = directory
+        self.tasks = {}
+        self._lock = threading.Lock()
+
+    def start(self, name):
+        """
+        Start collecting the telemetry of one task run.
+
+        Args:
+            name (str): The name of the task, e.g. "RenameAllFunctions".
+
+        Returns:
+            TaskTelemetry: The counters of the run, which also feed the session-wide counters of the task type.
+        """
+        with self._lock:
+            if name not in self.tasks:
+                self.tasks[name] = TaskTelemetry(name)
+            return TaskTelemetry(name, self.tasks[name])
+
+    def write_report(self, reports, name):
+        """
+        Write reports to a timestamped JSON file.
+
+        Args:
+            reports (list): The reports to write.
+            name (str): The prefix of the file name.
+
+        Returns:
+            str: The path of the written file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, "w") as f:
+            json.dump(reports, f, indent=2)
+        return path
+
+    def write_task_report(self, telemetry):
+        """
+        Write the report of a finished task run.
+
+        Args:
+            telemetry (TaskTelemetry): The counters of the run.
+
+        Returns:
+            str: The path of the written file.
+        """
+        return self.write_report([telemetry.report()], telemetry.name)
+
+    def write_session_report(self):
+        """
+        Write the session-wide report of every task type.
+
+        Returns:
+            str: The path of the written file.
+        """
+        with self._lock:
+            tasks = list(self.tasks.values())
+        return self.write_report([task.report() for task in tasks], "session")
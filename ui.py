@@ -1,4 +1,5 @@
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QDialogButtonBox, QComboBox
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QDialogButtonBox, QComboBox, QTableWidget, QTableWidgetItem
 
 class OllamaConnectionDialog(QDialog):
     """
@@ -21,7 +22,7 @@ class OllamaConnectionDialog(QDialog):
 
         layout = QVBoxLayout()
         
-        layout.addWidget(QLabel("Host:"))
+        layout.addWidget(QLabel("Host (separate several servers with commas):"))
         if host is not None:
             self.host = QLineEdit(host)
         else:
@@ -48,14 +49,18 @@ class OllamaModelDialog(QDialog):
 
     Attributes:
         model_combo (QComboBox): A QComboBox widget to display available models.
+        fast_model_combo (QComboBox): A QComboBox widget to select the fast model of the cascade, or None.
     """
-    def __init__(self, cur_model, models):
+    NO_FAST_MODEL = "None (no cascade)"
+
+    def __init__(self, cur_model, models, cur_fast_model=None):
         """
         Initialize the OllamaModelDialog.
 
         Args:
             cur_model (str): The currently selected model.
             models (list): A list of available models.
+            cur_fast_model (str, optional): The currently selected fast model.
         """
         super().__init__()
         self.setWindowTitle("Ollama Available Models")
@@ -69,6 +74,13 @@ class OllamaModelDialog(QDialog):
             self.model_combo.setCurrentIndex(self.model_combo.findText(cur_model))
         layout.addWidget(self.model_combo)
 
+        layout.addWidget(QLabel("Fast model, asked first for function names:"))
+        self.fast_model_combo = QComboBox()
+        self.fast_model_combo.addItems([self.NO_FAST_MODEL] + models)
+        if cur_fast_model is not None:
+            self.fast_model_combo.setCurrentIndex(self.fast_model_combo.findText(cur_fast_model))
+        layout.addWidget(self.fast_model_combo)
+
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self.accept)
         buttons.rejected.connect(self.reject)
@@ -76,3 +88,182 @@ class OllamaModelDialog(QDialog):
 
         self.setLayout(layout)
 
+
+class OllamaOptionsDialog(QDialog):
+    """
+    A dialog to set the performance options for the Ollama client.
+
+    Attributes:
+        parallel_requests (QLineEdit): A QLineEdit widget for the number of concurrent requests.
+        prompt_token_budget (QLineEdit): A QLineEdit widget for the maximum number of HLIL tokens in a prompt.
+        pack_token_budget (QLineEdit): A QLineEdit widget for the maximum number of HLIL tokens of small functions packed into one prompt.
+        rename_chunk_size (QLineEdit): A QLineEdit widget for the number of function names applied at once.
+        prefetch_megabytes (QLineEdit): A QLineEdit widget for the amount of HLIL prepared ahead of the requests.
+        keep_alive (QLineEdit): A QLineEdit widget for how long the servers keep the model loaded.
+        cache_max_entries (QLineEdit): A QLineEdit widget for the maximum number of cached responses.
+        cache_max_age (QLineEdit): A QLineEdit widget for the number of days an unused cached response is kept.
+        similarity_threshold (QLineEdit): A QLineEdit widget for the similarity a function needs to reuse an accepted name.
+        cascade_samples (QLineEdit): A QLineEdit widget for the number of answers sampled from the fast model.
+        cascade_confidence (QLineEdit): A QLineEdit widget for the share of samples that must agree with a fast answer.
+    """
+    def __init__(self, parallel_requests, prompt_token_budget, pack_token_budget, rename_chunk_size, prefetch_megabytes, keep_alive, cache_max_entries,
+                 cache_max_age, similarity_threshold, cascade_samples, cascade_confidence):
+        """
+        Initialize the OllamaOptionsDialog.
+
+        Args:
+            parallel_requests (int): The initial number of concurrent requests.
+            prompt_token_budget (int): The initial maximum number of HLIL tokens in a prompt.
+            pack_token_budget (int): The initial maximum number of HLIL tokens of small functions packed into one prompt.
+            rename_chunk_size (int): The initial number of function names applied at once.
+            prefetch_megabytes (float): The initial amount of HLIL prepared ahead of the requests, in megabytes.
+            keep_alive (str): The initial keep alive duration of the model.
+            cache_max_entries (int): The initial maximum number of cached responses.
+            cache_max_age (float): The initial number of days an unused cached response is kept.
+            similarity_threshold (float): The initial similarity a function needs to reuse an accepted name.
+            cascade_samples (int): The initial number of answers sampled from the fast model.
+            cascade_confidence (float): The initial share of samples that must agree with a fast answer.
+        """
+        super().__init__()
+        self.setWindowTitle("Ollama Options")
+
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Parallel requests:"))
+        self.parallel_requests = QLineEdit(str(parallel_requests))
+        layout.addWidget(self.parallel_requests)
+
+        layout.addWidget(QLabel("Prompt token budget (HLIL):"))
+        self.prompt_token_budget = QLineEdit(str(prompt_token_budget))
+        layout.addWidget(self.prompt_token_budget)
+
+        layout.addWidget(QLabel("Packed small functions token budget (0 to disable):"))
+        self.pack_token_budget = QLineEdit(str(pack_token_budget))
+        layout.addWidget(self.pack_token_budget)
+
+        layout.addWidget(QLabel("Function names applied at once:"))
+        self.rename_chunk_size = QLineEdit(str(rename_chunk_size))
+        layout.addWidget(self.rename_chunk_size)
+
+        layout.addWidget(QLabel("HLIL prepared ahead of requests (MB):"))
+        self.prefetch_megabytes = QLineEdit(str(prefetch_megabytes))
+        layout.addWidget(self.prefetch_megabytes)
+
+        layout.addWidget(QLabel("Keep model loaded for (e.g. 30m, -1 for always):"))
+        self.keep_alive = QLineEdit(keep_alive)
+        layout.addWidget(self.keep_alive)
+
+        layout.addWidget(QLabel("Response cache size (entries):"))
+        self.cache_max_entries = QLineEdit(str(cache_max_entries))
+        layout.addWidget(self.cache_max_entries)
+
+        layout.addWidget(QLabel("Response cache max age (days):"))
+        self.cache_max_age = QLineEdit(str(cache_max_age))
+        layout.addWidget(self.cache_max_age)
+
+        layout.addWidget(QLabel("Reuse names of functions at least this similar (0 to 1, 0 to disable):"))
+        self.similarity_threshold = QLineEdit(str(similarity_threshold))
+        layout.addWidget(self.similarity_threshold)
+
+        layout.addWidget(QLabel("Cascade: answers sampled from the fast model (0 to skip):"))
+        self.cascade_samples = QLineEdit(str(cascade_samples))
+        layout.addWidget(self.cascade_samples)
+
+        layout.addWidget(QLabel("Cascade: share of samples that must agree (0 to 1):"))
+        self.cascade_confidence = QLineEdit(str(cascade_confidence))
+        layout.addWidget(self.cascade_confidence)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.setLayout(layout)
+
+class RenameBudgetDialog(QDialog):
+    """
+    A dialog to set the budget of renaming all functions.
+
+    Attributes:
+        minutes (QLineEdit): A QLineEdit widget for the maximum run time in minutes.
+        tokens (QLineEdit): A QLineEdit widget for the maximum number of prompt and generated tokens.
+    """
+    def __init__(self, minutes, tokens):
+        """
+        Initialize the RenameBudgetDialog.
+
+        Args:
+            minutes (str): The initial maximum run time in minutes, empty for no limit.
+            tokens (str): The initial maximum number of tokens, empty for no limit.
+        """
+        super().__init__()
+        self.setWindowTitle("Rename Budget")
+
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Time budget in minutes (empty for no limit):"))
+        self.minutes = QLineEdit(minutes)
+        layout.addWidget(self.minutes)
+
+        layout.addWidget(QLabel("Token budget, prompt and generated (empty for no limit):"))
+        self.tokens = QLineEdit(tokens)
+        layout.addWidget(self.tokens)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.setLayout(layout)
+
+class RenameReviewDialog(QDialog):
+    """
+    A dialog to review suggested function names before they are applied.
+
+    Attributes:
+        table (QTableWidget): A QTableWidget listing every suggestion with a checkbox and an editable name.
+    """
+    def __init__(self, suggestions):
+        """
+        Initialize the RenameReviewDialog.
+
+        Args:
+            suggestions (list): (address, current name, suggested name) tuples.
+        """
+        super().__init__()
+        self.setWindowTitle("Review Suggested Names")
+        self.resize(700, 500)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Uncheck the names that should not be applied. Suggested names can be edited."))
+
+        self.table = QTableWidget(len(suggestions), 3)
+        self.table.setHorizontalHeaderLabels(["Address", "Current name", "Suggested name"])
+        for row, (address, name, suggestion) in enumerate(suggestions):
+            item = QTableWidgetItem(address)
+            item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+            item.setCheckState(Qt.Checked)
+            self.table.setItem(row, 0, item)
+            item = QTableWidgetItem(name)
+            item.setFlags(Qt.ItemIsEnabled)
+            self.table.setItem(row, 1, item)
+            self.table.setItem(row, 2, QTableWidgetItem(suggestion))
+        self.table.resizeColumnsToContents()
+        layout.addWidget(self.table)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        self.setLayout(layout)
+
+    def selected(self):
+        """
+        Get the suggestions that are checked.
+
+        Returns:
+            list: (row, name) tuples of the checked suggestions, with the possibly edited names.
+        """
+        return [(row, self.table.item(row, 2).text().strip()) for row in range(self.table.rowCount())
+                if self.table.item(row, 0).checkState() == Qt.Checked and self.table.item(row, 2).text().strip()]